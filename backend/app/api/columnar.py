@@ -0,0 +1,101 @@
+"""
+Columnar flowsheet responses
+Content negotiation between JSON, MessagePack column arrays and Arrow IPC
+"""
+import importlib.util
+import json
+from typing import Any, Dict, Optional, Union
+from ..calculations.mass_balance import StreamData
+from ..calculations.stream_table import STREAM_PROPERTIES, StreamTable
+from .schemas import FlowsheetResponse
+
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Binary formats are offered only when their encoder is installed
+MEDIA_TYPES = {
+    JSON_MEDIA_TYPE: True,
+    MSGPACK_MEDIA_TYPE: importlib.util.find_spec("msgpack") is not None,
+    ARROW_MEDIA_TYPE: importlib.util.find_spec("pyarrow") is not None,
+}
+
+STRING_COLUMNS = [name for name, field in StreamData.model_fields.items() if field.annotation is str]
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Supported media type with the highest quality in an Accept header (JSON by default)"""
+    best, best_q = JSON_MEDIA_TYPE, 0.0
+    for part in (accept or "").split(","):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if MEDIA_TYPES.get(media_type) and q > best_q:
+            best, best_q = media_type, q
+    return best
+
+
+def stream_columns(streams: Dict[str, StreamData]) -> Dict[str, Any]:
+    """One column per StreamData field: lists for the ids/ports, float arrays for properties"""
+    table = StreamTable.from_streams(streams)
+    columns: Dict[str, Any] = {name: [getattr(stream, name) for stream in streams.values()]
+                               for name in STRING_COLUMNS}
+    columns.update({prop: table.data[:, j] for j, prop in enumerate(STREAM_PROPERTIES)})
+    return columns
+
+
+def equipment_columns(results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Unit ids, one column per result key across all units and presence masks
+
+    Result keys live under "columns" so they cannot clash with the id list. A
+    key missing from some units gets a boolean mask under "present"; its cells
+    for those units are None, while a None elsewhere is a genuine null value.
+    """
+    keys = dict.fromkeys(key for result in results.values() for key in result)
+    columns = {key: [result.get(key) for result in results.values()] for key in keys}
+    present = {key: mask for key in keys
+               if not all(mask := [key in result for result in results.values()])}
+    return {"equipment_id": list(results), "columns": columns, "present": present}
+
+
+def render_flowsheet(response: FlowsheetResponse, media_type: str = JSON_MEDIA_TYPE) -> Union[str, bytes]:
+    """Response body in the negotiated format
+
+    MessagePack carries the JSON document with streams and equipment results
+    as column arrays. Arrow IPC carries the stream table as a record batch and
+    the remaining fields (equipment results as columns) as JSON in the schema
+    metadata under "flowsheet". JSON keeps the row-per-stream document.
+    """
+    exclude = {name for name in ("trace", "timings") if getattr(response, name) is None} or None
+    if media_type == JSON_MEDIA_TYPE:
+        return response.model_dump_json(exclude=exclude)
+
+    body = response.model_dump(mode="json", exclude={"streams", "equipment_results"} | (exclude or set()))
+    body["equipment_results"] = equipment_columns(response.equipment_results)
+    streams = stream_columns(response.streams)
+
+    if media_type == MSGPACK_MEDIA_TYPE:
+        import msgpack
+
+        body["streams"] = {name: values if isinstance(values, list) else values.tolist()
+                           for name, values in streams.items()}
+        return msgpack.packb(body)
+
+    if media_type == ARROW_MEDIA_TYPE:
+        import pyarrow as pa
+
+        table = pa.table({name: pa.array(values, type=pa.string() if isinstance(values, list) else None)
+                          for name, values in streams.items()})
+        table = table.replace_schema_metadata({"flowsheet": json.dumps(body)})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    raise ValueError(f"Unsupported response format '{media_type}'")
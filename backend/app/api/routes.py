@@ -1,95 +1,599 @@
 """
 FastAPI routes for water treatment calculations
 """
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
+import hmac
+import json
+import os
+import tempfile
+import uuid
+from time import perf_counter, perf_counter_ns
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from pydantic import BaseModel
+from ..models.base import ProcessResults
 from ..models.ultrafiltration import UltrafiltrationModel
 from ..models.feed_tank import FeedTankModel
-from ..calculations.mass_balance import MassBalanceSolver, FlowsheetData
-from ..utils.validation import EngineeringError
+from ..calculations.mass_balance import MassBalanceSolver, MassBalanceResult, FlowsheetData, SolverOptions
+from ..calculations.bulk_characterization import BulkCharacterization
+from ..calculations.fouling_simulation import FoulingSimulator
+from ..calculations.tank_dynamics import FeedTankSimulator
+from ..calculations.pareto import ParetoRequest, ParetoSearch
+from ..calculations.monte_carlo import MonteCarloAnalysis, MonteCarloRequest
+from ..calculations.sweep import ParameterSweep, SweepRequest
+from ..calculations.uf_optimizer import UFDesignOptimizer, UFOptimizationRequest
+from ..calculations.incremental import find_dirty_units, incremental_cache, same_solution_options
+from ..utils.jobs import JobInfo, JobQueueFullError, job_manager
+from ..utils.metrics import metrics
+from ..utils.profiling import (
+    PROFILE_FORMATS, ProfileInfo, ProfilerKind, get_profile, list_profiles, profile_path, profiled_call
+)
+from ..utils.result_cache import result_cache
+from ..utils.timing import current_timer, phase
+from ..utils.workers import CalculationTimeoutError, PoolSaturatedError, calculation_pool
+from .columnar import JSON_MEDIA_TYPE, negotiate, render_flowsheet
+from .schemas import (
+    DataResponse, EquipmentValidationRequest, FeedTankRequest,
+    FeedTankSimulationRequest, FlowsheetRequest, FlowsheetResponse, FoulingSimulationRequest,
+    RawJSONResponse, UFRequest, ValidationResponse
+)
+from ..config import settings
 
-router = APIRouter()
+REQUEST_SECONDS = metrics.histogram(
+    "http_request_duration_seconds", "API request latency by route", ("route", "method", "status")
+)
 
 
-@router.post("/calculate/ultrafiltration")
-async def calculate_ultrafiltration(inputs: Dict[str, Any]):
-    """Calculate ultrafiltration performance"""
-    try:
-        equipment_id = inputs.get("equipment_id", "UF-001")
-        uf_model = UltrafiltrationModel(equipment_id)
-        result = uf_model.calculate_performance(inputs)
+class InstrumentedRoute(APIRoute):
+    """API route recording its latency and status code in the request metrics"""
+    
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        route = self.path  # path template, so /jobs/{job_id} is one series
         
-        return {
-            "success": result.success,
-            "data": result.data,
-            "errors": [error.dict() for error in result.errors],
-            "warnings": result.warnings
-        }
+        async def instrumented(request: Request) -> Response:
+            started = perf_counter()
+            status = 500
+            try:
+                response = await handler(request)
+                status = response.status_code
+                return response
+            except HTTPException as e:
+                status = e.status_code
+                raise
+            except RequestValidationError:
+                status = 422
+                raise
+            finally:
+                REQUEST_SECONDS.observe(perf_counter() - started, route, request.method, str(status))
+        
+        return instrumented
+
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+# Tasks return rendered JSON (model_dump_json on the worker), which routes send as-is:
+# no intermediate dicts and no second pass through FastAPI's encoder
+
+
+def _cached(kind: str, task: Callable[[BaseModel], str], request: BaseModel) -> str:
+    """Run a calculation task through the result cache (runs on the worker pool)
+    
+    The key is the validated request (defaults filled, equipment id included);
+    hits return the stored response JSON.
+    """
+    key = result_cache.key(kind, request)
+    response = result_cache.get(key)
+    if response is None:
+        response = task(request)
+        result_cache.put(key, response)
+    return response
+
+
+def _calculate_ultrafiltration(request: UFRequest) -> str:
+    """UF calculation task (runs on the worker pool)"""
+    uf_model = UltrafiltrationModel(request.equipment_id)
+    result = uf_model.calculate_performance(request)
+    return result.model_dump_json()
+
+
+def _calculate_ultrafiltration_batch(columns: Dict[str, Any]) -> str:
+    """Vectorized UF batch task (runs on the worker pool)"""
+    equipment_id = columns.get("equipment_id", "UF-001")
+    uf_model = UltrafiltrationModel(equipment_id)
+    return DataResponse(data=uf_model.calculate_batch(columns)).model_dump_json()
+
+
+def _simulate_uf_fouling(request: FoulingSimulationRequest) -> str:
+    """UF fouling time-series simulation task (runs on the worker pool)"""
+    simulator = FoulingSimulator(request.equipment_id)
+    result = simulator.simulate(request)
+    return result.model_dump_json()
+
+
+def _simulate_feed_tank(request: FeedTankSimulationRequest) -> str:
+    """Dynamic feed tank simulation task (runs on the worker pool)"""
+    simulator = FeedTankSimulator(request.equipment_id)
+    result = simulator.simulate(request)
+    return result.model_dump_json()
+
+
+def _calculate_feed_tank(request: FeedTankRequest) -> str:
+    """Feed tank calculation task (runs on the worker pool)"""
+    feed_tank_model = FeedTankModel(request.equipment_id)
+    result = feed_tank_model.calculate_performance(request)
+    return result.model_dump_json()
+
+
+def _solve_flowsheet(request: FlowsheetRequest,
+                     cached: Optional[Tuple[FlowsheetData, MassBalanceResult, SolverOptions]],
+                     progress: Optional[Callable[[int, float], None]] = None,
+                     media_type: str = JSON_MEDIA_TYPE, timings: bool = False, use_cache: bool = True
+                     ) -> Tuple[Union[str, bytes], Optional[FlowsheetData], MassBalanceResult]:
+    """Flowsheet solve task (runs on the worker pool or as a background job)
+    
+    Returns the response body in the negotiated format, the flowsheet snapshot
+    to cache for incremental re-solves (None without a session) and the raw result.
+    With timings, the phases recorded up to serialization go into the response.
+    """
+    options = request.solver_options
+    flowsheet = FlowsheetData.model_construct(
+        equipment=request.equipment, streams=request.streams, connections=request.connections
+    )
+    
+    # Identical flowsheets give identical results; traces vary per run and are never cached.
+    # A hit leaves the session's incremental state untouched (its snapshot/result pair stays consistent)
+    cache_key = None
+    if use_cache and not options.trace:
+        cache_key = result_cache.key("flowsheet", {
+            "flowsheet": flowsheet, "options": options.model_dump(exclude={"session_id"}), "media_type": media_type
+        })
+        response = result_cache.get(cache_key)
+        if response is not None:
+            return response, None, None
+    
+    # Diff against the last converged state of this editing session (full solve if the options changed)
+    previous, dirty, snapshot = None, None, None
+    if options.session_id:
+        if cached is not None and same_solution_options(cached[2], options):
+            dirty = find_dirty_units(cached[0], flowsheet)
+            previous = cached[1] if dirty is not None else None
+        snapshot = flowsheet.model_copy(deep=True)
+    
+    # Solve mass balance
+    solver = MassBalanceSolver(**options.model_dump(exclude={"session_id"}), progress=progress)
+    with phase("solve"):
+        result = solver.solve_flowsheet(flowsheet, previous=previous, dirty=dirty)
+    
+    timer = current_timer() if timings else None
+    response = FlowsheetResponse(
+        success=result.success,
+        converged=result.converged,
+        iterations=result.iterations,
+        max_error=result.max_error,
+        streams=result.streams,
+        equipment_results=result.equipment_results,
+        errors=result.errors,
+        system_recovery=solver.calculate_system_recovery(result.streams) if result.success else 0.0,
+        trace=result.trace if options.trace else None,
+        timings=timer.summary() if timer is not None else None
+    )
+    with phase("serialize"):
+        response = render_flowsheet(response, media_type)
+    if cache_key is not None:
+        result_cache.put(cache_key, response)
+    
+    return response, snapshot, result
+
+
+def _flowsheet_job(request: FlowsheetRequest,
+                   progress: Callable[[int, float], None]) -> Dict[str, Any]:
+    """Background job body; the result has the synchronous endpoint's shape"""
+    response, _, _ = _solve_flowsheet(request, None, progress)
+    return json.loads(response)
+
+
+def _pareto_updates(request: ParetoRequest) -> Iterator[Dict[str, Any]]:
+    """Pareto front updates (streamed from the worker pool)"""
+    yield from ParetoSearch(request).run()
+
+
+def _feed_tank_updates(request: FeedTankSimulationRequest) -> Iterator[Dict[str, Any]]:
+    """Feed tank simulation chunks and summary (streamed from the worker pool)"""
+    yield from FeedTankSimulator(request.equipment_id).iterate(request)
+
+
+def _characterize_bulk(path: str, file_format: Optional[str], source_type: str,
+                       include_rows: bool) -> str:
+    """Bulk water quality characterization task (runs on the worker pool)"""
+    bulk = BulkCharacterization(path, file_format, source_type, include_rows)
+    return DataResponse(data=bulk.run()).model_dump_json()
+
+
+def _optimize_ultrafiltration(request: UFOptimizationRequest) -> str:
+    """UF design optimization task (runs on the worker pool)"""
+    optimizer = UFDesignOptimizer(request)
+    return DataResponse(data=optimizer.optimize()).model_dump_json()
+
+
+def _run_sweep(request: SweepRequest, progress: Optional[Callable[[int, float], None]] = None) -> str:
+    """Flowsheet parameter sweep task (worker pool or background job)"""
+    sweep = ParameterSweep(request)
+    return DataResponse(data=sweep.run(progress)).model_dump_json()
+
+
+def _run_monte_carlo(request: MonteCarloRequest,
+                     progress: Optional[Callable[[int, float], None]] = None) -> str:
+    """Monte Carlo feed quality task (worker pool or background job)"""
+    analysis = MonteCarloAnalysis(request)
+    return DataResponse(data=analysis.run(progress)).model_dump_json()
+
+
+def _sweep_job(request: SweepRequest, progress: Callable[[int, float], None]) -> Dict[str, Any]:
+    """Background sweep job body"""
+    return json.loads(_run_sweep(request, progress))
+
+
+def _monte_carlo_job(request: MonteCarloRequest, progress: Callable[[int, float], None]) -> Dict[str, Any]:
+    """Background Monte Carlo job body"""
+    return json.loads(_run_monte_carlo(request, progress))
+
+
+async def _run_calculation(fn: Callable[..., Any], *args: Any) -> Any:
+    """Run a calculation task on the worker pool, mapping pool limits to HTTP errors"""
+    timer = current_timer()
+    if timer is not None:
+        # Everything before dispatch: reading, decoding and validating the request
+        timer.add("parse", perf_counter_ns() - timer.started_ns)
+    try:
+        return await calculation_pool.run(fn, *args)
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except CalculationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+
+def _stream_calculation(fn: Callable[..., Iterator[Any]], *args: Any) -> AsyncIterator[Any]:
+    """Start a streamed calculation on the worker pool; a full queue is a 503 before the response starts"""
+    try:
+        return calculation_pool.stream(fn, *args)
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def _ndjson(updates: AsyncIterator[Any], name: str) -> AsyncIterator[str]:
+    """NDJSON lines of a streamed calculation; errors after streaming started end the stream"""
+    try:
+        async for update in updates:
+            yield json.dumps(update) + "\n"
+    except Exception as e:
+        yield json.dumps({"error": f"{name} failed: {str(e)}"}) + "\n"
+    finally:
+        await updates.aclose()
+
+
+def _require_admin(token: Optional[str]):
+    """Reject requests without the configured admin token"""
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin features are disabled (no admin token configured)")
+    if token is None or not hmac.compare_digest(token, settings.admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+async def _run_profiled(profiler: ProfilerKind, route: str, fn: Callable[..., Any], *args: Any) -> Tuple[Any, str]:
+    """Run a calculation task under the profiler; returns the result and the stored profile's id"""
+    profile_id = uuid.uuid4().hex
+    result = await _run_calculation(profiled_call, profiler, profile_id, route, fn, args)
+    return result, profile_id
+
+
+async def _calculate(kind: str, task: Callable[[BaseModel], str], request: BaseModel,
+                     profile: Optional[ProfilerKind], admin_token: Optional[str]) -> RawJSONResponse:
+    """Cached calculation response; profiled runs (admin only) bypass the cache and report the profile id"""
+    if profile is None:
+        return RawJSONResponse(await _run_calculation(_cached, kind, task, request))
+    _require_admin(admin_token)
+    body, profile_id = await _run_profiled(profile, kind, task, request)
+    return RawJSONResponse(body, headers={"X-Profile-Id": profile_id})
+
+
+@router.post("/calculate/ultrafiltration", response_model=ProcessResults)
+async def calculate_ultrafiltration(request: UFRequest, profile: Optional[ProfilerKind] = None,
+                                    x_admin_token: Optional[str] = Header(None)):
+    """Calculate ultrafiltration performance (profile=cprofile|sample profiles the run, admin only)"""
+    try:
+        return await _calculate("ultrafiltration", _calculate_ultrafiltration, request, profile, x_admin_token)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"UF calculation failed: {str(e)}")
 
 
-@router.post("/calculate/feed_tank")
-async def calculate_feed_tank(inputs: Dict[str, Any]):
-    """Calculate feed tank performance and water characterization"""
+@router.post("/calculate/ultrafiltration/batch", response_model=DataResponse)
+async def calculate_ultrafiltration_batch(columns: Dict[str, Any]):
+    """Calculate UF performance for many operating points given as columns"""
+    try:
+        return RawJSONResponse(await _run_calculation(_calculate_ultrafiltration_batch, columns))
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"UF batch calculation failed: {str(e)}")
+
+
+@router.post("/simulate/ultrafiltration/fouling", response_model=ProcessResults)
+async def simulate_ultrafiltration_fouling(request: FoulingSimulationRequest):
+    """Simulate UF fouling, TMP/flux and energy over filtration, backwash and CIP cycles"""
+    try:
+        return RawJSONResponse(
+            await _run_calculation(_cached, "uf_fouling", _simulate_uf_fouling, request)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"UF fouling simulation failed: {str(e)}")
+
+
+@router.post("/optimize/ultrafiltration", response_model=DataResponse)
+async def optimize_ultrafiltration(request: UFOptimizationRequest):
+    """Optimize UF module count and TMP for lifecycle cost or energy under the design limits"""
     try:
-        equipment_id = inputs.get("equipment_id", "FEED_TANK-001")
-        feed_tank_model = FeedTankModel(equipment_id)
-        result = feed_tank_model.calculate_performance(inputs)
+        return RawJSONResponse(await _run_calculation(_optimize_ultrafiltration, request))
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"UF optimization failed: {str(e)}")
+
+
+@router.post("/pareto/ultrafiltration")
+async def pareto_ultrafiltration(request: ParetoRequest):
+    """Stream the energy / membrane life / area Pareto front of a UF train as NDJSON"""
+    try:
+        ParetoSearch(request)
+        # One JSON line per migration interval
+        updates = _stream_calculation(_pareto_updates, request)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    return StreamingResponse(_ndjson(updates, "Pareto search"), media_type="application/x-ndjson")
+
+
+@router.post("/simulate/feed_tank")
+async def simulate_feed_tank(request: FeedTankSimulationRequest, stream: bool = True):
+    """Simulate feed tank level, water age and TSS over inflow/demand profiles
+    
+    Streams NDJSON (one line per chunk of time steps, then a summary line) unless
+    stream=false, which returns the collected result in one response.
+    """
+    try:
+        if not stream:
+            return RawJSONResponse(await _run_calculation(_simulate_feed_tank, request))
         
-        return {
-            "success": result.success,
-            "data": result.data,
-            "errors": [error.dict() for error in result.errors],
-            "warnings": result.warnings
-        }
+        errors = FeedTankSimulator(request.equipment_id).validate_simulation_inputs(request)
+        if errors:
+            return RawJSONResponse(ProcessResults(success=False, errors=errors).model_dump_json())
+        updates = _stream_calculation(_feed_tank_updates, request)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Feed tank simulation failed: {str(e)}")
+    
+    return StreamingResponse(_ndjson(updates, "Feed tank simulation"), media_type="application/x-ndjson")
+
+
+@router.post("/calculate/feed_tank", response_model=ProcessResults)
+async def calculate_feed_tank(request: FeedTankRequest, profile: Optional[ProfilerKind] = None,
+                              x_admin_token: Optional[str] = Header(None)):
+    """Calculate feed tank performance and water characterization (profile: see ultrafiltration)"""
+    try:
+        return await _calculate("feed_tank", _calculate_feed_tank, request, profile, x_admin_token)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Feed tank calculation failed: {str(e)}")
 
 
-@router.post("/calculate/flowsheet")
-async def calculate_flowsheet(flowsheet_data: Dict[str, Any]):
-    """Calculate complete flowsheet mass balance"""
+@router.post("/characterize/water_quality/bulk", response_model=DataResponse)
+async def characterize_water_quality_bulk(request: Request, format: Optional[str] = None,
+                                          source_type: str = "surface_water", include_rows: bool = True):
+    """Characterize every row of a CSV or Parquet lab dataset sent as the request body"""
+    # Spool the upload to disk so large datasets are read back in chunks
+    upload = tempfile.NamedTemporaryFile(suffix=".upload", delete=False)
+    try:
+        with upload:
+            size = 0
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > settings.bulk_max_upload_bytes:
+                    raise HTTPException(status_code=413,
+                                        detail=f"Upload exceeds {settings.bulk_max_upload_bytes} bytes")
+                upload.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=422, detail="Request body is empty; send the CSV or Parquet file")
+        
+        return RawJSONResponse(
+            await _run_calculation(_characterize_bulk, upload.name, format, source_type, include_rows)
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Bulk characterization failed: {str(e)}")
+    finally:
+        os.unlink(upload.name)
+
+
+@router.post("/calculate/flowsheet", response_model=FlowsheetResponse)
+async def calculate_flowsheet(request: FlowsheetRequest, accept: Optional[str] = Header(None),
+                              timings: bool = False, profile: Optional[ProfilerKind] = None,
+                              x_admin_token: Optional[str] = Header(None)):
+    """Calculate complete flowsheet mass balance
+    
+    JSON by default; Accept: application/msgpack or application/vnd.apache.arrow.stream
+    returns streams and equipment results as columns. With request timing enabled,
+    timings=true adds the per-phase breakdown to the response. profile=cprofile|sample
+    (admin only) profiles the solve and returns the profile id in X-Profile-Id.
+    """
     try:
-        # Convert input data to FlowsheetData model
-        flowsheet = FlowsheetData(**flowsheet_data)
+        if profile is not None:
+            _require_admin(x_admin_token)
+        media_type = negotiate(accept)
+        headers = {"Vary": "Accept"}
         
-        # Solve mass balance
-        solver = MassBalanceSolver()
-        result = solver.solve_flowsheet(flowsheet)
+        # Incremental session state stays in this process; workers get a copy
+        session_id = request.solver_options.session_id
+        cached = incremental_cache.get(session_id) if session_id else None
         
-        return {
-            "success": result.success,
-            "converged": result.converged,
-            "iterations": result.iterations,
-            "max_error": result.max_error,
-            "streams": {k: v.dict() for k, v in result.streams.items()},
-            "equipment_results": result.equipment_results,
-            "errors": [error.dict() for error in result.errors],
-            "system_recovery": solver.calculate_system_recovery(result.streams) if result.success else 0.0
-        }
+        # Timed and profiled runs measure a real solve, so they skip the result cache
+        timings = timings and current_timer() is not None
+        args = (request, cached, None, media_type, timings, not timings and profile is None)
+        if profile is None:
+            response, snapshot, result = await _run_calculation(_solve_flowsheet, *args)
+        else:
+            (response, snapshot, result), headers["X-Profile-Id"] = await _run_profiled(
+                profile, "flowsheet", _solve_flowsheet, *args
+            )
+        
+        # Only a converged solution is a valid baseline for incremental re-solves
+        if snapshot is not None and result.converged:
+            incremental_cache.put(session_id, snapshot, result, request.solver_options)
+        
+        return Response(response, media_type=media_type, headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Flowsheet calculation failed: {str(e)}")
 
 
-@router.post("/validate/equipment")
-async def validate_equipment_config(equipment_data: Dict[str, Any]):
+@router.post("/sweep/flowsheet", response_model=DataResponse)
+async def sweep_flowsheet(request: SweepRequest):
+    """Solve a flowsheet over a grid (or zipped columns) of parameter values"""
+    try:
+        return RawJSONResponse(await _run_calculation(_run_sweep, request))
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Flowsheet sweep failed: {str(e)}")
+
+
+@router.post("/montecarlo/flowsheet", response_model=DataResponse)
+async def monte_carlo_flowsheet(request: MonteCarloRequest):
+    """Propagate uncertain, correlated feed quality through the flowsheet"""
+    try:
+        return RawJSONResponse(await _run_calculation(_run_monte_carlo, request))
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Monte Carlo analysis failed: {str(e)}")
+
+
+def _submit_job(fn: Callable[..., Dict[str, Any]], request: BaseModel) -> JobInfo:
+    """Queue a background job, mapping a full job queue to 503"""
+    try:
+        return job_manager.submit(fn, request)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.post("/jobs/flowsheet", status_code=202)
+async def submit_flowsheet_job(request: FlowsheetRequest):
+    """Submit a flowsheet solve as a background job"""
+    job = _submit_job(_flowsheet_job, request)
+    return {"job_id": job.job_id, "status": job.status}
+
+
+@router.post("/jobs/sweep", status_code=202)
+async def submit_sweep_job(request: SweepRequest):
+    """Submit a parameter sweep as a background job (progress counts finished scenarios)"""
+    job = _submit_job(_sweep_job, request)
+    return {"job_id": job.job_id, "status": job.status}
+
+
+@router.post("/jobs/montecarlo", status_code=202)
+async def submit_monte_carlo_job(request: MonteCarloRequest):
+    """Submit a Monte Carlo analysis as a background job (progress counts solved samples)"""
+    job = _submit_job(_monte_carlo_job, request)
+    return {"job_id": job.job_id, "status": job.status}
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job status, latest convergence progress and, once finished, its result"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return RawJSONResponse(job.model_dump_json())
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return {"job_id": job.job_id, "status": job.status}
+
+
+@router.get("/profiles", response_model=List[ProfileInfo])
+async def get_profiles(x_admin_token: Optional[str] = Header(None)):
+    """Stored request profiles, newest first (admin only)"""
+    _require_admin(x_admin_token)
+    return list_profiles()
+
+
+@router.get("/profiles/{profile_id}", response_model=ProfileInfo)
+async def get_profile_info(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    """Metadata of a stored profile (admin only)"""
+    _require_admin(x_admin_token)
+    info = get_profile(profile_id)
+    if info is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    return info
+
+
+@router.get("/profiles/{profile_id}/{fmt}")
+async def download_profile(profile_id: str, fmt: str, x_admin_token: Optional[str] = Header(None)):
+    """Profile artifact: pstats (binary), text report or collapsed stacks (admin only)"""
+    _require_admin(x_admin_token)
+    info = get_profile(profile_id)
+    if info is None or fmt not in info.formats:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} has no '{fmt}' artifact")
+    media_type = "application/octet-stream" if fmt == "pstats" else "text/plain"
+    return FileResponse(profile_path(profile_id, fmt), media_type=media_type,
+                        filename=profile_id + PROFILE_FORMATS[fmt])
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Result cache hit/miss counters (this server process)"""
+    return result_cache.stats()
+
+
+@router.post("/validate/equipment", response_model=ValidationResponse)
+async def validate_equipment_config(request: EquipmentValidationRequest):
     """Validate equipment configuration"""
     try:
-        equipment_type = equipment_data.get("equipment_type", "")
-        equipment_id = equipment_data.get("equipment_id", "")
-        config = equipment_data.get("config", {})
-        
         errors = []
         
-        if equipment_type == "ultrafiltration":
-            uf_model = UltrafiltrationModel(equipment_id)
-            errors = uf_model.validate_inputs(config)
+        if request.equipment_type == "ultrafiltration":
+            uf_model = UltrafiltrationModel(request.equipment_id)
+            errors = uf_model.validate_inputs(request.config)
         
-        return {
-            "valid": len(errors) == 0,
-            "errors": [error.dict() for error in errors]
-        }
+        return RawJSONResponse(ValidationResponse(valid=len(errors) == 0, errors=errors).model_dump_json())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Validation failed: {str(e)}")
 
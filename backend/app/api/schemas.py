@@ -0,0 +1,77 @@
+"""
+Typed request and response models for the API routes
+Requests are validated once at the edge; responses are rendered straight to JSON
+"""
+from typing import Any, Dict, List, Optional
+from fastapi.responses import Response
+from pydantic import BaseModel
+from ..models.ultrafiltration import UFInputs
+from ..models.feed_tank import FeedTankInputs
+from ..calculations.mass_balance import FlowsheetData, SolverOptions, StreamData
+from ..calculations.fouling_simulation import FoulingSimulationInputs
+from ..calculations.tank_dynamics import FeedTankDynamicsInputs
+from ..utils.trace import TraceEntry
+from ..utils.validation import EngineeringError
+
+
+class UFRequest(UFInputs):
+    """UF calculation request"""
+    equipment_id: str = "UF-001"
+
+
+class FeedTankRequest(FeedTankInputs):
+    """Feed tank calculation request"""
+    equipment_id: str = "FEED_TANK-001"
+
+
+class FoulingSimulationRequest(FoulingSimulationInputs):
+    """UF fouling simulation request"""
+    equipment_id: str = "UF-001"
+
+
+class FeedTankSimulationRequest(FeedTankDynamicsInputs):
+    """Dynamic feed tank simulation request"""
+    equipment_id: str = "FEED_TANK-001"
+
+
+class FlowsheetRequest(FlowsheetData):
+    """Flowsheet solve request"""
+    solver_options: SolverOptions = SolverOptions()
+
+
+class EquipmentValidationRequest(BaseModel):
+    """Equipment configuration to validate"""
+    equipment_type: str = ""
+    equipment_id: str = ""
+    config: Dict[str, Any] = {}
+
+
+class DataResponse(BaseModel):
+    """Batch, optimization, sweep and analysis result"""
+    success: bool = True
+    data: Dict[str, Any]
+
+
+class FlowsheetResponse(BaseModel):
+    """Flowsheet mass balance result"""
+    success: bool
+    converged: bool
+    iterations: int
+    max_error: float
+    streams: Dict[str, StreamData]
+    equipment_results: Dict[str, Dict[str, Any]]
+    errors: List[EngineeringError]
+    system_recovery: float
+    trace: Optional[List[TraceEntry]] = None  # only present when requested
+    timings: Optional[Dict[str, Dict[str, Any]]] = None  # phase -> {ms, count}, only when requested
+
+
+class ValidationResponse(BaseModel):
+    """Equipment validation result"""
+    valid: bool
+    errors: List[EngineeringError]
+
+
+class RawJSONResponse(Response):
+    """JSON response whose body was already rendered (model_dump_json or the result cache)"""
+    media_type = "application/json"
@@ -0,0 +1,260 @@
+"""
+Bulk Water Quality Characterization
+Chunked scoring of CSV/Parquet lab datasets with the vectorized feed tank assessments
+"""
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from ..models.feed_tank import DIFFICULTY_LEVELS, FOULING_LEVELS, FeedTankModel, WaterQuality
+from ..config import settings
+
+
+QUALITY_COLUMNS = list(WaterQuality.model_fields)
+SOURCE_COLUMN = "source_type"
+SDI_HISTOGRAM_EDGES = np.arange(1.0, 16.0)  # one SDI unit per bin over the clamped range
+PERCENTILES = [5, 25, 50, 75, 95]
+
+
+def detect_format(path: str) -> str:
+    """'parquet' when the file starts with the Parquet magic bytes, else 'csv'"""
+    with open(path, "rb") as f:
+        return "parquet" if f.read(4) == b"PAR1" else "csv"
+
+
+class BulkCharacterization:
+    """Scores every row of a lab dataset in fixed-size chunks
+
+    Rows are read chunk by chunk (pandas CSV chunks or Parquet record
+    batches), so memory is bounded by the chunk size plus the compact per-row
+    results. Absent quality columns take the WaterQuality defaults; rows with
+    missing or non-numeric values in a present column are reported invalid.
+    Pretreatment lists depend only on the source type and the quality trigger
+    bitmask, so each distinct combination is resolved once by the scalar
+    recommend_pretreatment and rows refer to it by index.
+    """
+
+    def __init__(self, path: str, file_format: Optional[str] = None,
+                 source_type: str = "surface_water", include_rows: bool = True,
+                 chunk_rows: Optional[int] = None):
+        if file_format not in (None, "csv", "parquet"):
+            raise ValueError(f"Unsupported format '{file_format}': expected csv or parquet")
+        self.path = path
+        self.file_format = file_format or detect_format(path)
+        self.source_type = source_type
+        self.include_rows = include_rows
+        self.chunk_rows = chunk_rows or settings.bulk_chunk_rows
+        self.model = FeedTankModel("BULK")
+
+        self.present: List[str] = []
+        self._pretreatment_sets: List[List[str]] = []
+        self._set_ids: Dict[Tuple[str, ...], int] = {}
+        self._keys: Dict[Tuple[str, int], int] = {}  # (source type, trigger mask) -> set id
+
+    def chunks(self) -> Iterator[pd.DataFrame]:
+        """Data frames of at most chunk_rows rows with the recognised columns"""
+        wanted = set(QUALITY_COLUMNS) | {SOURCE_COLUMN}
+
+        if self.file_format == "parquet":
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ValueError("Parquet input requires pyarrow")
+            parquet = pq.ParquetFile(self.path)
+            columns = [name for name in parquet.schema_arrow.names if name in wanted]
+            for batch in parquet.iter_batches(batch_size=self.chunk_rows, columns=columns):
+                yield batch.to_pandas()
+            return
+
+        reader = pd.read_csv(self.path, chunksize=self.chunk_rows, usecols=lambda name: name in wanted,
+                             dtype={SOURCE_COLUMN: str})
+        with reader:
+            yield from reader
+
+    def run(self) -> Dict[str, Any]:
+        """Score all rows and return per-row results and aggregate distributions"""
+        n_rows = 0
+        rows: Dict[str, List[np.ndarray]] = {"valid": [], "treatment_difficulty": [], "sdi_estimate": [],
+                                             "fouling_potential": [], "pretreatment_set": []}
+        difficulty_counts = np.zeros(len(DIFFICULTY_LEVELS), dtype=np.int64)
+        fouling_counts = np.zeros(len(FOULING_LEVELS), dtype=np.int64)
+        set_counts = np.zeros(0, dtype=np.int64)
+        sdi_values: List[np.ndarray] = []
+        moments: Dict[str, np.ndarray] = {}  # column -> [count, sum, sum of squares, min, max]
+
+        for frame in self.chunks():
+            if not n_rows:
+                self.present = [name for name in QUALITY_COLUMNS if name in frame.columns]
+            n_rows += len(frame)
+            if n_rows > settings.bulk_max_rows:
+                raise ValueError(f"Dataset has more than {settings.bulk_max_rows} rows")
+
+            quality, valid = self._quality_columns(frame)
+            scores = self.model.characterize_batch(quality)
+            set_ids = self._pretreatment_ids(frame, quality, scores["pretreatment_mask"])
+
+            difficulty_counts += np.bincount(scores["treatment_difficulty"][valid],
+                                             minlength=len(DIFFICULTY_LEVELS))
+            fouling_counts += np.bincount(scores["fouling_potential"][valid], minlength=len(FOULING_LEVELS))
+            chunk_sets = np.bincount(set_ids[valid], minlength=len(self._pretreatment_sets))
+            set_counts = np.concatenate([set_counts, np.zeros(len(chunk_sets) - len(set_counts), dtype=np.int64)])
+            set_counts += chunk_sets
+            sdi_values.append(scores["sdi_estimate"][valid].astype(np.float32))
+            self._accumulate_moments(moments, quality, valid)
+
+            if self.include_rows:
+                rows["valid"].append(valid)
+                rows["treatment_difficulty"].append(scores["treatment_difficulty"])
+                rows["sdi_estimate"].append(scores["sdi_estimate"])
+                rows["fouling_potential"].append(scores["fouling_potential"])
+                rows["pretreatment_set"].append(set_ids)
+
+        n_valid = int(difficulty_counts.sum())
+        sdi = np.concatenate(sdi_values) if sdi_values else np.zeros(0, dtype=np.float32)
+
+        response = {
+            "format": self.file_format,
+            "rows": n_rows,
+            "valid_rows": n_valid,
+            "invalid_rows": n_rows - n_valid,
+            "quality_columns": self.present,
+            "summary": {
+                "treatment_difficulty": self._distribution(DIFFICULTY_LEVELS, difficulty_counts),
+                "fouling_potential": self._distribution(FOULING_LEVELS, fouling_counts),
+                "sdi_estimate": self._sdi_summary(sdi),
+                "pretreatment": self._step_frequencies(set_counts, n_valid),
+                "water_quality": self._moment_summary(moments)
+            },
+            "pretreatment_sets": self._pretreatment_sets
+        }
+        if self.include_rows:
+            response["results"] = self._row_results(rows)
+        return response
+
+    def _quality_columns(self, frame: pd.DataFrame) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """Float columns for every quality field and the per-row validity mask"""
+        n = len(frame)
+        valid = np.ones(n, dtype=bool)
+        quality = {}
+        for name in QUALITY_COLUMNS:
+            if name in frame.columns:
+                values = pd.to_numeric(frame[name], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+                valid &= np.isfinite(values)
+            else:
+                values = np.full(n, WaterQuality.model_fields[name].default, dtype=float)
+            quality[name] = values
+        return quality, valid
+
+    def _pretreatment_ids(self, frame: pd.DataFrame, quality: Dict[str, np.ndarray],
+                          mask: np.ndarray) -> np.ndarray:
+        """Pretreatment set index per row, resolving unseen (source, triggers) combinations"""
+        if SOURCE_COLUMN in frame.columns:
+            sources = frame[SOURCE_COLUMN].fillna(self.source_type).astype(str).to_numpy()
+        else:
+            sources = np.full(len(frame), self.source_type, dtype=object)
+
+        source_names, source_index = np.unique(sources, return_inverse=True)
+        keys = source_index.astype(np.int64) * 256 + mask
+        unique_keys, first_row, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+        ids = np.empty(len(unique_keys), dtype=np.int64)
+        for k, (key, row) in enumerate(zip(unique_keys.tolist(), first_row.tolist())):
+            combination = (str(source_names[key // 256]), key % 256)
+            if combination not in self._keys:
+                # Any row with this combination yields the same list; invalid rows may hold NaN
+                sample = WaterQuality(**{
+                    name: float(values[row]) if np.isfinite(values[row]) else WaterQuality.model_fields[name].default
+                    for name, values in quality.items()
+                })
+                steps = self.model.recommend_pretreatment(combination[0], sample)
+                self._keys[combination] = self._set_ids.setdefault(tuple(steps), len(self._set_ids))
+                if self._keys[combination] == len(self._pretreatment_sets):
+                    self._pretreatment_sets.append(steps)
+            ids[k] = self._keys[combination]
+        return ids[inverse.ravel()]
+
+    @staticmethod
+    def _accumulate_moments(moments: Dict[str, np.ndarray], quality: Dict[str, np.ndarray], valid: np.ndarray):
+        """Streaming count, sum, sum of squares, min and max of each quality column"""
+        for name, values in quality.items():
+            values = values[valid]
+            if not values.size:
+                continue
+            chunk = np.array([values.size, values.sum(), np.square(values).sum(), values.min(), values.max()])
+            if name not in moments:
+                moments[name] = chunk
+            else:
+                total = moments[name]
+                total[:3] += chunk[:3]
+                total[3] = min(total[3], chunk[3])
+                total[4] = max(total[4], chunk[4])
+
+    def _moment_summary(self, moments: Dict[str, np.ndarray]) -> Dict[str, Dict[str, float]]:
+        summary = {}
+        for name in self.present:
+            if name not in moments:
+                continue
+            count, total, squares, low, high = moments[name].tolist()
+            mean = total / count
+            summary[name] = {
+                "mean": round(mean, 6),
+                "std": round(max(squares / count - mean * mean, 0.0) ** 0.5, 6),
+                "min": low,
+                "max": high
+            }
+        return summary
+
+    @staticmethod
+    def _distribution(levels: List[str], counts: np.ndarray) -> Dict[str, Dict[str, Any]]:
+        total = int(counts.sum())
+        return {level: {"count": int(count), "fraction": round(count / total, 6) if total else 0.0}
+                for level, count in zip(levels, counts.tolist())}
+
+    @staticmethod
+    def _sdi_summary(sdi: np.ndarray) -> Dict[str, Any]:
+        if not sdi.size:
+            return {"mean": None, "std": None, "min": None, "max": None, "histogram": None}
+        values = sdi.astype(float)
+        quantiles = np.percentile(values, PERCENTILES)
+        counts, _ = np.histogram(values, bins=SDI_HISTOGRAM_EDGES)
+        return {
+            "mean": round(float(values.mean()), 4),
+            "std": round(float(values.std()), 4),
+            "min": round(float(values.min()), 4),
+            "max": round(float(values.max()), 4),
+            **{f"p{p}": round(float(q), 4) for p, q in zip(PERCENTILES, quantiles)},
+            "histogram": {"bin_edges": SDI_HISTOGRAM_EDGES.tolist(), "counts": counts.tolist()}
+        }
+
+    def _step_frequencies(self, set_counts: np.ndarray, n_valid: int) -> Dict[str, float]:
+        """Fraction of valid rows for which each pretreatment step is recommended"""
+        frequencies: Dict[str, int] = {}
+        for steps, count in zip(self._pretreatment_sets, set_counts.tolist()):
+            for step in dict.fromkeys(steps):
+                frequencies[step] = frequencies.get(step, 0) + count
+        return {step: round(count / n_valid, 6) if n_valid else 0.0
+                for step, count in sorted(frequencies.items(), key=lambda item: -item[1])}
+
+    @staticmethod
+    def _row_results(rows: Dict[str, List[np.ndarray]]) -> Dict[str, List[Any]]:
+        """Columnar per-row results; invalid rows are None"""
+        if not rows["valid"]:
+            return {name: [] for name in rows}
+        valid = np.concatenate(rows["valid"])
+
+        def labelled(name: str, levels: List[str]) -> List[Any]:
+            labels = np.array(levels, dtype=object)[np.concatenate(rows[name])]
+            return np.where(valid, labels, None).tolist()
+
+        def numeric(name: str, decimals: Optional[int] = None) -> List[Any]:
+            values = np.concatenate(rows[name])
+            if decimals is not None:
+                values = np.round(values, decimals)
+            return np.where(valid, values.astype(object), None).tolist()
+
+        return {
+            "valid": valid.tolist(),
+            "treatment_difficulty": labelled("treatment_difficulty", DIFFICULTY_LEVELS),
+            "sdi_estimate": numeric("sdi_estimate", 4),
+            "fouling_potential": labelled("fouling_potential", FOULING_LEVELS),
+            "pretreatment_set": numeric("pretreatment_set")
+        }
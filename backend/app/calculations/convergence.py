@@ -0,0 +1,77 @@
+"""
+Tear Stream Convergence Methods
+Successive substitution, Wegstein and Broyden acceleration for recycle loops
+"""
+import numpy as np
+
+
+class DirectSubstitution:
+    """Plain successive substitution: x(k+1) = g(x(k))"""
+
+    def __init__(self, size: int):
+        self.size = size
+
+    def next(self, x: np.ndarray, gx: np.ndarray) -> np.ndarray:
+        """Return next tear estimate from current estimate and loop output"""
+        return gx.copy()
+
+
+class WegsteinAccelerator(DirectSubstitution):
+    """Bounded Wegstein acceleration applied per tear variable"""
+
+    def __init__(self, size: int, q_min: float = -5.0, q_max: float = 0.0):
+        super().__init__(size)
+        self.q_min = q_min
+        self.q_max = q_max
+        self._x_prev = None
+        self._gx_prev = None
+
+    def next(self, x: np.ndarray, gx: np.ndarray) -> np.ndarray:
+        if self._x_prev is None:
+            # First pass is direct substitution to get a secant estimate
+            x_new = gx.copy()
+        else:
+            dx = x - self._x_prev
+            dg = gx - self._gx_prev
+            with np.errstate(divide="ignore", invalid="ignore"):
+                slope = np.where(np.abs(dx) > 1e-12, dg / dx, 0.0)
+                q = np.where(np.abs(slope - 1.0) > 1e-12, slope / (slope - 1.0), 0.0)
+            q = np.clip(q, self.q_min, self.q_max)
+            x_new = q * x + (1.0 - q) * gx
+
+        self._x_prev = x.copy()
+        self._gx_prev = gx.copy()
+        return x_new
+
+
+class BroydenAccelerator(DirectSubstitution):
+    """Broyden's (good) quasi-Newton method on the residual f(x) = g(x) - x"""
+
+    def __init__(self, size: int):
+        super().__init__(size)
+        # Inverse Jacobian of f; -I reproduces direct substitution on the first step
+        self._inverse_jacobian = -np.eye(size)
+        self._x_prev = None
+        self._f_prev = None
+
+    def next(self, x: np.ndarray, gx: np.ndarray) -> np.ndarray:
+        f = gx - x
+
+        if self._x_prev is not None:
+            dx = x - self._x_prev
+            df = f - self._f_prev
+            h_df = self._inverse_jacobian @ df
+            denominator = dx @ h_df
+            if abs(denominator) > 1e-14:
+                self._inverse_jacobian += np.outer(dx - h_df, dx @ self._inverse_jacobian) / denominator
+
+        self._x_prev = x.copy()
+        self._f_prev = f.copy()
+        return x - self._inverse_jacobian @ f
+
+
+CONVERGENCE_METHODS = {
+    "direct": DirectSubstitution,
+    "wegstein": WegsteinAccelerator,
+    "broyden": BroydenAccelerator,
+}
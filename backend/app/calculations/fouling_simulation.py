@@ -0,0 +1,300 @@
+"""
+UF Fouling Time-Series Simulation
+Fouling resistance, TMP/flux and energy over an operating horizon with backwash and CIP cycles
+"""
+import math
+import numpy as np
+from typing import Any, Dict, List, Literal, Optional, Union
+from ..models.base import ProcessResults
+from ..models.ultrafiltration import UFInputs, UltrafiltrationModel
+from ..utils.validation import EngineeringError
+from ..config import settings
+from .trajectory import TrajectoryBins
+
+
+MAX_SIMULATION_STEPS = 50_000_000
+CHUNK_STEPS = 262_144  # time steps evaluated per vectorized chunk
+MAX_FOULING_RESISTANCE = 5e11  # m⁻¹, same cap as the steady-state model
+PUMP_EFFICIENCY = 0.75
+
+
+class FoulingSimulationInputs(UFInputs):
+    """Fouling simulation inputs (UF operating point plus cleaning strategy)"""
+    operating_mode: Literal["constant_pressure", "constant_flux"] = "constant_pressure"
+    target_flux: Optional[float] = None  # L/m²/h, constant flux mode (default: clean flux at TMP)
+    horizon_hours: float = 8760.0  # h
+    time_step_minutes: float = 1.0  # min
+    filtration_minutes: float = 30.0  # min between backwashes
+    backwash_minutes: float = 1.0  # min
+    backwash_flux: Optional[float] = None  # L/m²/h (default: twice the clean-membrane flux)
+    backwash_efficiency: float = 0.9  # fraction of reversible fouling removed
+    cip_interval_hours: float = 720.0  # h of operation between CIPs, 0 disables CIP
+    cip_duration_hours: float = 4.0  # h offline per CIP
+    cip_efficiency: float = 0.95  # fraction of remaining fouling removed
+    output_points: int = 500  # trajectory samples returned
+
+
+class FoulingSimulator:
+    """Integrates UF fouling over filtration / backwash / CIP cycles
+
+    Fouling builds at the steady-state model rate during filtration. Each
+    backwash removes a fraction of the fouling laid down since the previous
+    backwash; the rest is hydraulically irreversible until the next CIP, which
+    removes a fraction of all fouling. Fouling at any time therefore has a
+    closed form in the cycle position and the CIP count, so the horizon is
+    evaluated as vectorized chunks of time steps instead of a step loop.
+    """
+
+    def __init__(self, equipment_id: str):
+        self.equipment_id = equipment_id
+        self.model = UltrafiltrationModel(equipment_id)
+
+    def simulate(self, inputs: Union[Dict[str, Any], FoulingSimulationInputs]) -> ProcessResults:
+        """Run the simulation and return downsampled trajectories and KPIs"""
+        try:
+            sim = inputs if isinstance(inputs, FoulingSimulationInputs) else FoulingSimulationInputs(**inputs)
+
+            errors = self.validate_simulation_inputs(sim)
+            if errors:
+                return ProcessResults(success=False, errors=errors)
+
+            warnings = []
+            if sim.time_step_minutes > sim.backwash_minutes:
+                warnings.append(
+                    f"Time step {sim.time_step_minutes} min is coarser than the "
+                    f"{sim.backwash_minutes} min backwash; cycle phases are under-resolved"
+                )
+
+            return ProcessResults(success=True, data=self._integrate(sim), warnings=warnings)
+
+        except Exception as e:
+            return ProcessResults(
+                success=False,
+                errors=[EngineeringError(
+                    code="CALCULATION_ERROR",
+                    message=f"Fouling simulation failed: {str(e)}",
+                    equipment_id=self.equipment_id,
+                    severity="critical"
+                )]
+            )
+
+    def validate_simulation_inputs(self, sim: FoulingSimulationInputs) -> List[EngineeringError]:
+        """Validate horizon, cycle and operating point inputs"""
+        errors = []
+
+        def error(code: str, message: str):
+            errors.append(EngineeringError(
+                code=code, message=message, equipment_id=self.equipment_id, severity="error"
+            ))
+
+        if sim.feed_flow <= 0:
+            error("INVALID_FEED_FLOW", "Feed flow must be positive")
+        if sim.membrane_area <= 0:
+            error("INVALID_MEMBRANE_AREA", "Membrane area must be positive")
+        if sim.horizon_hours <= 0 or sim.time_step_minutes <= 0:
+            error("INVALID_HORIZON", "Horizon and time step must be positive")
+        elif sim.horizon_hours * 60 / sim.time_step_minutes > MAX_SIMULATION_STEPS:
+            error("TOO_MANY_STEPS",
+                  f"Horizon needs more than {MAX_SIMULATION_STEPS} time steps; increase the time step")
+        if sim.filtration_minutes <= 0 or sim.backwash_minutes < 0:
+            error("INVALID_CYCLE", "Filtration time must be positive and backwash time non-negative")
+        if sim.cip_interval_hours < 0 or sim.cip_duration_hours < 0:
+            error("INVALID_CYCLE", "CIP interval and duration must be non-negative")
+        if not (0 <= sim.backwash_efficiency <= 1 and 0 <= sim.cip_efficiency <= 1):
+            error("INVALID_EFFICIENCY", "Cleaning efficiencies must be between 0 and 1")
+        if sim.operating_mode == "constant_pressure" and sim.transmembrane_pressure <= 0:
+            error("INVALID_TMP", "Transmembrane pressure must be positive")
+        if sim.operating_mode == "constant_flux" and sim.target_flux is not None and sim.target_flux <= 0:
+            error("INVALID_FLUX", "Target flux must be positive")
+        if sim.backwash_flux is not None and sim.backwash_flux < 0:
+            error("INVALID_FLUX", "Backwash flux must be non-negative")
+        if sim.output_points < 1:
+            error("INVALID_OUTPUT", "At least one output point is required")
+
+        return errors
+
+    def _integrate(self, sim: FoulingSimulationInputs) -> Dict[str, Any]:
+        """Evaluate the horizon chunk by chunk, accumulating KPIs and trajectory bins"""
+        model = self.model
+        dt = sim.time_step_minutes / 60.0  # h
+        n_steps = int(math.ceil(sim.horizon_hours / dt))
+
+        props = model.membrane_properties.get(sim.membrane_type, model.membrane_properties["PVDF"])
+        clean_resistance = props["clean_resistance"]  # m⁻¹
+        viscosity = float(model.water_viscosity(sim.temperature))  # Pa·s
+        fouling_rate = float(model.calculate_fouling_resistance(1.0, sim.feed_concentration))  # m⁻¹/h
+        initial_fouling = float(model.calculate_fouling_resistance(
+            sim.operating_hours, sim.feed_concentration
+        ))  # m⁻¹, treated as permanent
+
+        # Cycle geometry (h)
+        filtration = sim.filtration_minutes / 60.0
+        cycle = filtration + sim.backwash_minutes / 60.0
+        cip_enabled = sim.cip_interval_hours > 0
+        cip_interval = sim.cip_interval_hours if cip_enabled else math.inf
+        cip_period = cip_interval + sim.cip_duration_hours
+
+        # Fouling at CIP start relative to the fouling left by the previous CIP
+        if cip_enabled:
+            cycles_before_cip = math.floor(cip_interval / cycle)
+            cip_gain = fouling_rate * (
+                (1 - sim.backwash_efficiency) * filtration * cycles_before_cip
+                + min(cip_interval - cycles_before_cip * cycle, filtration)
+            )
+        else:
+            cip_gain = 0.0
+        residual = 1.0 - sim.cip_efficiency
+
+        # Same flux units as the steady-state model: L/m²/h = m/s × 3600
+        clean_flux = float(model.solve_flux(
+            sim.transmembrane_pressure, viscosity, clean_resistance + initial_fouling,
+            sim.crossflow_velocity, sim.feed_concentration
+        )[0])  # m/s
+        if sim.operating_mode == "constant_flux":
+            flux_target = sim.target_flux / 3600 if sim.target_flux is not None else clean_flux  # m/s
+            cp_factor = model.concentration_polarization_factor(
+                sim.crossflow_velocity, sim.feed_concentration, flux_target
+            )
+            osmotic_pressure = float(model.osmotic_pressure(sim.feed_concentration * cp_factor))  # bar
+
+        backwash_flux = sim.backwash_flux / 3600 if sim.backwash_flux is not None else 2 * clean_flux  # m/s
+        area = sim.membrane_area
+        feed_limited_flux = sim.feed_flow * 1000 / area / 3600  # model flux units; permeate cannot exceed the feed
+
+        bins = TrajectoryBins(n_steps, max(1, int(math.ceil(n_steps / sim.output_points))))
+
+        totals = {
+            "filtering_steps": 0, "gross_permeate": 0.0, "backwash_volume": 0.0, "energy": 0.0,
+            "flux_sum": 0.0, "tmp_sum": 0.0, "tmp_limit_steps": 0,
+            "max_tmp": 0.0, "min_flux": math.inf, "max_fouling": 0.0,
+            "backwash_count": 0, "cip_count": 0
+        }
+        trajectory = {"time_hours": [], "fouling_resistance": [], "transmembrane_pressure": [],
+                      "flux": [], "net_permeate": []}
+        previous_backwash = False
+        cumulative_permeate, final_fouling = 0.0, 0.0
+
+        for start in range(0, n_steps, CHUNK_STEPS):
+            t = np.arange(start, min(start + CHUNK_STEPS, n_steps)) * dt
+
+            # Phase of every time step
+            cips_done = np.floor(t / cip_period) if cip_enabled else np.zeros_like(t)
+            tau = t - cips_done * cip_period if cip_enabled else t
+            in_cip = tau >= cip_interval
+            cycles_done = np.floor(tau / cycle)
+            in_cycle = tau - cycles_done * cycle
+            filtering = ~in_cip & (in_cycle < filtration)
+            backwashing = ~in_cip & ~filtering
+
+            # Permanent fouling left after j CIPs: P_j = r^j P_0 + G Σ_{i=1..j} r^i
+            decay = residual ** cips_done
+            if residual < 1.0:
+                permanent = decay * initial_fouling + cip_gain * residual * (1 - decay) / (1 - residual)
+            else:
+                permanent = initial_fouling + cip_gain * cips_done
+
+            fouling = np.where(
+                in_cip,
+                permanent + cip_gain,
+                permanent + fouling_rate * (
+                    (1 - sim.backwash_efficiency) * filtration * cycles_done
+                    + np.minimum(in_cycle, filtration)
+                )
+            )
+            fouling = np.minimum(fouling, MAX_FOULING_RESISTANCE)
+            total_resistance = clean_resistance + fouling
+
+            if sim.operating_mode == "constant_pressure":
+                flux, _, _ = model.solve_flux(
+                    sim.transmembrane_pressure, viscosity, total_resistance,
+                    sim.crossflow_velocity, sim.feed_concentration
+                )
+                flux = np.minimum(flux, feed_limited_flux)
+                tmp = np.full_like(t, sim.transmembrane_pressure)
+            else:
+                flux = np.full_like(t, min(flux_target, feed_limited_flux))
+                tmp = flux * viscosity * total_resistance / 1e5 + osmotic_pressure
+            flux_lmh = np.where(filtering, flux * 3600, 0.0)  # L/m²/h
+            tmp = np.where(filtering, tmp, 0.0)
+
+            # Volumes (m³) and pumping energy (kWh) per step
+            permeate = flux_lmh * area / 1000 * dt
+            backwash = np.where(backwashing, backwash_flux * 3600 * area / 1000 * dt, 0.0)
+            backwash_tmp = backwash_flux * viscosity * total_resistance / 1e5
+            energy = (
+                np.where(filtering, tmp * 1e5 * sim.feed_flow * dt, 0.0)
+                + np.where(backwashing, backwash_tmp * 1e5 * backwash, 0.0)
+            ) / (PUMP_EFFICIENCY * 3.6e6)
+
+            # Backwash starts, carrying the last phase across chunk boundaries
+            shifted_backwash = np.concatenate(([previous_backwash], backwashing[:-1]))
+            previous_backwash = bool(backwashing[-1])
+
+            totals["filtering_steps"] += int(filtering.sum())
+            totals["gross_permeate"] += float(permeate.sum())
+            totals["backwash_volume"] += float(backwash.sum())
+            totals["energy"] += float(energy.sum())
+            totals["flux_sum"] += float(flux_lmh.sum())
+            totals["tmp_sum"] += float(tmp.sum())
+            totals["tmp_limit_steps"] += int((tmp > settings.max_tmp).sum())
+            totals["max_tmp"] = max(totals["max_tmp"], float(tmp.max()))
+            if filtering.any():
+                totals["min_flux"] = min(totals["min_flux"], float(flux_lmh[filtering].min()))
+            totals["max_fouling"] = max(totals["max_fouling"], float(fouling.max()))
+            totals["backwash_count"] += int((backwashing & ~shifted_backwash).sum())
+            # CIPs started so far; a zero-duration CIP is never in_cip but still completes
+            totals["cip_count"] = int(cips_done[-1]) + bool(in_cip[-1])
+
+            final_fouling = float(fouling[-1])
+
+            # Trajectory bins: means over filtering steps, fouling over all steps
+            bin_starts, widths, sums = bins.add(start, {
+                "filtering": filtering.astype(float), "flux": flux_lmh, "tmp": tmp,
+                "fouling": fouling, "net": permeate - backwash
+            })
+            if bin_starts.size == 0:
+                continue
+            counts = sums["filtering"]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                flux_mean = np.where(counts > 0, sums["flux"] / counts, np.nan)
+                tmp_mean = np.where(counts > 0, sums["tmp"] / counts, np.nan)
+            net_cumulative = cumulative_permeate + np.cumsum(sums["net"])
+            cumulative_permeate = float(net_cumulative[-1])
+
+            trajectory["time_hours"].extend(np.round(bin_starts * dt, 4).tolist())
+            trajectory["fouling_resistance"].extend((sums["fouling"] / widths).tolist())
+            trajectory["flux"].extend(self._nan_to_none(np.round(flux_mean, 2)))
+            trajectory["transmembrane_pressure"].extend(self._nan_to_none(np.round(tmp_mean, 4)))
+            trajectory["net_permeate"].extend(np.round(net_cumulative, 3).tolist())
+
+        filtering_steps = totals["filtering_steps"]
+        net_permeate = totals["gross_permeate"] - totals["backwash_volume"]
+        feed_volume = sim.feed_flow * filtering_steps * dt
+
+        kpis = {
+            "horizon_hours": round(n_steps * dt, 4),
+            "time_steps": n_steps,
+            "availability": round(filtering_steps / n_steps * 100, 2),  # %
+            "gross_permeate": round(totals["gross_permeate"], 3),  # m³
+            "backwash_volume": round(totals["backwash_volume"], 3),  # m³
+            "net_permeate": round(net_permeate, 3),  # m³
+            "net_recovery": round(net_permeate / feed_volume * 100, 2) if feed_volume > 0 else 0.0,  # %
+            "average_flux": round(totals["flux_sum"] / filtering_steps, 2) if filtering_steps else 0.0,  # L/m²/h
+            "minimum_flux": round(totals["min_flux"], 2) if filtering_steps else 0.0,  # L/m²/h
+            "average_tmp": round(totals["tmp_sum"] / filtering_steps, 4) if filtering_steps else 0.0,  # bar
+            "maximum_tmp": round(totals["max_tmp"], 4),  # bar
+            "hours_above_max_tmp": round(totals["tmp_limit_steps"] * dt, 2),  # h
+            "final_fouling_resistance": final_fouling,  # m⁻¹ at the last time step
+            "maximum_fouling_resistance": totals["max_fouling"],  # m⁻¹
+            "energy_consumption": round(totals["energy"], 2),  # kWh
+            "specific_energy": round(totals["energy"] / net_permeate, 4) if net_permeate > 0 else None,  # kWh/m³
+            "backwash_count": totals["backwash_count"],
+            "cip_count": totals["cip_count"]
+        }
+
+        return {"kpis": kpis, "trajectories": trajectory}
+
+    @staticmethod
+    def _nan_to_none(values: np.ndarray) -> List[Optional[float]]:
+        """JSON-safe list with gaps for bins without filtration"""
+        return [None if math.isnan(v) else v for v in values.tolist()]
@@ -0,0 +1,81 @@
+"""
+Incremental Flowsheet Re-solve
+Diffs a flowsheet against the last solved version and tracks per-session solve state
+"""
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Set, Tuple
+from .mass_balance import FlowsheetData, MassBalanceResult, SolverOptions
+from .stream_table import STREAM_PROPERTIES
+
+
+def find_dirty_units(previous: FlowsheetData, current: FlowsheetData) -> Optional[Set[str]]:
+    """Units whose inputs changed since the previous solve
+
+    Returns None when the topology changed and a full solve is required.
+    Unit-produced streams are ignored since they are solver outputs.
+    """
+    if previous.equipment.keys() != current.equipment.keys():
+        return None
+    if previous.streams.keys() != current.streams.keys():
+        return None
+
+    dirty = set()
+    produced = set()
+
+    for eq_id, unit in current.equipment.items():
+        old = previous.equipment[eq_id]
+        if (unit.equipment_type != old.equipment_type
+                or unit.inlet_streams != old.inlet_streams
+                or unit.outlet_streams != old.outlet_streams):
+            return None
+        if unit.config != old.config:
+            dirty.add(eq_id)
+        produced.update(unit.outlet_streams)
+
+    # Changed feed streams dirty the units they feed
+    for stream_id, stream in current.streams.items():
+        if stream_id in produced:
+            continue
+        old = previous.streams[stream_id]
+        if any(getattr(stream, prop) != getattr(old, prop) for prop in STREAM_PROPERTIES):
+            dirty.update(
+                eq_id for eq_id, unit in current.equipment.items() if stream_id in unit.inlet_streams
+            )
+
+    return dirty
+
+
+def same_solution_options(previous: SolverOptions, current: SolverOptions) -> bool:
+    """Whether a solution found under the previous options stands under the current ones"""
+    exclude = {"session_id", "trace"}  # neither changes the solution
+    return previous.model_dump(exclude=exclude) == current.model_dump(exclude=exclude)
+
+
+class IncrementalSolveCache:
+    """Last converged flowsheet, result and solver options per editing session (LRU bounded)"""
+
+    def __init__(self, max_sessions: int = 64):
+        self.max_sessions = max_sessions
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, session_id: str) -> Optional[Tuple[FlowsheetData, MassBalanceResult, SolverOptions]]:
+        """Return the last solved (flowsheet, result, options) for a session"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                self._entries.move_to_end(session_id)
+            return entry
+
+    def put(self, session_id: str, flowsheet: FlowsheetData, result: MassBalanceResult,
+            options: SolverOptions):
+        """Store the solved state for a session, evicting the least recently used"""
+        with self._lock:
+            self._entries[session_id] = (flowsheet, result, options)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+
+
+incremental_cache = IncrementalSolveCache()
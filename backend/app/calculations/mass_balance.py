@@ -3,9 +3,33 @@ Mass Balance Solver for Water Treatment Flowsheet
 Solves simultaneous mass balance equations for entire process flowsheet
 """
 import numpy as np
-from typing import Dict, Any, List, Tuple
+from time import perf_counter, perf_counter_ns
+from typing import Dict, Any, Callable, List, Literal, Optional, Set, Tuple
 from pydantic import BaseModel
+from ..models.registry import ModelPool
+from ..utils.metrics import ITERATION_BUCKETS, metrics
+from ..utils.timing import PhaseTimer, current_timer
+from ..utils.trace import SolverTrace, TraceEntry, TraceLevel
 from ..utils.validation import EngineeringError
+from .convergence import CONVERGENCE_METHODS
+from .equation_oriented import EquationOrientedSolver
+from .stream_table import (
+    COLUMN, FLOW, NON_NEGATIVE, PRESSURE, QUALITY_COLUMNS, QUALITY_PARAMETERS, TEMPERATURE, StreamTable
+)
+from .topology import (
+    CalculationBlock, SolvePlan, build_equipment_graph, calculation_blocks, downstream_units
+)
+
+
+SOLVES = metrics.counter(
+    "solver_solves_total", "Flowsheet solves by outcome (converged, not_converged, failed)",
+    ("mode", "method", "outcome")
+)
+SOLVER_ITERATIONS = metrics.histogram(
+    "solver_iterations", "Convergence iterations per completed flowsheet solve", ("mode", "method"),
+    ITERATION_BUCKETS
+)
+SOLVE_SECONDS = metrics.histogram("solver_duration_seconds", "Flowsheet solve wall time", ("mode",))
 
 
 class StreamData(BaseModel):
@@ -53,6 +77,16 @@ class FlowsheetData(BaseModel):
     connections: Dict[str, Dict[str, str]]
 
 
+class SolverOptions(BaseModel):
+    """Per-request solver options"""
+    tolerance: float = 1e-6
+    max_iterations: int = 100
+    convergence_method: Literal["direct", "wegstein", "broyden"] = "wegstein"
+    mode: Literal["sequential_modular", "equation_oriented"] = "sequential_modular"
+    session_id: Optional[str] = None  # enables incremental re-solve against the last solved state
+    trace: Optional[TraceLevel] = None  # return a per-iteration trace with the result
+
+
 class MassBalanceResult(BaseModel):
     """Mass balance calculation result"""
     success: bool
@@ -62,73 +96,146 @@ class MassBalanceResult(BaseModel):
     streams: Dict[str, StreamData] = {}
     equipment_results: Dict[str, Dict[str, Any]] = {}
     errors: List[EngineeringError] = []
+    trace: List[TraceEntry] = []
+
+
+class EquipmentCalculationError(Exception):
+    """Raised when a single equipment unit fails during the flowsheet solve"""
+    
+    def __init__(self, equipment_id: str, message: str):
+        super().__init__(message)
+        self.equipment_id = equipment_id
+
+
+class ProgressAbort(Exception):
+    """Carries an exception raised by the progress callback out of the solver"""
+    
+    def __init__(self, reason: Exception):
+        super().__init__(str(reason))
+        self.reason = reason
 
 
 class MassBalanceSolver:
-    """Professional mass balance solver for water treatment processes"""
+    """Professional mass balance solver for water treatment processes
+    
+    An optional progress callback receives (iteration, max_error) after every
+    block and convergence iteration; exceptions it raises abort the solve.
+    """
     
-    def __init__(self, tolerance: float = 1e-6, max_iterations: int = 100):
+    def __init__(self, tolerance: float = 1e-6, max_iterations: int = 100,
+                 convergence_method: str = "wegstein", mode: str = "sequential_modular",
+                 trace: Optional[str] = None,
+                 progress: Optional[Callable[[int, float], None]] = None):
         self.tolerance = tolerance
         self.max_iterations = max_iterations
+        self.convergence_method = convergence_method
+        self.mode = mode
+        self.trace_level = trace
+        self.trace: Optional[SolverTrace] = None
+        self.timer: Optional[PhaseTimer] = None
+        self.progress = progress
+        self.model_pool = ModelPool()
     
-    def solve_flowsheet(self, flowsheet: FlowsheetData) -> MassBalanceResult:
-        """Solve complete flowsheet mass balance"""
+    def solve_flowsheet(self, flowsheet: FlowsheetData, previous: Optional[MassBalanceResult] = None,
+                        dirty: Optional[Set[str]] = None,
+                        plan: Optional[SolvePlan] = None) -> MassBalanceResult:
+        """Solve complete flowsheet mass balance
+        
+        Given the previous result and the units changed since, only the units
+        downstream of the edit (whole recycle loops included) are re-evaluated.
+        A solve plan built for the same topology skips the graph analysis.
+        """
+        started = perf_counter()
+        result = self._solve(flowsheet, previous, dirty, plan)
+        
+        if not result.success:
+            SOLVES.inc(self.mode, self.convergence_method, "failed")
+        else:
+            SOLVES.inc(self.mode, self.convergence_method, "converged" if result.converged else "not_converged")
+            SOLVER_ITERATIONS.observe(result.iterations, self.mode, self.convergence_method)
+        SOLVE_SECONDS.observe(perf_counter() - started, self.mode)
+        return result
+    
+    def _solve(self, flowsheet: FlowsheetData, previous: Optional[MassBalanceResult],
+               dirty: Optional[Set[str]], plan: Optional[SolvePlan]) -> MassBalanceResult:
+        """Solve, reporting unit and solver failures in the result (progress aborts propagate)"""
         try:
-            # Initialize streams
-            streams = dict(flowsheet.streams)
+            # Model instances are reused across iterations of this solve only
+            self.model_pool = ModelPool()
+            self.trace = SolverTrace(self.trace_level) if self.trace_level else None
+            # Phase timings of a timed request; like the trace, None costs one check per hook
+            self.timer = current_timer()
+            
+            # Initialize columnar stream state; StreamData is rebuilt only for the result
+            streams = StreamTable.from_streams(flowsheet.streams)
             equipment_results = {}
             
-            # Iterative solution
-            converged = False
-            iteration = 0
-            max_error = float('inf')
+            # Sequential-modular blocks: single units and torn recycle loops
+            if plan is not None and plan.stream_ids == streams.stream_ids:
+                blocks = list(plan.blocks)
+            else:
+                blocks = calculation_blocks(flowsheet.equipment, streams.stream_ids)
             
-            while not converged and iteration < self.max_iterations:
-                streams_old = {k: v.flow_rate for k, v in streams.items()}
-                
-                # Update each equipment unit
-                for eq_id, equipment in flowsheet.equipment.items():
-                    try:
-                        result = self._solve_equipment(equipment, streams)
-                        equipment_results[eq_id] = result
-                        
-                        # Update outlet streams
-                        self._update_outlet_streams(equipment, result, streams)
-                        
-                    except Exception as e:
-                        return MassBalanceResult(
-                            success=False,
-                            errors=[EngineeringError(
-                                code="EQUIPMENT_CALC_ERROR",
-                                message=f"Equipment {eq_id} calculation failed: {str(e)}",
-                                equipment_id=eq_id,
-                                severity="error"
-                            )]
-                        )
-                
-                # Check convergence
-                max_error = 0.0
-                for stream_id in streams:
-                    if stream_id in streams_old:
-                        error = abs(streams[stream_id].flow_rate - streams_old[stream_id])
-                        max_error = max(max_error, error)
-                
-                converged = max_error < self.tolerance
-                iteration += 1
+            reused = False
+            if previous is not None and dirty is not None:
+                remaining = self._reuse_previous_state(
+                    flowsheet, blocks, previous, dirty, streams, equipment_results
+                )
+                reused = len(remaining) < len(blocks)
+                blocks = remaining
+            
+            if self.mode == "equation_oriented":
+                # One ordered pass with tear streams at their guesses initializes Newton
+                for block in blocks:
+                    self._solve_units(block.units, flowsheet, streams, equipment_results)
+                converged, iterations, max_error = EquationOrientedSolver(
+                    self, flowsheet, streams
+                ).solve(equipment_results)
+            else:
+                converged, iterations, max_error = self._solve_sequential_modular(
+                    blocks, flowsheet, streams, equipment_results
+                )
+                if reused:
+                    # Blocks kept from the previous solve keep its convergence state
+                    converged = converged and previous.converged
+                    max_error = max(max_error, previous.max_error)
+                    if not blocks:
+                        iterations = 0
             
             # Validate mass balance
+            started_ns = perf_counter_ns() if self.timer is not None else 0
             balance_errors = self._validate_mass_balance(flowsheet, streams)
+            if self.timer is not None:
+                self.timer.add("balance_check", perf_counter_ns() - started_ns)
             
             return MassBalanceResult(
                 success=True,
                 converged=converged,
-                iterations=iteration,
+                iterations=iterations,
                 max_error=max_error,
-                streams=streams,
-                equipment_results=equipment_results,
-                errors=balance_errors
+                streams=streams.to_stream_data(flowsheet.streams),
+                equipment_results={
+                    eq_id: equipment_results[eq_id]
+                    for eq_id in flowsheet.equipment if eq_id in equipment_results
+                },
+                errors=balance_errors,
+                trace=self.trace.entries if self.trace is not None else []
             )
             
+        except EquipmentCalculationError as e:
+            return MassBalanceResult(
+                success=False,
+                errors=[EngineeringError(
+                    code="EQUIPMENT_CALC_ERROR",
+                    message=f"Equipment {e.equipment_id} calculation failed: {str(e)}",
+                    equipment_id=e.equipment_id,
+                    severity="error"
+                )]
+            )
+        
+        except ProgressAbort as e:
+            raise e.reason
+        
         except Exception as e:
             return MassBalanceResult(
                 success=False,
@@ -139,41 +246,135 @@ class MassBalanceSolver:
                 )]
             )
     
-    def _solve_equipment(self, equipment: EquipmentData, streams: Dict[str, StreamData]) -> Dict[str, Any]:
-        """Solve individual equipment unit"""
-        from ..models.ultrafiltration import UltrafiltrationModel
+    def _reuse_previous_state(self, flowsheet: FlowsheetData, blocks: List[CalculationBlock],
+                              previous: MassBalanceResult, dirty: Set[str],
+                              streams: StreamTable,
+                              equipment_results: Dict[str, Dict[str, Any]]) -> List[CalculationBlock]:
+        """Seed streams and results from the previous solve; return the blocks still to solve"""
+        graph = build_equipment_graph(flowsheet.equipment, streams.stream_ids)
+        affected = downstream_units(graph, dirty)
+        
+        # Unit-produced streams start from the previous solution (warm start for loops)
+        for equipment in flowsheet.equipment.values():
+            for stream_id in equipment.outlet_streams:
+                if stream_id in streams.index and stream_id in previous.streams:
+                    streams.load(stream_id, previous.streams[stream_id])
         
+        equipment_results.update({
+            eq_id: result for eq_id, result in previous.equipment_results.items()
+            if eq_id in flowsheet.equipment and eq_id not in affected
+        })
+        
+        return [block for block in blocks if affected.intersection(block.units)]
+    
+    def _solve_sequential_modular(self, blocks: List[CalculationBlock], flowsheet: FlowsheetData,
+                                  streams: StreamTable,
+                                  equipment_results: Dict[str, Dict[str, Any]]) -> Tuple[bool, int, float]:
+        """Solve blocks in order, converging recycle loops on their tear streams"""
+        converged = True
+        iterations = 1
+        max_error = 0.0
+        
+        for block in blocks:
+            if not block.tear_streams:
+                # Acyclic units are exact after a single ordered pass
+                self._solve_units(block.units, flowsheet, streams, equipment_results)
+                self._report_progress(iterations, max_error)
+                continue
+            
+            block_converged, block_iterations, block_error = self._converge_recycle(
+                block, flowsheet, streams, equipment_results
+            )
+            converged = converged and block_converged
+            iterations = max(iterations, block_iterations)
+            max_error = max(max_error, block_error)
+        
+        return converged, iterations, max_error
+    
+    def _report_progress(self, iteration: int, max_error: float):
+        """Forward progress to the callback; its exceptions abort the solve"""
+        if self.progress is None:
+            return
+        try:
+            self.progress(iteration, max_error)
+        except Exception as e:
+            raise ProgressAbort(e) from e
+    
+    def _solve_units(self, units: List[str], flowsheet: FlowsheetData,
+                     streams: StreamTable, equipment_results: Dict[str, Dict[str, Any]]):
+        """Evaluate units in order, propagating results to their outlet streams"""
+        trace = self.trace
+        for eq_id in units:
+            started = perf_counter() if trace is not None else 0.0
+            equipment = flowsheet.equipment[eq_id]
+            try:
+                result = self._solve_equipment(equipment, streams)
+            except Exception as e:
+                raise EquipmentCalculationError(eq_id, str(e)) from e
+            
+            equipment_results[eq_id] = result
+            self._update_outlet_streams(equipment, result, streams)
+            
+            if trace is not None:
+                trace.unit(eq_id, started)
+    
+    def _converge_recycle(self, block: CalculationBlock, flowsheet: FlowsheetData,
+                          streams: StreamTable,
+                          equipment_results: Dict[str, Dict[str, Any]]) -> Tuple[bool, int, float]:
+        """Converge a recycle loop on its tear streams"""
+        rows = streams.rows(block.tear_streams)
+        x = streams.data[rows].ravel()
+        accelerator = CONVERGENCE_METHODS[self.convergence_method](x.size)
+        non_negative = np.tile(NON_NEGATIVE, len(rows))
+        error = float('inf')
+        trace = self.trace
+        timer = self.timer
+        
+        for iteration in range(1, self.max_iterations + 1):
+            if trace is not None:
+                trace.iteration = iteration
+                started = perf_counter()
+            if timer is not None:
+                started_ns = perf_counter_ns()
+            
+            streams.data[rows] = x.reshape(len(rows), -1)
+            self._solve_units(block.units, flowsheet, streams, equipment_results)
+            gx = streams.data[rows].ravel()
+            
+            error = float(np.max(np.abs(gx - x)))
+            if trace is not None:
+                trace.step(f"tear:{','.join(block.tear_streams)}", error, started)
+            if timer is not None:
+                timer.add("convergence", perf_counter_ns() - started_ns)
+            self._report_progress(iteration, error)
+            if error < self.tolerance:
+                return True, iteration, error
+            
+            x = accelerator.next(x, gx)
+            x[non_negative] = np.maximum(x[non_negative], 0.0)
+        
+        return False, self.max_iterations, error
+    
+    def _solve_equipment(self, equipment: EquipmentData, streams: StreamTable) -> Dict[str, Any]:
+        """Solve individual equipment unit"""
         # Get inlet stream data
         inlet_data = {}
         total_inlet_flow = 0.0
         
         for stream_id in equipment.inlet_streams:
-            if stream_id in streams:
-                stream = streams[stream_id]
-                inlet_data[f"{stream.source_port}_flow"] = stream.flow_rate
-                inlet_data[f"{stream.source_port}_pressure"] = stream.pressure
-                inlet_data[f"{stream.source_port}_temperature"] = stream.temperature
-                total_inlet_flow += stream.flow_rate
+            if stream_id in streams.index:
+                i = streams.index[stream_id]
+                row = streams.data[i]
+                port = streams.source_ports[i]
+                flow_rate = float(row[FLOW])
+                inlet_data[f"{port}_flow"] = flow_rate
+                inlet_data[f"{port}_pressure"] = float(row[PRESSURE])
+                inlet_data[f"{port}_temperature"] = float(row[TEMPERATURE])
+                total_inlet_flow += flow_rate
                 
                 # Pass water quality parameters for feed streams
-                if stream.source_port == "inlet" or "feed" in stream.source_port:
-                    inlet_data.update({
-                        "turbidity": stream.turbidity,
-                        "tss": stream.tss,
-                        "tds": stream.tds,
-                        "fog": stream.fog,
-                        "bod": stream.bod,
-                        "cod": stream.cod,
-                        "ph": stream.ph,
-                        "alkalinity": stream.alkalinity,
-                        "hardness": stream.hardness,
-                        "chloride": stream.chloride,
-                        "sulfate": stream.sulfate,
-                        "nitrate": stream.nitrate,
-                        "phosphate": stream.phosphate,
-                        "iron": stream.iron,
-                        "manganese": stream.manganese
-                    })
+                if port == "inlet" or "feed" in port:
+                    inlet_data.update(zip(QUALITY_PARAMETERS, row[QUALITY_COLUMNS].tolist()))
         
         # Combine inlet data with equipment configuration
         calc_inputs = {**equipment.config, **inlet_data}
@@ -182,135 +383,80 @@ class MassBalanceSolver:
         if "feed_flow" not in calc_inputs and total_inlet_flow > 0:
             calc_inputs["feed_flow"] = total_inlet_flow
         
-        # Calculate based on equipment type
-        if equipment.equipment_type == "ultrafiltration":
-            model = UltrafiltrationModel(equipment.equipment_id)
-            result = model.calculate_performance(calc_inputs)
-            
-            if result.success:
-                return result.data
-            else:
-                raise Exception(f"UF calculation failed: {[e.message for e in result.errors]}")
+        calc_inputs["total_inlet_flow"] = total_inlet_flow
         
-        elif equipment.equipment_type == "feed_tank":
-            from ..models.feed_tank import FeedTankModel
-            model = FeedTankModel(equipment.equipment_id)
-            result = model.calculate_performance(calc_inputs)
-            
-            if result.success:
-                # For feed tanks, we need to ensure the water quality gets propagated
-                result_data = result.data
-                print(f"Feed tank {equipment.equipment_id} calculation result:", result_data)
-                return result_data
-            else:
-                raise Exception(f"Feed tank calculation failed: {[e.message for e in result.errors]}")
+        # Dispatch to the registered model for this equipment type
+        model = self.model_pool.get(equipment.equipment_id, equipment.equipment_type)
+        started_ns = perf_counter_ns() if self.timer is not None else 0
+        result = model.calculate_performance(calc_inputs)
+        if self.timer is not None:
+            self.timer.add("model", perf_counter_ns() - started_ns)
         
-        elif equipment.equipment_type == "tank":
-            # Simple tank model - outlet = inlet
-            return {
-                "outlet_flow": total_inlet_flow,
-                "outlet_pressure": calc_inputs.get("pressure", 1.0),
-                "outlet_temperature": calc_inputs.get("temperature", 25.0)
-            }
-        
-        elif equipment.equipment_type == "pump":
-            # Simple pump model
-            pump_efficiency = calc_inputs.get("efficiency", 0.75)
-            discharge_pressure = calc_inputs.get("discharge_pressure", 3.0)
-            
-            return {
-                "discharge_flow": total_inlet_flow,
-                "discharge_pressure": discharge_pressure,
-                "power_consumption": self._calculate_pump_power(
-                    total_inlet_flow, discharge_pressure, pump_efficiency
-                )
-            }
+        if not result.success:
+            raise Exception(
+                f"{equipment.equipment_type} calculation failed: {[e.message for e in result.errors]}"
+            )
         
-        else:
-            # Generic equipment - outlet = inlet
-            return {
-                "outlet_flow": total_inlet_flow,
-                "outlet_pressure": calc_inputs.get("pressure", 1.0),
-                "outlet_temperature": calc_inputs.get("temperature", 25.0)
-            }
+        return result.data
     
     def _update_outlet_streams(self, equipment: EquipmentData, result: Dict[str, Any], 
-                              streams: Dict[str, StreamData]):
+                              streams: StreamTable):
         """Update outlet stream flows based on equipment calculation"""
-        
-        print(f"Updating outlet streams for {equipment.equipment_id}")
-        print(f"Outlet streams: {equipment.outlet_streams}")
-        print(f"Result data: {result}")
-        
         for stream_id in equipment.outlet_streams:
-            if stream_id in streams:
-                stream = streams[stream_id]
-                print(f"Updating stream {stream_id}, source_port: {stream.source_port}")
+            if stream_id in streams.index:
+                i = streams.index[stream_id]
+                row = streams.data[i]
+                source_port = streams.source_ports[i]
                 
                 # Map calculation results to stream properties
-                if stream.source_port == "permeate_outlet" and "permeate_flow" in result:
-                    stream.flow_rate = result["permeate_flow"]
+                if source_port == "permeate_outlet" and "permeate_flow" in result:
+                    row[FLOW] = result["permeate_flow"]
                     # Update permeate water quality if available
                     if "permeate_quality" in result:
-                        self._update_stream_quality(stream, result["permeate_quality"])
-                elif stream.source_port == "concentrate_outlet" and "concentrate_flow" in result:
-                    stream.flow_rate = result["concentrate_flow"]
+                        self._update_stream_quality(row, result["permeate_quality"])
+                elif source_port == "concentrate_outlet" and "concentrate_flow" in result:
+                    row[FLOW] = result["concentrate_flow"]
                     # Update concentrate water quality if available
                     if "concentrate_quality" in result:
-                        self._update_stream_quality(stream, result["concentrate_quality"])
-                elif stream.source_port == "discharge" and "discharge_flow" in result:
-                    stream.flow_rate = result["discharge_flow"]
-                    stream.pressure = result.get("discharge_pressure", stream.pressure)
+                        self._update_stream_quality(row, result["concentrate_quality"])
+                elif source_port == "discharge" and "discharge_flow" in result:
+                    row[FLOW] = result["discharge_flow"]
+                    row[PRESSURE] = result.get("discharge_pressure", row[PRESSURE])
                 elif "outlet_flow" in result:
-                    stream.flow_rate = result["outlet_flow"]
+                    row[FLOW] = result["outlet_flow"]
                     # Update outlet quality for feed tanks and simple equipment
                     if "outlet_quality" in result:
-                        print(f"Updating stream quality with: {result['outlet_quality']}")
-                        self._update_stream_quality(stream, result["outlet_quality"])
+                        self._update_stream_quality(row, result["outlet_quality"])
                 
                 # Update other properties
-                stream.pressure = result.get("outlet_pressure", stream.pressure)
-                stream.temperature = result.get("outlet_temperature", stream.temperature)
-                
-                print(f"Stream {stream_id} updated - flow: {stream.flow_rate}, turbidity: {stream.turbidity}")
+                row[PRESSURE] = result.get("outlet_pressure", row[PRESSURE])
+                row[TEMPERATURE] = result.get("outlet_temperature", row[TEMPERATURE])
     
-    def _update_stream_quality(self, stream: StreamData, quality_data: Dict[str, Any]):
-        """Update stream water quality parameters"""
-        for param in ["turbidity", "tss", "tds", "fog", "bod", "cod", "ph", 
-                     "alkalinity", "hardness", "chloride", "sulfate", "nitrate", 
-                     "phosphate", "iron", "manganese"]:
+    def _update_stream_quality(self, row: np.ndarray, quality_data: Dict[str, Any]):
+        """Update stream water quality parameters in a stream table row"""
+        for param in QUALITY_PARAMETERS:
             if param in quality_data:
-                setattr(stream, param, quality_data[param])
-    
-    def _calculate_pump_power(self, flow_rate: float, head: float, efficiency: float) -> float:
-        """Calculate pump power consumption (kW)"""
-        # Power = ρ × g × Q × H / η
-        density = 1000  # kg/m³
-        gravity = 9.81  # m/s²
-        flow_m3_s = flow_rate / 3600  # m³/s
-        head_m = head * 10.2  # bar to m
-        
-        power_kw = (density * gravity * flow_m3_s * head_m) / (efficiency * 1000)
-        return max(power_kw, 0.0)
+                row[COLUMN[param]] = quality_data[param]
     
     def _validate_mass_balance(self, flowsheet: FlowsheetData, 
-                              streams: Dict[str, StreamData]) -> List[EngineeringError]:
+                              streams: StreamTable) -> List[EngineeringError]:
         """Validate overall mass balance"""
         errors = []
+        flows = streams.data[:, FLOW]
         
         # Check each equipment for mass balance
         for eq_id, equipment in flowsheet.equipment.items():
-            inlet_flow = sum(
-                streams[stream_id].flow_rate 
+            inlet_flow = float(sum(
+                flows[streams.index[stream_id]] 
                 for stream_id in equipment.inlet_streams 
-                if stream_id in streams
-            )
+                if stream_id in streams.index
+            ))
             
-            outlet_flow = sum(
-                streams[stream_id].flow_rate 
+            outlet_flow = float(sum(
+                flows[streams.index[stream_id]] 
                 for stream_id in equipment.outlet_streams 
-                if stream_id in streams
-            )
+                if stream_id in streams.index
+            ))
             
             if inlet_flow > 0:  # Avoid division by zero
                 balance_error = abs(inlet_flow - outlet_flow) / inlet_flow * 100
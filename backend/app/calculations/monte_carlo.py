@@ -0,0 +1,258 @@
+"""
+Monte Carlo Feed Quality Uncertainty
+Correlated sampling of feed water quality propagated through the flowsheet
+"""
+import numpy as np
+from scipy.special import ndtr
+from typing import Any, Callable, Dict, List, Literal, Optional
+from pydantic import BaseModel
+from ..config import settings
+from ..models.feed_tank import FOULING_LEVELS, WaterQuality
+from .mass_balance import FlowsheetData, SolverOptions
+from .stream_table import COLUMN, NON_NEGATIVE
+from .sweep import ParameterSweep, SweepRequest, parse_parameter
+
+
+class Distribution(BaseModel):
+    """Marginal distribution of one uncertain input"""
+    distribution: Literal["normal", "lognormal", "uniform", "triangular"] = "lognormal"
+    mean: Optional[float] = None  # normal/lognormal; defaults to the nominal flowsheet value
+    std: Optional[float] = None  # normal/lognormal
+    cv: Optional[float] = None  # std / mean, alternative to std
+    low: Optional[float] = None  # uniform/triangular
+    high: Optional[float] = None
+    mode: Optional[float] = None  # triangular
+
+
+class Correlation(BaseModel):
+    """Correlation of the normal scores (Gaussian copula) of two uncertain inputs"""
+    first: str
+    second: str
+    coefficient: float
+
+
+class MonteCarloRequest(BaseModel):
+    """Monte Carlo propagation of uncertain feed quality"""
+    flowsheet: FlowsheetData
+    solver_options: SolverOptions = SolverOptions()
+    feed_equipment: Optional[str] = None  # feed tank to perturb (default: the only feed tank)
+    # WaterQuality field (e.g. "tss") or any sweep parameter path -> distribution
+    distributions: Dict[str, Distribution]
+    correlations: List[Correlation] = []
+    samples: int = 10_000
+    seed: int = 0
+    percentiles: List[float] = [5, 50, 95]
+
+
+def correlation_matrix(names: List[str], correlations: List[Correlation]) -> np.ndarray:
+    """Correlation matrix, projected to the nearest valid one if the input is inconsistent"""
+    index = {name: i for i, name in enumerate(names)}
+    matrix = np.eye(len(names))
+    for correlation in correlations:
+        for name in (correlation.first, correlation.second):
+            if name not in index:
+                raise ValueError(f"Correlation refers to '{name}', which has no distribution")
+        if not -1 <= correlation.coefficient <= 1:
+            raise ValueError(f"Correlation {correlation.coefficient} outside [-1, 1]")
+        i, j = index[correlation.first], index[correlation.second]
+        matrix[i, j] = matrix[j, i] = correlation.coefficient
+
+    # Clip negative eigenvalues, then rescale to a unit diagonal
+    eigenvalues, eigenvectors = np.linalg.eigh(matrix)
+    if eigenvalues.min() < 1e-10:
+        matrix = eigenvectors @ np.diag(np.maximum(eigenvalues, 1e-10)) @ eigenvectors.T
+        scale = np.sqrt(np.diag(matrix))
+        matrix = matrix / np.outer(scale, scale)
+    return matrix
+
+
+def sample_marginal(spec: Distribution, nominal: float, z: np.ndarray) -> np.ndarray:
+    """Transform standard normal scores into samples of the given marginal"""
+    mean = spec.mean if spec.mean is not None else nominal
+    std = spec.std if spec.std is not None else abs(mean) * (spec.cv if spec.cv is not None else 0.0)
+
+    if spec.distribution == "normal":
+        return mean + std * z
+
+    if spec.distribution == "lognormal":
+        if mean <= 0:
+            raise ValueError("Lognormal mean must be positive")
+        sigma2 = np.log1p((std / mean) ** 2)
+        return np.exp(np.log(mean) - sigma2 / 2 + np.sqrt(sigma2) * z)
+
+    if spec.low is None or spec.high is None or spec.high < spec.low:
+        raise ValueError(f"{spec.distribution} distribution needs low <= high")
+    u = ndtr(z)
+    if spec.distribution == "uniform":
+        return spec.low + (spec.high - spec.low) * u
+
+    # Triangular inverse CDF
+    mode = spec.mode if spec.mode is not None else (spec.low + spec.high) / 2
+    if not spec.low <= mode <= spec.high:
+        raise ValueError("Triangular mode must lie between low and high")
+    width = spec.high - spec.low
+    split = (mode - spec.low) / width if width > 0 else 0.5
+    return np.where(
+        u < split,
+        spec.low + np.sqrt(u * width * (mode - spec.low)),
+        spec.high - np.sqrt((1 - u) * width * (spec.high - mode))
+    )
+
+
+class MonteCarloAnalysis:
+    """Samples uncertain inputs with a Gaussian copula and solves every sample
+
+    Marginals are drawn from correlated standard normal scores (Cholesky of the
+    correlation matrix) in one vectorized pass. The samples are solved as a
+    zipped parameter sweep, so the solve plan is built once and sample blocks
+    fan out across the sweep process pool. A fixed seed reproduces the run.
+    """
+
+    def __init__(self, request: MonteCarloRequest):
+        self.request = request
+        if not 1 <= request.samples <= settings.monte_carlo_max_samples:
+            raise ValueError(f"Samples must be between 1 and {settings.monte_carlo_max_samples}")
+        if not request.distributions:
+            raise ValueError("At least one distribution is required")
+
+        flowsheet = request.flowsheet
+        self.feed_equipment = request.feed_equipment or self._single_feed_tank()
+        if self.feed_equipment not in flowsheet.equipment:
+            raise ValueError(f"Unknown feed equipment '{self.feed_equipment}'")
+
+        self.names = list(request.distributions)
+        self.paths = [self._parameter_path(name) for name in self.names]
+        for path in self.paths:
+            parse_parameter(path, flowsheet)
+        self.clipped: Dict[str, int] = {}  # samples raised to 0 per input, set by sample()
+
+    def _single_feed_tank(self) -> str:
+        feed_tanks = [eq_id for eq_id, unit in self.request.flowsheet.equipment.items()
+                      if unit.equipment_type == "feed_tank"]
+        if len(feed_tanks) != 1:
+            raise ValueError("Specify feed_equipment: the flowsheet has "
+                             f"{len(feed_tanks)} feed tanks")
+        return feed_tanks[0]
+
+    def _parameter_path(self, name: str) -> str:
+        """WaterQuality fields map to the feed tank's water_quality config"""
+        if name in WaterQuality.model_fields:
+            return f"equipment.{self.feed_equipment}.config.water_quality.{name}"
+        return name
+
+    def _nominal(self, path: str) -> float:
+        """Current flowsheet value of a parameter path (model default if unset)"""
+        section, object_id, attribute = parse_parameter(path, self.request.flowsheet)
+        if section == "streams":
+            return float(getattr(self.request.flowsheet.streams[object_id], attribute[0]))
+        value: Any = self.request.flowsheet.equipment[object_id].config
+        for key in attribute[1:]:
+            value = value.get(key) if isinstance(value, dict) else None
+        if value is None and attribute[1:2] == ["water_quality"] and len(attribute) == 3:
+            value = WaterQuality.model_fields[attribute[2]].default
+        if value is None:
+            raise ValueError(f"'{path}' has no nominal value; give the distribution a mean or bounds")
+        return float(value)
+
+    def _non_negative(self, path: str) -> bool:
+        """Water quality and stream properties other than temperature cannot be negative"""
+        section, _, attribute = parse_parameter(path, self.request.flowsheet)
+        if section == "streams":
+            return bool(NON_NEGATIVE[COLUMN[attribute[0]]])
+        return attribute[1:2] == ["water_quality"] and len(attribute) == 3 and attribute[2] in WaterQuality.model_fields
+
+    def sample(self) -> np.ndarray:
+        """Correlated samples, one row per sample and one column per uncertain input"""
+        rng = np.random.default_rng(self.request.seed)
+        matrix = correlation_matrix(self.names, self.request.correlations)
+        z = rng.standard_normal((self.request.samples, len(self.names))) @ np.linalg.cholesky(matrix).T
+
+        columns = []
+        for j, (name, path) in enumerate(zip(self.names, self.paths)):
+            spec = self.request.distributions[name]
+            needs_nominal = spec.distribution in ("normal", "lognormal") and spec.mean is None
+            nominal = self._nominal(path) if needs_nominal else 0.0
+            values = sample_marginal(spec, nominal, z[:, j])
+            if self._non_negative(path):
+                # Only unbounded normal tails can go negative; clip and count them
+                negative = values < 0
+                self.clipped[name] = int(negative.sum())
+                values = np.where(negative, 0.0, values)
+            columns.append(values)
+        return np.column_stack(columns)
+
+    def run(self, progress: Optional[Callable[[int, float], None]] = None) -> Dict[str, Any]:
+        """Sample, solve every sample and summarize the output distributions"""
+        samples = self.sample()
+        flowsheet = self.request.flowsheet
+        uf_units = [eq_id for eq_id, unit in flowsheet.equipment.items()
+                    if unit.equipment_type == "ultrafiltration"]
+        pumps = [eq_id for eq_id, unit in flowsheet.equipment.items() if unit.equipment_type == "pump"]
+
+        outputs = (
+            [f"equipment_results.{self.feed_equipment}.sdi_estimate",
+             f"equipment_results.{self.feed_equipment}.fouling_potential",
+             "system_recovery"]
+            + [f"equipment_results.{eq_id}.{key}" for eq_id in uf_units
+               for key in ("permeate_flow", "energy_consumption")]
+            + [f"equipment_results.{eq_id}.power_consumption" for eq_id in pumps]
+        )
+        sweep = ParameterSweep(SweepRequest(
+            flowsheet=flowsheet,
+            solver_options=self.request.solver_options,
+            parameters={path: samples[:, j].tolist() for j, path in enumerate(self.paths)},
+            combine="zip",
+            outputs=outputs
+        ), max_scenarios=settings.monte_carlo_max_samples)
+        table = sweep.run(progress)
+
+        results = table["results"]
+        ok = np.array(table["success"], dtype=bool)
+
+        def column(name: str) -> np.ndarray:
+            return np.array([np.nan if v is None else v for v in results[name]], dtype=float)
+
+        permeate = [column(f"equipment_results.{eq_id}.permeate_flow") for eq_id in uf_units]
+        metrics = {
+            "sdi": column(f"equipment_results.{self.feed_equipment}.sdi_estimate"),
+            "system_recovery": column("system_recovery"),
+        }
+        if uf_units:
+            total_permeate = np.sum(permeate, axis=0)
+            metrics["permeate_flow"] = total_permeate
+            # Permeate-weighted specific energy over UF units (kWh/m³)
+            energy = [column(f"equipment_results.{eq_id}.energy_consumption") for eq_id in uf_units]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                metrics["specific_energy"] = np.sum(np.multiply(energy, permeate), axis=0) / total_permeate
+        if pumps:
+            metrics["pump_power"] = np.sum(
+                [column(f"equipment_results.{eq_id}.power_consumption") for eq_id in pumps], axis=0
+            )
+
+        fouling = np.array(results[f"equipment_results.{self.feed_equipment}.fouling_potential"], dtype=object)
+        valid = int(ok.sum())
+
+        return {
+            "samples": self.request.samples,
+            "failed_samples": self.request.samples - valid,
+            "seed": self.request.seed,
+            "clipped_samples": {name: count for name, count in self.clipped.items() if count},
+            "statistics": {name: self._summarize(values[ok]) for name, values in metrics.items()},
+            "fouling_potential": {
+                level: round(float(np.mean(fouling[ok] == level)), 4) if valid else None
+                for level in FOULING_LEVELS
+            },
+            "input_statistics": {name: self._summarize(samples[:, j]) for j, name in enumerate(self.names)}
+        }
+
+    def _summarize(self, values: np.ndarray) -> Dict[str, Optional[float]]:
+        """Mean, standard deviation and requested percentiles of a sample"""
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return {"mean": None, "std": None, **{f"p{p:g}": None for p in self.request.percentiles}}
+        quantiles = np.percentile(values, self.request.percentiles)
+        return {
+            "mean": round(float(values.mean()), 6),
+            "std": round(float(values.std()), 6),
+            **{f"p{p:g}": round(float(q), 6) for p, q in zip(self.request.percentiles, quantiles)}
+        }
@@ -0,0 +1,338 @@
+"""
+UF Pareto Front Generation
+Energy / membrane life / installed area trade-off by a vectorized island-model NSGA-II
+"""
+import math
+import numpy as np
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from pydantic import BaseModel
+from ..models.ultrafiltration import UltrafiltrationModel
+from ..config import settings
+from .sweep import sweep_executor, sweep_workers
+
+
+# Decision variables, in the column order of the scaled population
+VARIABLES = ["membrane_area", "transmembrane_pressure", "crossflow_velocity"]
+OBJECTIVES = ["energy_consumption", "membrane_life_prediction", "membrane_area"]
+
+SBX_ETA = 15.0  # simulated binary crossover distribution index
+MUTATION_ETA = 20.0  # polynomial mutation distribution index
+
+
+class ParetoRequest(BaseModel):
+    """UF multi-objective design problem and search settings"""
+    feed_flow: float  # m³/h
+    required_permeate: Optional[float] = None  # m³/h, constraint when given
+    temperature: float = 25.0  # °C
+    feed_concentration: float = 0.1  # g/L suspended solids
+    operating_hours: float = 0.0  # h (for fouling calculation)
+    membrane_type: str = "PVDF"
+    area_bounds: Tuple[float, float] = (10.0, 50_000.0)  # m²
+    tmp_bounds: Optional[Tuple[float, float]] = None  # bar (default: 0.05 to settings.max_tmp)
+    crossflow_bounds: Tuple[float, float] = (0.5, 4.0)  # m/s
+    population_size: int = 200  # per island
+    generations: int = 100
+    islands: Optional[int] = None  # default: one per sweep worker
+    migration_interval: int = 10  # generations between front updates and migrations
+    migrants: int = 10  # individuals each island receives from the archive per migration
+    archive_size: int = 200  # non-dominated points kept and streamed
+    seed: int = 0
+
+
+def constrained_dominance(objectives: np.ndarray, violation: np.ndarray) -> np.ndarray:
+    """Pairwise matrix, [i, j] true when i dominates j (feasibility first, then Pareto)"""
+    feasible = violation <= 0
+    # Objective by objective keeps every temporary two-dimensional
+    no_worse = np.ones((len(objectives), len(objectives)), dtype=bool)
+    better = np.zeros_like(no_worse)
+    for values in objectives.T:
+        no_worse &= values[:, None] <= values[None, :]
+        better |= values[:, None] < values[None, :]
+    both_feasible = feasible[:, None] & feasible[None, :]
+    both_infeasible = ~feasible[:, None] & ~feasible[None, :]
+    return (
+        (feasible[:, None] & ~feasible[None, :])
+        | (both_infeasible & (violation[:, None] < violation[None, :]))
+        | (both_feasible & no_worse & better)
+    )
+
+
+def nondominated_ranks(objectives: np.ndarray, violation: np.ndarray) -> np.ndarray:
+    """Front index of every point (0 = non-dominated), peeling whole fronts at once"""
+    dominates = constrained_dominance(objectives, violation)
+    dominated_by = dominates.sum(axis=0)
+    ranks = np.full(len(objectives), -1)
+    rank = 0
+    while np.any(ranks < 0):
+        front = (dominated_by == 0) & (ranks < 0)
+        ranks[front] = rank
+        dominated_by = dominated_by - dominates[front].sum(axis=0)
+        rank += 1
+    return ranks
+
+
+def crowding_distances(objectives: np.ndarray, ranks: np.ndarray) -> np.ndarray:
+    """NSGA-II crowding distance within each front (front ends are infinite)"""
+    n_points, n_objectives = objectives.shape
+    crowding = np.zeros(n_points)
+    n_ranks = ranks.max() + 1
+    for m in range(n_objectives):
+        values = objectives[:, m]
+        order = np.lexsort((values, ranks))
+        sorted_ranks, sorted_values = ranks[order], values[order]
+
+        low = np.full(n_ranks, np.inf)
+        high = np.full(n_ranks, -np.inf)
+        np.minimum.at(low, ranks, values)
+        np.maximum.at(high, ranks, values)
+        span = np.where(high > low, high - low, 1.0)[sorted_ranks]
+
+        distance = np.full(n_points, np.inf)
+        interior = np.zeros(n_points, dtype=bool)
+        interior[1:-1] = (sorted_ranks[:-2] == sorted_ranks[1:-1]) & (sorted_ranks[2:] == sorted_ranks[1:-1])
+        distance[1:-1] = (sorted_values[2:] - sorted_values[:-2]) / span[1:-1]
+        distance[~interior] = np.inf
+        crowding[order] += distance
+    return crowding
+
+
+def select_survivors(objectives: np.ndarray, violation: np.ndarray,
+                     size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Indices of the best `size` points by rank, then crowding distance, with their ranks and crowding"""
+    ranks = nondominated_ranks(objectives, violation)
+    crowding = crowding_distances(objectives, ranks)
+    keep = np.lexsort((-crowding, ranks))[:size]
+    return keep, ranks[keep], crowding[keep]
+
+
+class UFParetoProblem:
+    """Batched UF evaluation of scaled design populations"""
+
+    def __init__(self, request: ParetoRequest):
+        self.request = request
+        self.model = UltrafiltrationModel("UF_PARETO")
+        tmp_bounds = request.tmp_bounds or (0.05, settings.max_tmp)
+        bounds = np.array([request.area_bounds, tmp_bounds, request.crossflow_bounds], dtype=float)
+        self.lower, self.upper = bounds[:, 0], bounds[:, 1]
+
+    def designs(self, population: np.ndarray) -> np.ndarray:
+        """Scaled [0, 1] population to physical design variables"""
+        return self.lower + (self.upper - self.lower) * population
+
+    def evaluate(self, population: np.ndarray) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """Minimized objectives, total constraint violation and raw results of a population"""
+        request = self.request
+        x = self.designs(population)
+        arrays = self.model.performance_arrays({
+            "feed_flow": request.feed_flow,
+            "membrane_area": x[:, 0],
+            "transmembrane_pressure": x[:, 1],
+            "crossflow_velocity": x[:, 2],
+            "temperature": request.temperature,
+            "feed_concentration": request.feed_concentration,
+            "operating_hours": request.operating_hours,
+            "membrane_type": request.membrane_type,
+        })
+
+        # Membrane life is maximized, so its negative is minimized
+        objectives = np.column_stack([
+            arrays["energy_consumption"], -arrays["membrane_life_prediction"], arrays["membrane_area"]
+        ])
+
+        # Normalized violations of the design limits (zero when feasible)
+        violation = (
+            np.maximum(arrays["flux"] / settings.max_flux - 1, 0.0)
+            + np.maximum(arrays["recovery"] / settings.max_recovery - 1, 0.0)
+            + np.where(arrays["valid"], 0.0, 1.0)
+        )
+        if request.required_permeate is not None:
+            violation = violation + np.maximum(1 - arrays["permeate_flow"] / request.required_permeate, 0.0)
+
+        return objectives, violation, arrays
+
+
+def _variation(population: np.ndarray, ranks: np.ndarray, crowding: np.ndarray,
+               rng: np.random.Generator) -> np.ndarray:
+    """Offspring by binary tournament, SBX crossover and polynomial mutation (all vectorized)"""
+    n_points, n_variables = population.shape
+
+    # Binary tournament: lower rank wins, ties go to the larger crowding distance
+    a, b = rng.integers(0, n_points, (2, n_points))
+    a_wins = (ranks[a] < ranks[b]) | ((ranks[a] == ranks[b]) & (crowding[a] >= crowding[b]))
+    parents = population[np.where(a_wins, a, b)]
+    first, second = parents[0::2], parents[1::2]
+    n_pairs = len(second)
+    first = first[:n_pairs]
+
+    # Simulated binary crossover
+    u = rng.random((n_pairs, n_variables))
+    beta = np.where(u <= 0.5, (2 * u) ** (1 / (SBX_ETA + 1)), (1 / (2 * (1 - u))) ** (1 / (SBX_ETA + 1)))
+    cross = rng.random((n_pairs, 1)) < 0.9
+    beta = np.where(cross, beta, 1.0)
+    children = np.vstack([
+        0.5 * ((1 + beta) * first + (1 - beta) * second),
+        0.5 * ((1 - beta) * first + (1 + beta) * second),
+    ])
+    if len(children) < n_points:
+        children = np.vstack([children, parents[len(children):]])
+
+    # Polynomial mutation, one variable per child on average
+    u = rng.random(children.shape)
+    mutate = rng.random(children.shape) < 1 / n_variables
+    delta = np.where(
+        u < 0.5,
+        (2 * u) ** (1 / (MUTATION_ETA + 1)) - 1,
+        1 - (2 * (1 - u)) ** (1 / (MUTATION_ETA + 1))
+    )
+    children = np.where(mutate, children + delta, children)
+    return np.clip(children, 0.0, 1.0)
+
+
+def _evolve_island(request_data: Dict[str, Any], population: np.ndarray, generations: int,
+                   seed: np.random.SeedSequence) -> Tuple[np.ndarray, int]:
+    """Evolve one island for some generations (runs in a sweep worker process)"""
+    problem = UFParetoProblem(ParetoRequest(**request_data))
+    rng = np.random.default_rng(seed)
+    objectives, violation, _ = problem.evaluate(population)
+    ranks = nondominated_ranks(objectives, violation)
+    crowding = crowding_distances(objectives, ranks)
+    evaluations = len(population)
+
+    for _ in range(generations):
+        children = _variation(population, ranks, crowding, rng)
+        child_objectives, child_violation, _ = problem.evaluate(children)
+        evaluations += len(children)
+
+        combined = np.vstack([population, children])
+        combined_objectives = np.vstack([objectives, child_objectives])
+        combined_violation = np.concatenate([violation, child_violation])
+        keep, ranks, crowding = select_survivors(combined_objectives, combined_violation, len(population))
+        population, objectives, violation = combined[keep], combined_objectives[keep], combined_violation[keep]
+
+    return population, evaluations
+
+
+class ParetoSearch:
+    """Island-model NSGA-II over UF membrane area, TMP and crossflow velocity
+
+    Each island evolves its own population for a migration interval, with
+    whole populations evaluated in one batched model call per generation.
+    Islands run in parallel on the sweep process pool; between intervals their
+    populations are merged into a non-dominated archive, which is streamed to
+    the caller, and every island receives migrants from the archive.
+    """
+
+    def __init__(self, request: ParetoRequest):
+        self.request = request
+        self.problem = UFParetoProblem(request)
+        self.islands = request.islands or sweep_workers()
+
+        non_finite = [name for name, value in request
+                      if isinstance(value, (float, tuple)) and not np.all(np.isfinite(value))]
+        if non_finite:
+            raise ValueError(f"Inputs must be finite numbers: {', '.join(non_finite)}")
+        if request.feed_flow <= 0:
+            raise ValueError("Feed flow must be positive")
+        if np.any(self.problem.lower <= 0) or np.any(self.problem.upper <= self.problem.lower):
+            raise ValueError("Bounds must be positive with lower < upper")
+        if request.population_size < 4 or request.generations < 1 or self.islands < 1:
+            raise ValueError("Population size must be at least 4, generations and islands at least 1")
+        if request.migration_interval < 1 or request.archive_size < 1:
+            raise ValueError("Migration interval and archive size must be at least 1")
+        if not 0 <= request.migrants < request.population_size:
+            raise ValueError("Migrants must be fewer than the population size")
+        evaluations = request.population_size * (request.generations + 1) * self.islands
+        if evaluations > settings.pareto_max_evaluations:
+            raise ValueError(f"Search needs {evaluations} model evaluations; "
+                             f"the limit is {settings.pareto_max_evaluations}")
+
+    def run(self) -> Iterator[Dict[str, Any]]:
+        """Yield the archive front after every migration interval, then a final summary"""
+        request = self.request
+        request_data = request.model_dump()
+        seeds = np.random.SeedSequence(request.seed).spawn(self.islands)
+        rngs = [np.random.default_rng(seed) for seed in seeds]
+        populations = [rng.random((request.population_size, len(VARIABLES))) for rng in rngs]
+        archive = np.empty((0, len(VARIABLES)))
+        evaluations = 0
+        parallel = self.islands > 1 and sweep_workers() > 1
+
+        epochs = math.ceil(request.generations / request.migration_interval)
+        for epoch in range(epochs):
+            generations = min(request.migration_interval, request.generations - epoch * request.migration_interval)
+            epoch_seeds = [seed.spawn(1)[0] for seed in seeds]
+            args = [(request_data, population, generations, seed)
+                    for population, seed in zip(populations, epoch_seeds)]
+
+            if parallel:
+                executor = sweep_executor()
+                futures = [executor.submit(_evolve_island, *arg) for arg in args]
+                try:
+                    results = [future.result() for future in futures]
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+            else:
+                results = [_evolve_island(*arg) for arg in args]
+
+            populations = [population for population, _ in results]
+            evaluations += sum(count for _, count in results)
+            archive = self._update_archive(np.vstack([archive] + populations))
+
+            # Migration: archive members replace random residents of every island
+            if request.migrants and epoch < epochs - 1:
+                for population, rng in zip(populations, rngs):
+                    slots = rng.choice(len(population), request.migrants, replace=False)
+                    population[slots] = archive[rng.integers(0, len(archive), request.migrants)]
+
+            yield {
+                "epoch": epoch + 1,
+                "epochs": epochs,
+                "generation": min((epoch + 1) * request.migration_interval, request.generations),
+                "evaluations": evaluations,
+                "front": self.front(archive)
+            }
+
+        yield {"done": True, "evaluations": evaluations, "front_size": len(archive)}
+
+    def _update_archive(self, candidates: np.ndarray) -> np.ndarray:
+        """Non-dominated feasible candidates, thinned by crowding distance to the archive size"""
+        candidates = np.unique(candidates, axis=0)
+        objectives, violation, _ = self.problem.evaluate(candidates)
+        ranks = nondominated_ranks(objectives, violation)
+        front = (ranks == 0) & (violation <= 0)
+        if not front.any():
+            # No feasible design yet: keep the least infeasible points
+            front = violation == violation.min()
+        candidates, objectives = candidates[front], objectives[front]
+
+        # Drop the most crowded points, recomputing crowding after each halving of the excess
+        while len(candidates) > self.request.archive_size:
+            crowding = crowding_distances(objectives, np.zeros(len(candidates), dtype=int))
+            excess = len(candidates) - self.request.archive_size
+            keep = np.sort(np.argsort(-crowding, kind="stable")[:len(candidates) - max(1, excess // 2)])
+            candidates, objectives = candidates[keep], objectives[keep]
+        return candidates
+
+    def front(self, archive: np.ndarray) -> List[Dict[str, Any]]:
+        """Archive designs with their objectives and key results, by increasing area"""
+        if len(archive) == 0:
+            return []
+        _, violation, arrays = self.problem.evaluate(archive)
+        x = self.problem.designs(archive)
+        order = np.argsort(x[:, 0])
+        return [
+            {
+                "membrane_area": round(float(x[i, 0]), 3),  # m²
+                "transmembrane_pressure": round(float(x[i, 1]), 4),  # bar
+                "crossflow_velocity": round(float(x[i, 2]), 3),  # m/s
+                "energy_consumption": round(float(arrays["energy_consumption"][i]), 5),  # kWh/m³
+                "membrane_life_prediction": round(float(arrays["membrane_life_prediction"][i]), 2),  # months
+                "permeate_flow": round(float(arrays["permeate_flow"][i]), 3),  # m³/h
+                "flux": round(float(arrays["flux"][i]), 2),  # L/m²/h
+                "recovery": round(float(arrays["recovery"][i]), 2),  # %
+                "feasible": bool(violation[i] <= 0),
+            }
+            for i in order
+        ]
@@ -0,0 +1,71 @@
+"""
+Columnar Stream Table
+Compact NumPy stream state used inside the solver loop
+"""
+import numpy as np
+from typing import Any, Dict, Iterable, List
+
+
+QUALITY_PARAMETERS = [
+    "turbidity", "tss", "tds", "fog", "bod", "cod", "ph", "alkalinity",
+    "hardness", "chloride", "sulfate", "nitrate", "phosphate", "iron", "manganese"
+]
+
+# Numeric stream properties, one table column each
+STREAM_PROPERTIES = ["flow_rate", "pressure", "temperature", "concentration"] + QUALITY_PARAMETERS
+
+COLUMN = {prop: j for j, prop in enumerate(STREAM_PROPERTIES)}
+FLOW = COLUMN["flow_rate"]
+PRESSURE = COLUMN["pressure"]
+TEMPERATURE = COLUMN["temperature"]
+QUALITY_COLUMNS = np.array([COLUMN[param] for param in QUALITY_PARAMETERS])
+
+# Every property except temperature (°C) is physically non-negative
+NON_NEGATIVE = np.array([prop != "temperature" for prop in STREAM_PROPERTIES])
+
+
+class StreamTable:
+    """Streams x properties array with a stream_id -> row index"""
+
+    def __init__(self, stream_ids: List[str], data: np.ndarray, source_ports: List[str]):
+        self.stream_ids = stream_ids
+        self.index = {stream_id: i for i, stream_id in enumerate(stream_ids)}
+        self.data = data
+        self.source_ports = source_ports
+
+    @classmethod
+    def from_streams(cls, streams: Dict[str, Any]) -> "StreamTable":
+        """Build a table from StreamData models"""
+        stream_ids = list(streams)
+        data = np.array(
+            [[getattr(streams[stream_id], prop) for prop in STREAM_PROPERTIES] for stream_id in stream_ids],
+            dtype=float
+        ).reshape(len(stream_ids), len(STREAM_PROPERTIES))
+        source_ports = [streams[stream_id].source_port for stream_id in stream_ids]
+        return cls(stream_ids, data, source_ports)
+
+    def copy(self) -> "StreamTable":
+        """Copy with independent numeric data (ids and ports are shared)"""
+        table = StreamTable.__new__(StreamTable)
+        table.stream_ids = self.stream_ids
+        table.index = self.index
+        table.data = self.data.copy()
+        table.source_ports = self.source_ports
+        return table
+
+    def rows(self, stream_ids: Iterable[str]) -> np.ndarray:
+        """Row indices for the given streams"""
+        return np.array([self.index[stream_id] for stream_id in stream_ids], dtype=int)
+
+    def load(self, stream_id: str, stream: Any):
+        """Overwrite a row from a StreamData model"""
+        self.data[self.index[stream_id]] = [getattr(stream, prop) for prop in STREAM_PROPERTIES]
+
+    def to_stream_data(self, templates: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert back to StreamData models, keeping non-numeric fields from templates"""
+        return {
+            stream_id: templates[stream_id].model_copy(
+                update=dict(zip(STREAM_PROPERTIES, self.data[i].tolist()))
+            )
+            for i, stream_id in enumerate(self.stream_ids)
+        }
@@ -0,0 +1,239 @@
+"""
+Flowsheet Parameter Sweeps
+Solve one flowsheet over many numeric scenarios with a shared solve plan
+"""
+import multiprocessing
+import os
+import threading
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple
+from pydantic import BaseModel
+from ..config import settings
+from ..utils import water_properties
+from .mass_balance import FlowsheetData, MassBalanceSolver, SolverOptions
+from .stream_table import STREAM_PROPERTIES
+from .topology import SolvePlan, solve_plan
+
+
+class SweepRequest(BaseModel):
+    """Flowsheet sweep definition"""
+    flowsheet: FlowsheetData
+    solver_options: SolverOptions = SolverOptions()
+    # Parameter path -> values, e.g. "equipment.UF1.config.transmembrane_pressure"
+    # or "streams.S1.temperature"
+    parameters: Dict[str, List[float]]
+    combine: Literal["grid", "zip"] = "grid"  # full factorial, or columns paired row by row
+    # Result paths: "streams.<id>.<property>", "equipment_results.<id>.<key>", "system_recovery"
+    outputs: Optional[List[str]] = None
+
+
+def parse_parameter(path: str, flowsheet: FlowsheetData) -> Tuple[str, str, List[str]]:
+    """Split a parameter path into (section, object id, attribute path) and check it exists"""
+    parts = path.split(".")
+    if len(parts) < 3 or parts[0] not in ("equipment", "streams"):
+        raise ValueError(f"Invalid parameter path '{path}': expected equipment.<id>.config.<key> "
+                         f"or streams.<id>.<property>")
+    section, object_id, attribute = parts[0], parts[1], parts[2:]
+
+    if section == "equipment":
+        if object_id not in flowsheet.equipment:
+            raise ValueError(f"Unknown equipment '{object_id}' in parameter '{path}'")
+        if attribute[0] != "config" or len(attribute) < 2:
+            raise ValueError(f"Only equipment config values can be swept: '{path}'")
+    else:
+        if object_id not in flowsheet.streams:
+            raise ValueError(f"Unknown stream '{object_id}' in parameter '{path}'")
+        if len(attribute) != 1 or attribute[0] not in STREAM_PROPERTIES:
+            raise ValueError(f"'{path}' is not a numeric stream property")
+
+    return section, object_id, attribute
+
+
+def apply_parameter(flowsheet: FlowsheetData, parsed: Tuple[str, str, List[str]], value: float):
+    """Set a parsed parameter in place (nested config keys are created as needed)"""
+    section, object_id, attribute = parsed
+    if section == "streams":
+        setattr(flowsheet.streams[object_id], attribute[0], value)
+        return
+
+    target = flowsheet.equipment[object_id].config
+    for key in attribute[1:-1]:
+        target = target.setdefault(key, {})
+    target[attribute[-1]] = value
+
+
+def default_outputs(flowsheet: FlowsheetData) -> List[str]:
+    """Every stream flow rate plus system recovery"""
+    return [f"streams.{stream_id}.flow_rate" for stream_id in flowsheet.streams] + ["system_recovery"]
+
+
+def _solve_scenarios(flowsheet_data: Dict[str, Any], options: Dict[str, Any], plan: SolvePlan,
+                     paths: List[str], values: np.ndarray, outputs: List[str],
+                     progress: Optional[Callable[[int, float], None]] = None) -> Dict[str, List[Any]]:
+    """Solve a block of scenarios in this process; returns result columns for the block
+    
+    In-process sweeps report progress (scenarios solved) after every scenario,
+    so their jobs can be cancelled between scenarios.
+    """
+    flowsheet = FlowsheetData(**flowsheet_data)
+    parsed = [parse_parameter(path, flowsheet) for path in paths]
+    solver = MassBalanceSolver(**options)
+
+    columns: Dict[str, List[Any]] = {name: [] for name in outputs}
+    columns.update(success=[], converged=[], iterations=[], error=[])
+
+    for row in values:
+        # Every swept value is overwritten per scenario, so the flowsheet is mutated in place
+        for target, value in zip(parsed, row.tolist()):
+            apply_parameter(flowsheet, target, value)
+
+        result = solver.solve_flowsheet(flowsheet, plan=plan)
+        columns["success"].append(result.success)
+        columns["converged"].append(result.converged)
+        columns["iterations"].append(result.iterations)
+        columns["error"].append(result.errors[0].message if not result.success and result.errors else None)
+
+        for name in outputs:
+            columns[name].append(_output_value(name, result, solver) if result.success else None)
+        if progress is not None:
+            progress(len(columns["success"]), 0.0)
+
+    return columns
+
+
+def _output_value(name: str, result: Any, solver: MassBalanceSolver) -> Any:
+    """Look up one output path in a solve result"""
+    if name == "system_recovery":
+        return solver.calculate_system_recovery(result.streams)
+    section, object_id, key = name.split(".", 2)
+    if section == "streams":
+        stream = result.streams.get(object_id)
+        return getattr(stream, key, None) if stream is not None else None
+    return result.equipment_results.get(object_id, {}).get(key)
+
+
+def sweep_workers() -> int:
+    """Configured worker process count"""
+    return settings.sweep_workers or os.cpu_count() or 1
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def sweep_executor() -> ProcessPoolExecutor:
+    """Process pool for sweeps; workers receive the parent's property tables
+    
+    Workers start from a fork server: forking the multi-threaded server
+    process directly could copy locks held by other threads.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=sweep_workers(),
+                mp_context=multiprocessing.get_context("forkserver"),
+                initializer=water_properties.install_tables,
+                initargs=(water_properties.get_tables(),)
+            )
+    return _executor
+
+
+def shutdown_sweep_executor():
+    """Stop sweep worker processes"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+class ParameterSweep:
+    """Evaluates a flowsheet across parameter scenarios
+
+    Topology, calculation order and tear streams depend only on connectivity,
+    so they are analysed once into a solve plan shared by every scenario.
+    Scenarios are solved in blocks, fanned out across a process pool when the
+    sweep is large enough to amortize the transfer.
+    """
+
+    def __init__(self, request: SweepRequest, max_scenarios: Optional[int] = None):
+        self.request = request
+        self.max_scenarios = max_scenarios or settings.sweep_max_scenarios
+        self.paths = list(request.parameters)
+        if not self.paths:
+            raise ValueError("At least one parameter is required")
+        for path in self.paths:
+            parse_parameter(path, request.flowsheet)
+
+        self.outputs = request.outputs or default_outputs(request.flowsheet)
+        for name in self.outputs:
+            if name != "system_recovery" and (
+                len(name.split(".", 2)) != 3 or name.split(".")[0] not in ("streams", "equipment_results")
+            ):
+                raise ValueError(f"Invalid output path '{name}'")
+
+        self.values = self.scenarios()
+        if len(self.values) > self.max_scenarios:
+            raise ValueError(f"Sweep has {len(self.values)} scenarios; the limit is {self.max_scenarios}")
+
+        flowsheet = request.flowsheet
+        self.plan = solve_plan(flowsheet.equipment, list(flowsheet.streams))
+
+    def scenarios(self) -> np.ndarray:
+        """Scenario matrix, one row per scenario and one column per parameter"""
+        columns = [np.asarray(self.request.parameters[path], dtype=float) for path in self.paths]
+        if any(column.size == 0 for column in columns):
+            raise ValueError("Every parameter needs at least one value")
+
+        if self.request.combine == "zip":
+            if len({column.size for column in columns}) > 1:
+                raise ValueError("Zipped parameters must have the same number of values")
+            return np.column_stack(columns)
+
+        n_scenarios = int(np.prod([column.size for column in columns]))
+        if n_scenarios > self.max_scenarios:
+            raise ValueError(f"Sweep has {n_scenarios} scenarios; the limit is {self.max_scenarios}")
+        grid = np.meshgrid(*columns, indexing="ij")
+        return np.column_stack([axis.ravel() for axis in grid])
+
+    def run(self, progress: Optional[Callable[[int, float], None]] = None) -> Dict[str, Any]:
+        """Solve every scenario and return the columnar result table"""
+        flowsheet_data = self.request.flowsheet.model_dump()
+        options = self.request.solver_options.model_dump(exclude={"session_id", "trace"})
+        n_scenarios = len(self.values)
+        args = (flowsheet_data, options, self.plan, self.paths)
+
+        if n_scenarios < settings.sweep_parallel_threshold or sweep_workers() == 1:
+            blocks = [_solve_scenarios(*args, self.values, self.outputs, progress)]
+        else:
+            executor = sweep_executor()
+            # A few blocks per worker balance uneven solve times
+            n_blocks = min(n_scenarios, 4 * sweep_workers())
+            splits = np.array_split(np.arange(n_scenarios), n_blocks)
+            futures = {
+                executor.submit(_solve_scenarios, *args, self.values[rows], self.outputs): i
+                for i, rows in enumerate(splits)
+            }
+            blocks = [None] * n_blocks
+            done = 0
+            try:
+                for future in as_completed(futures):
+                    blocks[futures[future]] = future.result()
+                    done += len(splits[futures[future]])
+                    if progress is not None:
+                        progress(done, 0.0)
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        results = {name: [value for block in blocks for value in block[name]]
+                   for name in blocks[0]}
+        return {
+            "scenarios": n_scenarios,
+            "parameters": {path: self.values[:, j].tolist() for j, path in enumerate(self.paths)},
+            "results": {name: results.pop(name) for name in self.outputs},
+            **results
+        }
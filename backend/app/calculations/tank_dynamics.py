@@ -0,0 +1,418 @@
+"""
+Dynamic Feed Tank Simulation
+Tank level, residence time, water age and TSS settling under time-varying inflow and demand
+"""
+import math
+import numpy as np
+from typing import Any, Dict, Iterator, List, Optional, Union
+from ..models.base import ProcessResults
+from ..models.feed_tank import FeedTankInputs
+from ..utils.validation import EngineeringError
+from .trajectory import TrajectoryBins
+
+
+MAX_SIMULATION_STEPS = 50_000_000
+CHUNK_STEPS = 262_144  # time steps integrated per vectorized chunk
+LEVEL_WINDOW = 4096  # initial look-ahead of the bounded level integration
+RECURRENCE_BLOCK = 16  # steps per linear recurrence block
+MAX_STEP_DECAY = 36.0  # per-step log decay cap; 16 × 36 keeps exp() finite within a block
+EVENT_TYPES = ("overflow", "dry_run")
+
+
+class FeedTankDynamicsInputs(FeedTankInputs):
+    """Dynamic feed tank inputs (tank and water quality plus flow profiles)"""
+    inflow_profile: Optional[List[float]] = None  # m³/h per profile step (default: constant inflow_rate)
+    outflow_profile: Optional[List[float]] = None  # m³/h demand per step (default: constant inflow_rate)
+    tss_profile: Optional[List[float]] = None  # mg/L inflow TSS per step (default: water_quality.tss)
+    profile_step_minutes: float = 1.0  # min, also the integration step
+    horizon_hours: Optional[float] = None  # h (default: longest profile; shorter profiles repeat)
+    settling_rate: float = 0.05  # 1/h first-order TSS settling in the tank
+    high_level: float = 90.0  # % alarm level (steady-state overflow risk threshold)
+    low_level: float = 10.0  # % alarm level
+    output_points: int = 500  # trajectory samples returned
+    max_events: int = 100  # overflow / dry-run events listed per type
+
+
+def bounded_storage(v0: float, net: np.ndarray, capacity: float) -> np.ndarray:
+    """Stored volume after each step of V = clip(V + net, 0, capacity)
+
+    Between bound switches the clipped sum has a closed form (Lindley's
+    recursion): reflecting at the floor, V = S - min(0, running min S), or at
+    the ceiling, V = S - max(0, running max (S - capacity)). Each segment is
+    evaluated vectorized until the opposite bound is crossed, so the work is
+    proportional to the steps plus the number of fill/empty transitions.
+    """
+    n = net.size
+    volume = np.empty(n)
+    i, v = 0, v0
+    reflect_floor = v0 < capacity
+    window = LEVEL_WINDOW
+    while i < n:
+        end = min(n, i + window)
+        s = v + np.cumsum(net[i:end])
+        if reflect_floor:
+            segment = s - np.minimum(np.minimum.accumulate(s), 0.0)
+            crossed = segment > capacity
+        else:
+            segment = s - np.maximum(np.maximum.accumulate(s - capacity), 0.0)
+            crossed = segment < 0.0
+
+        if not crossed.any():
+            volume[i:end] = segment
+            v = segment[-1]
+            i = end
+            window *= 2
+            continue
+
+        j = int(np.argmax(crossed))
+        volume[i:i + j] = segment[:j]
+        volume[i + j] = capacity if reflect_floor else 0.0
+        v = volume[i + j]
+        i += j + 1
+        reflect_floor = not reflect_floor
+        window = LEVEL_WINDOW
+    return volume
+
+
+def linear_recurrence(log_a: np.ndarray, b: np.ndarray, x0: float) -> np.ndarray:
+    """x[k] = a[k] x[k-1] + b[k] with a = exp(log_a) <= 1 and b >= 0, solved by blocked prefix sums
+
+    Within a block x[k] = P[k] (x_in + sum_{j<=k} b[j] / P[j]) with P the
+    running product of a, formed in log space. Blocks are short enough that
+    1/P stays finite, and each block maps its entry value to its exit value by
+    another recurrence of the same form, solved recursively over the blocks.
+    The sums have only non-negative terms, so there is no cancellation.
+    """
+    # a below e^-36 (~2e-16) erases the previous value in double precision anyway
+    log_a = np.maximum(log_a, -MAX_STEP_DECAY)
+    n = log_a.size
+    n_blocks = -(-n // RECURRENCE_BLOCK)
+    padding = n_blocks * RECURRENCE_BLOCK - n
+    log_a = np.pad(log_a, (0, padding)).reshape(n_blocks, RECURRENCE_BLOCK)
+    b = np.pad(b, (0, padding)).reshape(n_blocks, RECURRENCE_BLOCK)
+
+    product = np.exp(np.cumsum(log_a, axis=1))
+    response = product * np.cumsum(b / product, axis=1)  # block values for a zero entry value
+
+    if n_blocks == 1:
+        entry = np.array([x0])
+    else:
+        exits = linear_recurrence(np.log(product[:, -1]), response[:, -1], x0)
+        entry = np.concatenate(([x0], exits[:-1]))
+    return (product * entry[:, np.newaxis] + response).ravel()[:n]
+
+
+def _cyclic(profile: Optional[List[float]], default: float, start: int, stop: int) -> np.ndarray:
+    """Profile values for steps [start, stop), repeating the profile cyclically"""
+    if profile is None:
+        return np.full(stop - start, default, dtype=float)
+    values = np.asarray(profile, dtype=float)
+    return values[np.arange(start, stop) % values.size]
+
+
+class FeedTankSimulator:
+    """Integrates feed tank storage and mixing over inflow and demand profiles
+
+    The level follows the bounded storage balance, with overflow spilling
+    above the tank volume and unmet demand (dry run) below empty. Water age
+    and TSS follow completely mixed tank balances with exact per-step decay,
+    solved as linear recurrences. The horizon is processed in chunks; each
+    chunk yields its downsampled trajectory, so long profiles can be streamed.
+    """
+
+    def __init__(self, equipment_id: str):
+        self.equipment_id = equipment_id
+
+    def simulate(self, inputs: Union[Dict[str, Any], FeedTankDynamicsInputs]) -> ProcessResults:
+        """Run the whole simulation and collect the streamed chunks into one result"""
+        try:
+            sim = inputs if isinstance(inputs, FeedTankDynamicsInputs) else FeedTankDynamicsInputs(**inputs)
+            errors = self.validate_simulation_inputs(sim)
+            if errors:
+                return ProcessResults(success=False, errors=errors)
+
+            trajectory: Dict[str, List[Any]] = {}
+            for update in self.iterate(sim):
+                if "trajectory" in update:
+                    for name, values in update["trajectory"].items():
+                        trajectory.setdefault(name, []).extend(values)
+                else:
+                    summary = update
+
+            summary.pop("done")
+            warnings = summary.pop("warnings")
+            return ProcessResults(success=True, data={**summary, "trajectories": trajectory},
+                                  warnings=warnings)
+
+        except Exception as e:
+            return ProcessResults(
+                success=False,
+                errors=[EngineeringError(
+                    code="CALCULATION_ERROR",
+                    message=f"Feed tank simulation failed: {str(e)}",
+                    equipment_id=self.equipment_id,
+                    severity="critical"
+                )]
+            )
+
+    def validate_simulation_inputs(self, sim: FeedTankDynamicsInputs) -> List[EngineeringError]:
+        """Validate tank, profile and horizon inputs"""
+        errors = []
+
+        def error(code: str, message: str):
+            errors.append(EngineeringError(
+                code=code, message=message, equipment_id=self.equipment_id, severity="error"
+            ))
+
+        if sim.volume <= 0:
+            error("INVALID_VOLUME", "Tank volume must be positive")
+        if not 0 <= sim.level <= 100:
+            error("INVALID_LEVEL", "Initial level must be between 0 and 100%")
+        if not 0 <= sim.low_level < sim.high_level <= 100:
+            error("INVALID_LEVEL", "Alarm levels must satisfy 0 <= low_level < high_level <= 100")
+        if sim.profile_step_minutes <= 0:
+            error("INVALID_STEP", "Profile step must be positive")
+        for name in ("inflow_profile", "outflow_profile", "tss_profile"):
+            profile = getattr(sim, name)
+            if profile is not None and (len(profile) == 0 or min(profile) < 0):
+                error("INVALID_PROFILE", f"{name} must be non-empty and non-negative")
+        if sim.inflow_rate < 0 or sim.settling_rate < 0:
+            error("INVALID_RATE", "Inflow and settling rates must be non-negative")
+        if sim.output_points < 1:
+            error("INVALID_OUTPUT", "At least one output point is required")
+        if sim.horizon_hours is not None and sim.horizon_hours <= 0:
+            error("INVALID_HORIZON", "Horizon must be positive")
+        elif not errors and self._n_steps(sim) > MAX_SIMULATION_STEPS:
+            error("TOO_MANY_STEPS",
+                  f"Horizon needs more than {MAX_SIMULATION_STEPS} time steps; increase the profile step")
+
+        return errors
+
+    @staticmethod
+    def _n_steps(sim: FeedTankDynamicsInputs) -> int:
+        dt = sim.profile_step_minutes / 60.0  # h
+        if sim.horizon_hours is not None:
+            return int(math.ceil(sim.horizon_hours / dt))
+        lengths = [len(p) for p in (sim.inflow_profile, sim.outflow_profile, sim.tss_profile) if p is not None]
+        return max(lengths) if lengths else int(math.ceil(24.0 / dt))
+
+    def iterate(self, sim: FeedTankDynamicsInputs) -> Iterator[Dict[str, Any]]:
+        """Yield each chunk's downsampled trajectory, then the KPIs, events and buffer sizing"""
+        dt = sim.profile_step_minutes / 60.0  # h
+        n_steps = self._n_steps(sim)
+        capacity = sim.volume  # m³
+        volume_floor = capacity * 1e-6  # m³, keeps mixing rates finite in an empty tank
+
+        bins = TrajectoryBins(n_steps, max(1, int(math.ceil(n_steps / sim.output_points))))
+        n_chunks = int(math.ceil(n_steps / CHUNK_STEPS))
+
+        volume = capacity * sim.level / 100
+        age = volume / sim.inflow_rate * 0.37 if sim.inflow_rate > 0 else 0.0  # h, steady-state estimate
+        tss = sim.water_quality.tss  # mg/L
+        initial_mass = volume * tss  # g, TSS held in the tank at the start
+        cumulative_net, lowest_net, largest_range = 0.0, 0.0, 0.0  # m³, for buffer sizing
+        highest_net = 0.0
+
+        totals = {
+            "inflow": 0.0, "delivered": 0.0, "overflow_volume": 0.0, "unmet_demand": 0.0,
+            "overflow_steps": 0, "dry_run_steps": 0, "high_steps": 0, "low_steps": 0,
+            "level_sum": 0.0, "min_level": math.inf, "max_level": -math.inf,
+            "age_sum": 0.0, "max_age": 0.0, "tss_in_load": 0.0, "tss_out_load": 0.0,
+            "residence_sum": 0.0, "residence_steps": 0
+        }
+        events: Dict[str, List[Dict[str, float]]] = {kind: [] for kind in EVENT_TYPES}
+        event_counts = {kind: 0 for kind in EVENT_TYPES}
+        open_events: Dict[str, Optional[Dict[str, float]]] = {kind: None for kind in EVENT_TYPES}
+
+        for chunk, start in enumerate(range(0, n_steps, CHUNK_STEPS)):
+            stop = min(start + CHUNK_STEPS, n_steps)
+            inflow = _cyclic(sim.inflow_profile, sim.inflow_rate, start, stop)  # m³/h
+            demand = _cyclic(sim.outflow_profile, sim.inflow_rate, start, stop)  # m³/h
+            tss_in = _cyclic(sim.tss_profile, sim.water_quality.tss, start, stop)  # mg/L
+            t = np.arange(start, stop) * dt
+
+            # Storage balance: spill above the tank volume, unmet demand below empty
+            net = (inflow - demand) * dt
+            end_volume = bounded_storage(volume, net, capacity)
+            start_volume = np.concatenate(([volume], end_volume[:-1]))
+            unbounded = start_volume + net
+            spill = np.maximum(unbounded - capacity, 0.0)  # m³ per step
+            shortfall = np.maximum(-unbounded, 0.0)  # m³ per step
+            delivered = demand - shortfall / dt  # m³/h
+            volume = float(end_volume[-1])
+
+            # Completely mixed balances over each step at the start-of-step volume:
+            # dA/dt = 1 - (Q_in/V) A and dC/dt = (Q_in/V)(C_in - C) - k C
+            mixing_volume = np.maximum(start_volume, volume_floor)
+            exchange = inflow / mixing_volume  # 1/h
+            age_trajectory = linear_recurrence(-exchange * dt, self._step_gain(exchange, 1.0, dt), age)
+            removal = exchange + sim.settling_rate
+            tss_trajectory = linear_recurrence(
+                -removal * dt, self._step_gain(removal, exchange * tss_in, dt), tss
+            )
+            age, tss = float(age_trajectory[-1]), float(tss_trajectory[-1])
+
+            level = end_volume / capacity * 100  # %
+            with np.errstate(divide="ignore", invalid="ignore"):
+                residence = np.where(delivered > 0, end_volume / delivered, np.nan)  # h
+
+            # Buffer sizing from the unconstrained cumulative net inflow
+            running = cumulative_net + np.cumsum(net)
+            cumulative_net = float(running[-1])
+            running_low = np.minimum(np.minimum.accumulate(running), lowest_net)
+            largest_range = max(largest_range, float(np.max(running - running_low)))
+            lowest_net = float(running_low[-1])
+            highest_net = max(highest_net, float(running.max()))
+
+            totals["inflow"] += float(inflow.sum() * dt)
+            totals["delivered"] += float(delivered.sum() * dt)
+            totals["overflow_volume"] += float(spill.sum())
+            totals["unmet_demand"] += float(shortfall.sum())
+            totals["overflow_steps"] += int((spill > 0).sum())
+            totals["dry_run_steps"] += int((shortfall > 0).sum())
+            totals["high_steps"] += int((level > sim.high_level).sum())
+            totals["low_steps"] += int((level < sim.low_level).sum())
+            totals["level_sum"] += float(level.sum())
+            totals["min_level"] = min(totals["min_level"], float(level.min()))
+            totals["max_level"] = max(totals["max_level"], float(level.max()))
+            totals["age_sum"] += float(age_trajectory.sum())
+            totals["max_age"] = max(totals["max_age"], float(age_trajectory.max()))
+            totals["tss_in_load"] += float((inflow * tss_in).sum() * dt)
+            totals["tss_out_load"] += float(((delivered * dt + spill) * tss_trajectory).sum())
+            finite_residence = residence[np.isfinite(residence)]
+            totals["residence_sum"] += float(finite_residence.sum())
+            totals["residence_steps"] += finite_residence.size
+
+            for kind, active, volumes in (("overflow", spill > 0, spill), ("dry_run", shortfall > 0, shortfall)):
+                event_counts[kind] += self._track_events(
+                    events[kind], open_events, kind, active, volumes, t, dt, sim.max_events
+                )
+
+            # Bins still open at the chunk end are completed (and yielded) by the next chunk
+            bin_starts, widths, sums = bins.add(start, {
+                "level": level, "inflow": inflow, "outflow": delivered, "overflow": spill / dt,
+                "water_age": age_trajectory, "outlet_tss": tss_trajectory,
+                "residence": np.nan_to_num(residence), "residence_steps": np.isfinite(residence).astype(float)
+            })
+
+            def mean(name: str, decimals: int) -> List[float]:
+                return np.round(sums[name] / widths, decimals).tolist()
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                residence_mean = sums["residence"] / sums["residence_steps"]
+            yield {
+                "chunk": chunk + 1,
+                "chunks": n_chunks,
+                "trajectory": {
+                    "time_hours": np.round(bin_starts * dt, 4).tolist(),
+                    "level": mean("level", 3),  # %
+                    "inflow": mean("inflow", 3),  # m³/h
+                    "outflow": mean("outflow", 3),  # m³/h
+                    "overflow": mean("overflow", 3),  # m³/h
+                    "residence_time": [None if math.isnan(v) else v
+                                       for v in np.round(residence_mean, 4).tolist()],  # h
+                    "water_age": mean("water_age", 4),  # h
+                    "outlet_tss": mean("outlet_tss", 4),  # mg/L
+                }
+            }
+
+        # Events still open at the horizon end
+        for kind in EVENT_TYPES:
+            if open_events[kind] is not None and len(events[kind]) < sim.max_events:
+                events[kind].append(self._round_event(open_events[kind]))
+
+        horizon = n_steps * dt
+        warnings = []
+        if event_counts["overflow"]:
+            warnings.append(f"Tank overflowed {event_counts['overflow']} times, spilling "
+                            f"{totals['overflow_volume']:.1f} m³")
+        if event_counts["dry_run"]:
+            warnings.append(f"Tank ran dry {event_counts['dry_run']} times, leaving "
+                            f"{totals['unmet_demand']:.1f} m³ of demand unmet")
+
+        required_volume = highest_net - lowest_net  # m³ active storage
+        alarm_band = (sim.high_level - sim.low_level) / 100
+        # TSS balance: inflow plus the inventory drawn down, less what left with the outflow and spill
+        settled = totals["tss_in_load"] + initial_mass - volume * tss - totals["tss_out_load"]  # g
+
+        yield {
+            "done": True,
+            "kpis": {
+                "horizon_hours": round(horizon, 4),
+                "time_steps": n_steps,
+                "final_level": round(volume / capacity * 100, 3),  # %
+                "mean_level": round(totals["level_sum"] / n_steps, 3),  # %
+                "min_level": round(totals["min_level"], 3),  # %
+                "max_level": round(totals["max_level"], 3),  # %
+                "hours_above_high_level": round(totals["high_steps"] * dt, 3),  # h
+                "hours_below_low_level": round(totals["low_steps"] * dt, 3),  # h
+                "total_inflow": round(totals["inflow"], 3),  # m³
+                "total_delivered": round(totals["delivered"], 3),  # m³
+                "overflow_volume": round(totals["overflow_volume"], 3),  # m³
+                "overflow_hours": round(totals["overflow_steps"] * dt, 3),  # h
+                "unmet_demand": round(totals["unmet_demand"], 3),  # m³
+                "dry_run_hours": round(totals["dry_run_steps"] * dt, 3),  # h
+                "mean_residence_time": round(totals["residence_sum"] / totals["residence_steps"], 4)
+                if totals["residence_steps"] else None,  # h
+                "mean_water_age": round(totals["age_sum"] / n_steps, 4),  # h
+                "max_water_age": round(totals["max_age"], 4),  # h
+                "tss_removal": round(settled / totals["tss_in_load"] * 100, 3)
+                if totals["tss_in_load"] > 0 else None,  # % of inflow TSS load settled
+            },
+            "events": {kind: {"count": event_counts[kind], "listed": events[kind]} for kind in EVENT_TYPES},
+            "buffer_sizing": {
+                # Storage that avoids both overflow and dry run over this horizon
+                "required_active_volume": round(required_volume, 3),  # m³
+                "required_initial_volume": round(-lowest_net, 3),  # m³
+                "recommended_volume": round(required_volume / alarm_band, 3) if alarm_band > 0 else None,  # m³
+                "largest_surplus": round(largest_range, 3),  # m³ absorbed after the lowest point
+                "current_volume_sufficient": required_volume <= capacity,
+            },
+            "warnings": warnings
+        }
+
+    @staticmethod
+    def _step_gain(rate: np.ndarray, source: np.ndarray, dt: float) -> np.ndarray:
+        """Exact one-step response to a constant source: source (1 - e^(-rate dt)) / rate"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            gain = np.where(rate > 0, -np.expm1(-rate * dt) / rate, dt)
+        return source * gain
+
+    @staticmethod
+    def _track_events(listed: List[Dict[str, float]], open_events: Dict[str, Optional[Dict[str, float]]],
+                      kind: str, active: np.ndarray, volumes: np.ndarray, t: np.ndarray, dt: float,
+                      max_events: int) -> int:
+        """Append events completed in this chunk; returns the number of new events started"""
+        if open_events[kind] is not None and not active[0]:
+            # The open event ended with the previous chunk
+            if len(listed) < max_events:
+                listed.append(FeedTankSimulator._round_event(open_events[kind]))
+            open_events[kind] = None
+
+        continuing = open_events[kind] is not None
+        padded = np.concatenate(([continuing], active, [False]))
+        starts = np.flatnonzero(padded[1:-1] & ~padded[:-2])
+        ends = np.flatnonzero(padded[1:-1] & ~padded[2:])  # last active step of each run
+        cumulative = np.concatenate(([0.0], np.cumsum(volumes)))
+
+        run_starts = ([0] if continuing else []) + starts.tolist()
+        for k, (first, last) in enumerate(zip(run_starts, ends.tolist())):
+            if k == 0 and continuing:
+                event = open_events[kind]
+            else:
+                event = {"start_hours": float(t[first]), "duration_hours": 0.0, "volume": 0.0}
+            event["duration_hours"] += (last - first + 1) * dt
+            event["volume"] += float(cumulative[last + 1] - cumulative[first])
+            open_events[kind] = event
+
+            if last < active.size - 1:
+                if len(listed) < max_events:
+                    listed.append(FeedTankSimulator._round_event(event))
+                open_events[kind] = None
+        return len(starts)
+
+    @staticmethod
+    def _round_event(event: Dict[str, float]) -> Dict[str, float]:
+        return {"start_hours": round(event["start_hours"], 4),
+                "duration_hours": round(event["duration_hours"], 4),
+                "volume": round(event["volume"], 3)}  # m³
@@ -0,0 +1,243 @@
+"""
+Flowsheet Topology Analysis
+Builds the equipment connectivity graph and derives the calculation order
+"""
+from collections import deque
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Tuple
+
+if TYPE_CHECKING:
+    from .mass_balance import EquipmentData
+
+
+class CalculationBlock(NamedTuple):
+    """Group of units solved together: a single unit or one recycle loop (SCC)"""
+    units: List[str]  # calculation order within the block
+    tear_streams: List[str]  # empty for acyclic blocks
+
+
+def stream_connections(equipment: Dict[str, "EquipmentData"],
+                       stream_ids: Iterable[str]) -> List[Tuple[str, str, str]]:
+    """List internal streams as (stream_id, source unit, target unit)"""
+    known_streams = set(stream_ids)
+    producers = {}
+
+    for eq_id, unit in equipment.items():
+        for stream_id in unit.outlet_streams:
+            if stream_id in known_streams:
+                producers[stream_id] = eq_id
+
+    connections = []
+    for eq_id, unit in equipment.items():
+        for stream_id in unit.inlet_streams:
+            source = producers.get(stream_id)
+            if source is not None:
+                connections.append((stream_id, source, eq_id))
+
+    return connections
+
+
+def build_equipment_graph(equipment: Dict[str, "EquipmentData"],
+                          stream_ids: Iterable[str]) -> Dict[str, List[str]]:
+    """Build directed equipment graph (source unit -> target units) from stream connectivity"""
+    graph = {eq_id: [] for eq_id in equipment}
+
+    for _, source, target in stream_connections(equipment, stream_ids):
+        if target not in graph[source]:
+            graph[source].append(target)
+
+    return graph
+
+
+def topological_order(graph: Dict[str, List[str]]) -> Tuple[List[str], bool]:
+    """Kahn topological sort, ties broken by insertion order
+
+    Returns the calculation order and whether the graph is acyclic. Units
+    that sit on or downstream of a cycle are appended in insertion order.
+    """
+    in_degree = {node: 0 for node in graph}
+    for targets in graph.values():
+        for target in targets:
+            in_degree[target] += 1
+
+    ready = deque(node for node in graph if in_degree[node] == 0)
+    order = []
+
+    while ready:
+        node = ready.popleft()
+        order.append(node)
+        for target in graph[node]:
+            in_degree[target] -= 1
+            if in_degree[target] == 0:
+                ready.append(target)
+
+    acyclic = len(order) == len(graph)
+    if not acyclic:
+        placed = set(order)
+        order.extend(node for node in graph if node not in placed)
+
+    return order, acyclic
+
+
+def strongly_connected_components(graph: Dict[str, List[str]]) -> List[List[str]]:
+    """Tarjan strongly connected components, returned in topological order"""
+    index_of = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+
+    for root in graph:
+        if root in index_of:
+            continue
+
+        # Iterative DFS to avoid recursion limits on large plants
+        index_of[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph[root]))]
+
+        while work:
+            node, targets = work[-1]
+            advanced = False
+
+            for target in targets:
+                if target not in index_of:
+                    index_of[target] = lowlink[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack.add(target)
+                    work.append((target, iter(graph[target])))
+                    advanced = True
+                    break
+                elif target in on_stack:
+                    lowlink[node] = min(lowlink[node], index_of[target])
+
+            if advanced:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+            if lowlink[node] == index_of[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+
+    # Tarjan emits sinks first
+    components.reverse()
+    return components
+
+
+def select_tear_streams(component: List[str],
+                        connections: List[Tuple[str, str, str]]) -> Tuple[List[str], List[str]]:
+    """Choose tear streams that break every cycle in a component
+
+    Runs a DFS from the loop entry unit (the first unit fed from outside the
+    loop, otherwise the first unit in component order) and tears the streams on back edges. Returns the acyclic calculation
+    order of the torn component and the tear stream ids.
+    """
+    members = set(component)
+    internal = [c for c in connections if c[1] in members and c[2] in members]
+    external_fed = {target for _, source, target in connections
+                    if target in members and source not in members}
+
+    graph = {node: [] for node in component}
+    for _, source, target in internal:
+        if target not in graph[source]:
+            graph[source].append(target)
+
+    # Prefer starting at a unit that receives fresh feed into the loop
+    roots = [node for node in component if node in external_fed]
+    roots += [node for node in component if node not in external_fed]
+
+    visited = set()
+    on_path = set()
+    back_edges = set()
+
+    for root in roots:
+        if root in visited:
+            continue
+        visited.add(root)
+        on_path.add(root)
+        work = [(root, iter(graph[root]))]
+
+        while work:
+            node, targets = work[-1]
+            advanced = False
+            for target in targets:
+                if target in on_path:
+                    back_edges.add((node, target))
+                elif target not in visited:
+                    visited.add(target)
+                    on_path.add(target)
+                    work.append((target, iter(graph[target])))
+                    advanced = True
+                    break
+            if not advanced:
+                on_path.discard(node)
+                work.pop()
+
+    tear_streams = [stream_id for stream_id, source, target in internal
+                    if (source, target) in back_edges]
+
+    torn_graph = {node: [t for t in graph[node] if (node, t) not in back_edges]
+                  for node in roots}
+    order, _ = topological_order(torn_graph)
+    return order, tear_streams
+
+
+def calculation_blocks(equipment: Dict[str, "EquipmentData"],
+                       stream_ids: Iterable[str]) -> List[CalculationBlock]:
+    """Partition the flowsheet into ordered calculation blocks with tear streams"""
+    stream_ids = list(stream_ids)
+    connections = stream_connections(equipment, stream_ids)
+    graph = build_equipment_graph(equipment, stream_ids)
+    position = {eq_id: i for i, eq_id in enumerate(equipment)}
+    blocks = []
+
+    for component in strongly_connected_components(graph):
+        component.sort(key=position.get)
+        self_loop = len(component) == 1 and component[0] in graph[component[0]]
+        if len(component) == 1 and not self_loop:
+            blocks.append(CalculationBlock(units=component, tear_streams=[]))
+        else:
+            order, tear_streams = select_tear_streams(component, connections)
+            blocks.append(CalculationBlock(units=order, tear_streams=tear_streams))
+
+    return blocks
+
+
+class SolvePlan(NamedTuple):
+    """Topology analysis reused across solves that change only numeric inputs"""
+    stream_ids: List[str]
+    blocks: List[CalculationBlock]
+
+
+def solve_plan(equipment: Dict[str, "EquipmentData"], stream_ids: Iterable[str]) -> SolvePlan:
+    """Derive calculation order and tear streams once for repeated solves"""
+    stream_ids = list(stream_ids)
+    return SolvePlan(stream_ids=stream_ids, blocks=calculation_blocks(equipment, stream_ids))
+
+
+def downstream_units(graph: Dict[str, List[str]], sources: Iterable[str]) -> set:
+    """All units reachable from the given units, including the units themselves"""
+    reached = set()
+    pending = [node for node in sources if node in graph]
+
+    while pending:
+        node = pending.pop()
+        if node in reached:
+            continue
+        reached.add(node)
+        pending.extend(target for target in graph[node] if target not in reached)
+
+    return reached
@@ -0,0 +1,289 @@
+"""
+UF Design Optimization
+Membrane area (module count) and TMP minimizing lifecycle cost or energy under the design limits
+"""
+import math
+import numpy as np
+from scipy.optimize import minimize
+from typing import Any, Dict, List, Literal, Optional, Tuple
+from pydantic import BaseModel
+from ..models.ultrafiltration import UltrafiltrationModel
+from ..config import settings
+
+
+PUMP_EFFICIENCY = 0.75  # same as the model's energy calculation
+FD_STEP = 1e-6  # central difference step in scaled variables
+ACTIVE_TOLERANCE = 1e-4  # relative slack below which a constraint is reported active
+
+# Objective name -> evaluated quantity
+OBJECTIVES = {"lifecycle_cost": "lifecycle_cost", "energy": "specific_energy"}
+
+
+class UFEconomics(BaseModel):
+    """Cost basis for the lifecycle objective"""
+    module_cost: float = 1500.0  # $ per installed module
+    membrane_cost: float = 40.0  # $/m² per membrane replacement
+    electricity_price: float = 0.12  # $/kWh
+    operating_hours_per_year: float = 8000.0  # h/yr
+    plant_life_years: float = 20.0  # yr
+    discount_rate: float = 0.06  # 1/yr
+
+
+class UFOptimizationRequest(BaseModel):
+    """UF design optimization problem"""
+    feed_flow: float  # m³/h
+    required_permeate: float  # m³/h
+    objective: Literal["lifecycle_cost", "energy"] = "lifecycle_cost"
+    temperature: float = 25.0  # °C
+    feed_concentration: float = 0.1  # g/L suspended solids
+    crossflow_velocity: float = 2.0  # m/s
+    operating_hours: float = 0.0  # h (for fouling calculation)
+    membrane_type: str = "PVDF"
+    module_area: float = 50.0  # m² per module
+    min_modules: int = 1
+    max_modules: int = 1000
+    min_tmp: float = 0.05  # bar
+    max_tmp: Optional[float] = None  # bar (default: settings.max_tmp)
+    integer_modules: bool = True
+    economics: UFEconomics = UFEconomics()
+
+
+class UFDesignOptimizer:
+    """Minimizes lifecycle cost or specific energy of a UF train with SLSQP
+
+    Decision variables are the module count (membrane area = modules × module
+    area) and the TMP, scaled to their bounds. Every SLSQP evaluation point is
+    solved together with its central-difference neighbours in one batched model
+    call, so objective, constraints and their gradients come from a single
+    vectorized evaluation. Integer module counts are recovered by re-optimizing
+    TMP at the module counts bracketing the continuous optimum.
+    """
+
+    def __init__(self, request: UFOptimizationRequest):
+        self.request = request
+        self.model = UltrafiltrationModel("UF_OPT")
+        self.max_tmp = request.max_tmp if request.max_tmp is not None else settings.max_tmp
+
+        non_finite = [name for name, value in [*request, *request.economics]
+                      if isinstance(value, float) and not math.isfinite(value)]
+        if non_finite:
+            raise ValueError(f"Inputs must be finite numbers: {', '.join(non_finite)}")
+        if request.feed_flow <= 0:
+            raise ValueError("Feed flow must be positive")
+        if request.required_permeate <= 0:
+            raise ValueError("Required permeate flow must be positive")
+        if request.module_area <= 0:
+            raise ValueError("Module area must be positive")
+        if not 1 <= request.min_modules <= request.max_modules:
+            raise ValueError("Module bounds must satisfy 1 <= min_modules <= max_modules")
+        if not 0 < request.min_tmp < self.max_tmp:
+            raise ValueError("TMP bounds must satisfy 0 < min_tmp < max_tmp")
+        if request.required_permeate > request.feed_flow * settings.max_recovery / 100:
+            raise ValueError(
+                f"Required permeate exceeds {settings.max_recovery}% recovery of the feed flow"
+            )
+
+        self.lower = np.array([request.min_modules, request.min_tmp], dtype=float)
+        self.upper = np.array([request.max_modules, self.max_tmp], dtype=float)
+        self.evaluations = 0
+        self._memo: Dict[Tuple[float, ...], Dict[str, np.ndarray]] = {}
+
+    def _unscale(self, u: np.ndarray) -> np.ndarray:
+        return self.lower + (self.upper - self.lower) * u
+
+    def evaluate(self, modules: np.ndarray, tmp: np.ndarray) -> Dict[str, np.ndarray]:
+        """Batched performance, objectives and constraint values at design points"""
+        request = self.request
+        arrays = self.model.performance_arrays({
+            "feed_flow": request.feed_flow,
+            "membrane_area": modules * request.module_area,
+            "transmembrane_pressure": tmp,
+            "temperature": request.temperature,
+            "feed_concentration": request.feed_concentration,
+            "crossflow_velocity": request.crossflow_velocity,
+            "operating_hours": request.operating_hours,
+            "membrane_type": request.membrane_type,
+        })
+        self.evaluations += modules.size
+
+        # Pumping energy uncapped (the model's 2 kWh/m³ display cap has no gradient)
+        pump_power = tmp * 1e5 * request.feed_flow / (PUMP_EFFICIENCY * 3.6e6)  # kW
+        permeate = arrays["permeate_flow"]
+        specific_energy = pump_power / np.maximum(permeate, 1e-12)  # kWh/m³ permeate
+
+        economics = request.economics
+        rate = economics.discount_rate
+        years = economics.plant_life_years
+        annuity = years if rate == 0 else (1 - (1 + rate) ** -years) / rate  # present value factor
+        capital_cost = modules * economics.module_cost
+        replacement_cost = (
+            arrays["membrane_area"] * economics.membrane_cost * 12 / arrays["membrane_life_prediction"]
+        )  # $/yr
+        energy_cost = pump_power * economics.operating_hours_per_year * economics.electricity_price  # $/yr
+        lifecycle_cost = capital_cost + annuity * (replacement_cost + energy_cost)
+
+        return {
+            **arrays,
+            "modules": modules,
+            "pump_power": pump_power,
+            "specific_energy": specific_energy,
+            "capital_cost": capital_cost,
+            "annual_replacement_cost": replacement_cost,
+            "annual_energy_cost": energy_cost,
+            "lifecycle_cost": lifecycle_cost,
+            # Normalized inequality constraints, feasible when >= 0
+            "constraints": np.stack([
+                permeate / request.required_permeate - 1,
+                1 - arrays["flux"] / settings.max_flux,
+                1 - arrays["recovery"] / settings.max_recovery,
+            ])
+        }
+
+    def _point(self, u: np.ndarray) -> Dict[str, np.ndarray]:
+        """Values and central-difference gradients at a scaled point (memoized)"""
+        key = tuple(u.tolist())
+        if key in self._memo:
+            return self._memo[key]
+
+        # Rows: the point, then +h and -h along each variable
+        offsets = np.vstack([np.zeros(u.size), FD_STEP * np.eye(u.size), -FD_STEP * np.eye(u.size)])
+        x = self._unscale(u + offsets)
+        values = self.evaluate(x[:, 0], x[:, 1])
+
+        objective = values[OBJECTIVES[self.request.objective]] / self._objective_scale
+        constraints = values["constraints"]
+        n = u.size
+
+        def gradient(f: np.ndarray) -> np.ndarray:
+            return (f[..., 1:1 + n] - f[..., 1 + n:]) / (2 * FD_STEP)
+
+        point = {
+            "objective": float(objective[0]),
+            "objective_gradient": gradient(objective),
+            "constraints": constraints[:, 0],
+            "constraint_jacobian": gradient(constraints),
+        }
+        if len(self._memo) > 64:
+            self._memo.clear()
+        self._memo[key] = point
+        return point
+
+    def _initial_point(self) -> np.ndarray:
+        """Mid-range TMP and enough modules for 20 % more than the required permeate"""
+        tmp = (self.lower[1] + self.upper[1]) / 2
+        flux = self.evaluate(np.array([1.0]), np.array([tmp]))["flux"][0]  # L/m²/h
+        modules = 1.2 * self.request.required_permeate * 1000 / max(flux * self.request.module_area, 1e-12)
+        x = np.clip([modules, tmp], self.lower, self.upper)
+        return (x - self.lower) / (self.upper - self.lower)
+
+    def _solve(self, u0: np.ndarray, fixed_modules: Optional[float] = None):
+        """SLSQP from a scaled start point, optionally with the module count held fixed"""
+        bounds = [(0.0, 1.0), (0.0, 1.0)]
+        if fixed_modules is not None:
+            u_modules = (fixed_modules - self.lower[0]) / (self.upper[0] - self.lower[0])
+            bounds[0] = (u_modules, u_modules)
+            u0 = np.array([u_modules, u0[1]])
+
+        return minimize(
+            lambda u: self._point(u)["objective"],
+            u0,
+            jac=lambda u: self._point(u)["objective_gradient"],
+            method="SLSQP",
+            bounds=bounds,
+            constraints=[{
+                "type": "ineq",
+                "fun": lambda u: self._point(u)["constraints"],
+                "jac": lambda u: self._point(u)["constraint_jacobian"],
+            }],
+            options={"maxiter": 200, "ftol": 1e-10}
+        )
+
+    def optimize(self) -> Dict[str, Any]:
+        """Run the optimization and report the optimum and constraint activity"""
+        u0 = self._initial_point()
+        x0 = self._unscale(u0)
+        self._objective_scale = max(
+            abs(float(self.evaluate(x0[:1], x0[1:])[OBJECTIVES[self.request.objective]][0])), 1e-12
+        )
+
+        result = self._solve(u0)
+        candidates = [result]
+        if self.request.integer_modules:
+            modules = self._unscale(result.x)[0]
+            counts = {min(max(m, self.request.min_modules), self.request.max_modules)
+                      for m in (math.floor(modules), math.ceil(modules))}
+            candidates = [self._solve(result.x, fixed_modules=float(m)) for m in sorted(counts)]
+
+        best = self._best(candidates)
+        x = self._unscale(np.clip(best.x, 0.0, 1.0))
+        evaluated = self.evaluate(x[:1], x[1:])
+        feasible = bool(np.all(evaluated.pop("constraints")[:, 0] >= -1e-6))
+        values = {name: value[0] for name, value in evaluated.items()}
+
+        design = {
+            "feed_flow": self.request.feed_flow,
+            "membrane_area": float(values["membrane_area"]),
+            "transmembrane_pressure": float(x[1]),
+            "temperature": self.request.temperature,
+            "feed_concentration": self.request.feed_concentration,
+            "crossflow_velocity": self.request.crossflow_velocity,
+            "operating_hours": self.request.operating_hours,
+            "membrane_type": self.request.membrane_type,
+        }
+        performance = self.model.calculate_performance(design)
+
+        return {
+            "success": bool(best.success) and feasible,
+            "feasible": feasible,
+            "message": best.message,
+            "objective": self.request.objective,
+            "iterations": int(result.nit) + sum(int(c.nit) for c in candidates if c is not result),
+            "model_evaluations": self.evaluations,
+            "optimum": {
+                "modules": float(x[0]) if not self.request.integer_modules else int(round(x[0])),
+                "membrane_area": round(float(values["membrane_area"]), 3),  # m²
+                "transmembrane_pressure": round(float(x[1]), 4),  # bar
+                "permeate_flow": round(float(values["permeate_flow"]), 3),  # m³/h
+                "flux": round(float(values["flux"]), 2),  # L/m²/h
+                "recovery": round(float(values["recovery"]), 2),  # %
+                "specific_energy": round(float(values["specific_energy"]), 5),  # kWh/m³
+                "pump_power": round(float(values["pump_power"]), 4),  # kW
+                "membrane_life_prediction": round(float(values["membrane_life_prediction"]), 1),  # months
+                "capital_cost": round(float(values["capital_cost"]), 2),  # $
+                "annual_replacement_cost": round(float(values["annual_replacement_cost"]), 2),  # $/yr
+                "annual_energy_cost": round(float(values["annual_energy_cost"]), 2),  # $/yr
+                "lifecycle_cost": round(float(values["lifecycle_cost"]), 2),  # $ present value
+            },
+            "constraints": self._constraint_activity(x, values),
+            "performance": performance.model_dump()
+        }
+
+    def _best(self, candidates: List[Any]) -> Any:
+        """Lowest-objective feasible candidate, else the least infeasible one"""
+        def rank(candidate: Any) -> Tuple[float, float]:
+            point = self._point(np.clip(candidate.x, 0.0, 1.0))
+            violation = float(np.maximum(-point["constraints"], 0.0).sum())
+            return (violation if violation > 1e-6 else 0.0, point["objective"])
+        return min(candidates, key=rank)
+
+    def _constraint_activity(self, x: np.ndarray, values: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Value, limit, slack and activity of every constraint and bound at the optimum"""
+        def activity(value: float, limit: float, kind: str) -> Dict[str, Any]:
+            slack = limit - value if kind == "upper" else value - limit
+            return {
+                "value": round(value, 6),
+                "limit": limit,
+                "type": kind,
+                "slack": round(slack, 6) + 0.0,
+                "active": abs(slack) <= ACTIVE_TOLERANCE * max(abs(limit), 1.0),
+            }
+
+        return {
+            "permeate_flow": activity(float(values["permeate_flow"]), self.request.required_permeate, "lower"),
+            "flux": activity(float(values["flux"]), settings.max_flux, "upper"),
+            "recovery": activity(float(values["recovery"]), settings.max_recovery, "upper"),
+            "max_tmp": activity(float(x[1]), self.max_tmp, "upper"),
+            "min_tmp": activity(float(x[1]), self.request.min_tmp, "lower"),
+            "max_modules": activity(float(x[0]), float(self.request.max_modules), "upper"),
+            "min_modules": activity(float(x[0]), float(self.request.min_modules), "lower"),
+        }
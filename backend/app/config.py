@@ -1,12 +1,17 @@
 """
 Application configuration
 """
-from pydantic import BaseSettings
+import os
+import tempfile
+from typing import Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     """Application settings"""
     
+    model_config = SettingsConfigDict(env_file=".env")
+    
     # Application
     app_name: str = "Water Treatment Designer"
     debug: bool = True
@@ -24,8 +29,44 @@ class Settings(BaseSettings):
     max_flux: float = 120.0  # L/m²/h
     max_tmp: float = 3.0  # bar
     
-    class Config:
-        env_file = ".env"
+    # Calculation worker pool
+    calc_executor: str = "thread"  # "thread" or "process"
+    calc_workers: int = 4
+    calc_queue_size: int = 32  # running + waiting calculations before rejecting
+    calc_timeout: float = 60.0  # s per request
+    
+    # Request instrumentation
+    request_timing: bool = False  # Server-Timing headers with per-phase durations
+    metrics_dir: Optional[str] = None  # directory where each worker process writes its totals
+    metrics_flush_interval: float = 5.0  # s between writes
+    
+    # Per-request profiling (admin only)
+    admin_token: Optional[str] = None  # X-Admin-Token value; admin features are off without one
+    profile_dir: str = os.path.join(tempfile.gettempdir(), "water-treatment-profiles")
+    profile_retention: int = 50  # stored profiles kept, newest first
+    profile_sample_interval: float = 0.001  # s between stack samples
+    
+    # Background flowsheet jobs
+    job_workers: int = 2
+    job_retention: int = 256  # finished jobs kept for polling
+    job_max_pending: int = 64  # queued + running jobs before rejecting
+    
+    # Calculation result cache
+    result_cache_size: int = 1024  # entries kept in memory per process
+    result_cache_path: Optional[str] = None  # SQLite file shared across workers
+    result_cache_disk_entries: int = 100_000
+    
+    # Flowsheet parameter sweeps
+    sweep_workers: int = 0  # worker processes, 0 = one per CPU
+    sweep_max_scenarios: int = 10_000
+    sweep_parallel_threshold: int = 32  # smaller sweeps run in the calling process
+    monte_carlo_max_samples: int = 100_000
+    pareto_max_evaluations: int = 5_000_000  # UF model evaluations per Pareto search
+    
+    # Bulk water quality characterization
+    bulk_chunk_rows: int = 250_000  # rows read and scored at a time
+    bulk_max_rows: int = 5_000_000
+    bulk_max_upload_bytes: int = 1_000_000_000
 
 
 settings = Settings()
\ No newline at end of file
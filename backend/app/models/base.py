@@ -1,10 +1,10 @@
 """
 Base equipment model class with common functionality
 """
-import numpy as np
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List
 from pydantic import BaseModel
+from ..utils import water_properties
 from ..utils.validation import EngineeringError
 
 
@@ -52,13 +52,13 @@ class BaseEquipmentModel(ABC):
     
     def water_density(self, temperature: float) -> float:
         """Water density as function of temperature (kg/m³)"""
-        # Simplified correlation for pure water
-        return 1000.0 * (1 - 0.0002 * (temperature - 20))
+        # Tabulated (CoolProp when available), scalar or array temperatures
+        return water_properties.water_density(temperature)
     
     def water_viscosity(self, temperature: float) -> float:
         """Water dynamic viscosity as function of temperature (Pa·s)"""
-        # Simplified correlation for pure water
-        return 0.001 * np.exp(1.3272 * (20 - temperature) / (temperature + 105))
+        # Tabulated (CoolProp when available), scalar or array temperatures
+        return water_properties.water_viscosity(temperature)
     
     def reynolds_number(self, velocity: float, diameter: float, temperature: float) -> float:
         """Calculate Reynolds number"""
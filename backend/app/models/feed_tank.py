@@ -3,9 +3,11 @@ Feed Tank Model with Water Source Characterization
 Allows definition of feed water composition and source parameters
 """
 import numpy as np
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
 from pydantic import BaseModel
 from .base import BaseEquipmentModel, ProcessResults
+from .registry import register_model
+from ..utils.timing import phase
 from ..utils.validation import EngineeringError
 from ..config import settings
 
@@ -29,6 +31,11 @@ class WaterQuality(BaseModel):
     manganese: float = 0.1  # mg/L
 
 
+# Assessment levels in increasing order (batch results are indices into these)
+DIFFICULTY_LEVELS = ["low", "medium", "high", "very_high"]
+FOULING_LEVELS = ["low", "medium", "high"]
+
+
 class FeedTankInputs(BaseModel):
     """Feed tank process inputs"""
     volume: float = 1000.0  # m³
@@ -68,46 +75,45 @@ class FeedTankResults(BaseModel):
     outlet_quality: WaterQuality
 
 
+@register_model("feed_tank")
 class FeedTankModel(BaseEquipmentModel):
     """Feed tank model with water source characterization"""
     
-    def __init__(self, equipment_id: str):
-        super().__init__(equipment_id)
-        
-        # Water source type characteristics
-        self.source_characteristics = {
-            "surface_water": {
-                "typical_turbidity": (2, 20),  # NTU range
-                "typical_tss": (5, 50),  # mg/L range
-                "seasonal_variation": "high",
-                "pretreatment_needs": ["coagulation", "sedimentation", "filtration"]
-            },
-            "groundwater": {
-                "typical_turbidity": (0.1, 2),
-                "typical_tss": (1, 10),
-                "seasonal_variation": "low",
-                "pretreatment_needs": ["iron_removal", "hardness_removal"]
-            },
-            "municipal": {
-                "typical_turbidity": (0.1, 1),
-                "typical_tss": (1, 5),
-                "seasonal_variation": "low",
-                "pretreatment_needs": ["chlorine_removal", "ph_adjustment"]
-            },
-            "industrial": {
-                "typical_turbidity": (1, 100),
-                "typical_tss": (10, 500),
-                "seasonal_variation": "medium",
-                "pretreatment_needs": ["neutralization", "heavy_metal_removal", "organics_removal"]
-            }
+    # Water source type characteristics, shared across instances
+    source_characteristics = {
+        "surface_water": {
+            "typical_turbidity": (2, 20),  # NTU range
+            "typical_tss": (5, 50),  # mg/L range
+            "seasonal_variation": "high",
+            "pretreatment_needs": ["coagulation", "sedimentation", "filtration"]
+        },
+        "groundwater": {
+            "typical_turbidity": (0.1, 2),
+            "typical_tss": (1, 10),
+            "seasonal_variation": "low",
+            "pretreatment_needs": ["iron_removal", "hardness_removal"]
+        },
+        "municipal": {
+            "typical_turbidity": (0.1, 1),
+            "typical_tss": (1, 5),
+            "seasonal_variation": "low",
+            "pretreatment_needs": ["chlorine_removal", "ph_adjustment"]
+        },
+        "industrial": {
+            "typical_turbidity": (1, 100),
+            "typical_tss": (10, 500),
+            "seasonal_variation": "medium",
+            "pretreatment_needs": ["neutralization", "heavy_metal_removal", "organics_removal"]
         }
+    }
     
-    def calculate_performance(self, inputs: Dict[str, Any]) -> ProcessResults:
+    def calculate_performance(self, inputs: Union[Dict[str, Any], FeedTankInputs]) -> ProcessResults:
         """Calculate feed tank performance and water characterization"""
         try:
-            # Parse inputs
-            tank_inputs = FeedTankInputs(**inputs)
-            errors = self.validate_feed_tank_inputs(tank_inputs)
+            # Parse inputs (routes pass models already validated at the edge)
+            with phase("model_inputs"):
+                tank_inputs = inputs if isinstance(inputs, FeedTankInputs) else FeedTankInputs(**inputs)
+                errors = self.validate_feed_tank_inputs(tank_inputs)
             
             if errors:
                 return ProcessResults(success=False, errors=errors)
@@ -337,6 +343,58 @@ class FeedTankModel(BaseEquipmentModel):
         else:
             return "low"
     
+    def characterize_batch(self, quality: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Vectorized water quality assessment over columns of WaterQuality fields
+        
+        Same thresholds as the scalar assessments. Difficulty and fouling are
+        returned as indices into DIFFICULTY_LEVELS / FOULING_LEVELS; the
+        quality-specific pretreatment triggers as a bitmask, in the order that
+        recommend_pretreatment checks them.
+        """
+        q = quality
+        
+        # Two-tier contributions: the higher threshold implies the lower, so the flags add to 2
+        difficulty_score = (
+            (q["turbidity"] > 10).astype(np.int8) + (q["turbidity"] > 5)
+            + (q["tss"] > 50) + (q["tss"] > 20)
+            + (q["tds"] > 1000) + (q["tds"] > 500)
+            + (q["cod"] > 100) + (q["cod"] > 50)
+            + (q["fog"] > 20) + (q["fog"] > 10)
+            + ((q["ph"] < 6) | (q["ph"] > 9)) + ((q["ph"] < 6.5) | (q["ph"] > 8.5))
+            + (q["hardness"] > 300)
+        )
+        
+        sdi = np.clip(
+            1.0 + q["turbidity"] * 0.2 + q["tss"] * 0.05 + q["iron"] * 2.0 + q["cod"] * 0.01 + q["fog"] * 0.1,
+            1.0, 15.0
+        )
+        
+        fouling_score = (
+            (q["cod"] > 10).astype(np.int8) + (q["bod"] > 5) + (q["fog"] > 5)
+            + (q["hardness"] > 200) + (q["iron"] > 0.2) + (q["manganese"] > 0.05)
+            + (q["turbidity"] > 1) + (q["tss"] > 10)
+        )
+        
+        triggers = [
+            q["turbidity"] > 5,
+            (q["ph"] < 6.5) | (q["ph"] > 8.5),
+            q["hardness"] > 200,
+            q["iron"] > 0.3,
+            q["cod"] > 50,
+            q["tss"] > 30,
+            q["fog"] > 10,
+        ]
+        pretreatment_mask = np.zeros(len(sdi), dtype=np.uint8)
+        for bit, triggered in enumerate(triggers):
+            pretreatment_mask |= triggered.astype(np.uint8) << bit
+        
+        return {
+            "treatment_difficulty": np.searchsorted([2, 4, 6], difficulty_score, side="right").astype(np.uint8),
+            "sdi_estimate": sdi,
+            "fouling_potential": np.searchsorted([3, 5], fouling_score, side="right").astype(np.uint8),
+            "pretreatment_mask": pretreatment_mask
+        }
+    
     def calculate_outlet_quality(self, inlet_quality: WaterQuality, 
                                residence_time: float, temperature: float) -> WaterQuality:
         """Calculate outlet water quality (minimal changes in storage tank)"""
@@ -0,0 +1,39 @@
+"""
+Centrifugal Pump Model
+Hydraulic power from flow, discharge pressure and efficiency
+"""
+from typing import Dict, Any
+from .base import BaseEquipmentModel, ProcessResults
+from .registry import register_model
+from ..config import settings
+
+
+@register_model("pump")
+class PumpModel(BaseEquipmentModel):
+    """Simple centrifugal pump model"""
+    
+    def calculate_performance(self, inputs: Dict[str, Any]) -> ProcessResults:
+        """Calculate discharge conditions and power consumption"""
+        flow_rate = inputs.get("total_inlet_flow", 0.0)
+        pump_efficiency = inputs.get("efficiency", 0.75)
+        discharge_pressure = inputs.get("discharge_pressure", 3.0)
+        
+        return ProcessResults(
+            success=True,
+            data={
+                "discharge_flow": flow_rate,
+                "discharge_pressure": discharge_pressure,
+                "power_consumption": self.calculate_pump_power(
+                    flow_rate, discharge_pressure, pump_efficiency
+                )
+            }
+        )
+    
+    def calculate_pump_power(self, flow_rate: float, head: float, efficiency: float) -> float:
+        """Calculate pump power consumption (kW)"""
+        # Power = ρ × g × Q × H / η
+        flow_m3_s = flow_rate / 3600  # m³/s
+        head_m = head * 10.2  # bar to m
+        
+        power_kw = (settings.water_density * settings.gravity * flow_m3_s * head_m) / (efficiency * 1000)
+        return max(power_kw, 0.0)
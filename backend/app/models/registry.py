@@ -0,0 +1,68 @@
+"""
+Equipment Model Registry
+Maps equipment types to model classes and pools model instances per solve
+"""
+from importlib.metadata import entry_points
+from typing import Callable, Dict, List, Type
+from .base import BaseEquipmentModel
+
+# Third-party packages expose models under this group, e.g.
+# [project.entry-points."water_treatment_designer.equipment_models"]
+# reverse_osmosis = "my_package.ro:ReverseOsmosisModel"
+ENTRY_POINT_GROUP = "water_treatment_designer.equipment_models"
+
+# Unknown equipment types are solved as pass-through units (outlet = inlet)
+DEFAULT_EQUIPMENT_TYPE = "tank"
+
+_registry: Dict[str, Type[BaseEquipmentModel]] = {}
+_plugins_loaded = False
+
+
+def register_model(equipment_type: str) -> Callable[[Type[BaseEquipmentModel]], Type[BaseEquipmentModel]]:
+    """Class decorator registering a model for an equipment type"""
+    def decorator(model_class: Type[BaseEquipmentModel]) -> Type[BaseEquipmentModel]:
+        _registry[equipment_type] = model_class
+        return model_class
+    return decorator
+
+
+def _load_models():
+    """Import built-in models and entry point plugins once"""
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+
+    # Built-in models register themselves on import
+    from . import feed_tank, pump, tank, ultrafiltration  # noqa: F401
+
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        _registry.setdefault(entry_point.name, entry_point.load())
+
+    _plugins_loaded = True
+
+
+def get_model_class(equipment_type: str) -> Type[BaseEquipmentModel]:
+    """Model class for an equipment type, falling back to the pass-through model"""
+    _load_models()
+    return _registry.get(equipment_type, _registry[DEFAULT_EQUIPMENT_TYPE])
+
+
+def registered_types() -> List[str]:
+    """All registered equipment types"""
+    _load_models()
+    return list(_registry)
+
+
+class ModelPool:
+    """Model instances reused across iterations of one solve, keyed by equipment_id"""
+
+    def __init__(self):
+        self._models: Dict[str, BaseEquipmentModel] = {}
+
+    def get(self, equipment_id: str, equipment_type: str) -> BaseEquipmentModel:
+        """Return the pooled model for a unit, creating it on first use"""
+        model = self._models.get(equipment_id)
+        if model is None:
+            model = get_model_class(equipment_type)(equipment_id)
+            self._models[equipment_id] = model
+        return model
@@ -0,0 +1,23 @@
+"""
+Storage Tank Model
+Simple pass-through vessel: outlet flow equals total inlet flow
+"""
+from typing import Dict, Any
+from .base import BaseEquipmentModel, ProcessResults
+from .registry import register_model
+
+
+@register_model("tank")
+class TankModel(BaseEquipmentModel):
+    """Storage tank model (also used for generic pass-through equipment)"""
+    
+    def calculate_performance(self, inputs: Dict[str, Any]) -> ProcessResults:
+        """Outlet = inlet at the configured pressure and temperature"""
+        return ProcessResults(
+            success=True,
+            data={
+                "outlet_flow": inputs.get("total_inlet_flow", 0.0),
+                "outlet_pressure": inputs.get("pressure", 1.0),
+                "outlet_temperature": inputs.get("temperature", 25.0)
+            }
+        )
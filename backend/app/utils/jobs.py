@@ -0,0 +1,161 @@
+"""
+Background calculation jobs
+In-process job manager with submit/poll/cancel for long-running solves
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Literal, Optional
+from pydantic import BaseModel
+from ..config import settings
+
+JobStatus = Literal["queued", "running", "succeeded", "failed", "cancelled"]
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation was requested"""
+
+
+class JobQueueFullError(Exception):
+    """Raised when too many jobs are queued or running"""
+
+
+class JobProgress(BaseModel):
+    """Latest convergence information reported by a running job"""
+    iteration: int = 0
+    max_error: Optional[float] = None
+
+
+class JobInfo(BaseModel):
+    """Job status as returned by the API"""
+    job_id: str
+    status: JobStatus
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: JobProgress = JobProgress()
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+class Job:
+    """Mutable job state shared between the API and the worker thread"""
+    
+    def __init__(self, job_id: str):
+        self.info = JobInfo(job_id=job_id, status="queued", created_at=time.time())
+        self.cancel_requested = threading.Event()
+        self.future: Optional[Future] = None
+    
+    def report_progress(self, iteration: int, max_error: float):
+        """Progress callback for the solver; raises JobCancelled when cancelled"""
+        self.info.progress = JobProgress(iteration=iteration, max_error=max_error)
+        if self.cancel_requested.is_set():
+            raise JobCancelled()
+
+
+class JobManager:
+    """Runs jobs on a local thread pool and keeps the most recent ones for polling
+    
+    At most max_pending jobs may be queued or running at once; further
+    submissions are rejected immediately.
+    """
+    
+    def __init__(self, workers: int = 2, retention: int = 256, max_pending: int = 64):
+        self.workers = workers
+        self.retention = retention
+        self.max_pending = max_pending
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    def submit(self, fn: Callable[..., Dict[str, Any]], *args: Any) -> JobInfo:
+        """Queue fn(*args, progress=callback); fn returns the job's result payload"""
+        job = Job(uuid.uuid4().hex)
+        
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFullError(f"Job queue full ({self.max_pending} pending), retry later")
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+            self._jobs[job.info.job_id] = job
+            self._evict()
+            job.future = self._executor.submit(self._run, job, fn, args)
+        
+        return job.info
+    
+    def get(self, job_id: str) -> Optional[JobInfo]:
+        """Current job info, or None for unknown or evicted jobs"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job.info if job is not None else None
+    
+    def cancel(self, job_id: str) -> Optional[JobInfo]:
+        """Request cancellation; running solves stop at their next progress report"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        
+        job.cancel_requested.set()
+        if job.future is not None and job.future.cancel():
+            self._finish(job, "cancelled")
+        return job.info
+    
+    def shutdown(self):
+        """Cancel queued jobs and stop accepting work"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel_requested.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    def _run(self, job: Job, fn: Callable[..., Dict[str, Any]], args: tuple):
+        if job.cancel_requested.is_set():
+            self._finish(job, "cancelled")
+            return
+        
+        job.info.status = "running"
+        job.info.started_at = time.time()
+        
+        try:
+            result = fn(*args, progress=job.report_progress)
+        except JobCancelled:
+            self._finish(job, "cancelled")
+        except Exception as e:
+            self._finish(job, "failed", error=str(e))
+        else:
+            self._finish(job, "succeeded", result=result)
+    
+    def _finish(self, job: Job, status: JobStatus, result: Optional[Dict[str, Any]] = None,
+                error: Optional[str] = None):
+        job.info.result = result
+        job.info.error = error
+        job.info.finished_at = time.time()
+        job.info.status = status
+        with self._lock:
+            self._pending -= 1
+    
+    def _evict(self):
+        """Drop the oldest finished jobs beyond the retention limit"""
+        excess = len(self._jobs) - self.retention
+        if excess <= 0:
+            return
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id].info.finished_at is not None:
+                del self._jobs[job_id]
+                excess -= 1
+
+
+job_manager = JobManager(
+    workers=settings.job_workers,
+    retention=settings.job_retention,
+    max_pending=settings.job_max_pending
+)
@@ -0,0 +1,260 @@
+"""
+Process metrics
+Sharded counters and histograms rendered in the Prometheus text format, shared across workers via a directory
+"""
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from ..config import settings
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)  # s
+ITERATION_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+Labels = Tuple[str, ...]
+
+
+class _Shard:
+    """Samples recorded by one thread; only that thread writes to it"""
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], List[float]] = {}  # bucket counts (+Inf last), then sum
+
+
+class Counter:
+    """Monotonic counter with fixed label names"""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, labelnames: Sequence[str]):
+        self.registry = registry
+        self.name = name
+        self.labelnames = tuple(labelnames)
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        counters = self.registry._shard().counters
+        key = (self.name, labels)
+        counters[key] = counters.get(key, 0.0) + amount
+
+
+class Histogram:
+    """Cumulative-bucket histogram with fixed label names"""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, labelnames: Sequence[str],
+                 buckets: Sequence[float]):
+        self.registry = registry
+        self.name = name
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(float(bound) for bound in buckets)
+
+    def observe(self, value: float, *labels: str):
+        histograms = self.registry._shard().histograms
+        key = (self.name, labels)
+        values = histograms.get(key)
+        if values is None:
+            values = histograms[key] = [0.0] * (len(self.buckets) + 2)
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+
+class MetricsRegistry:
+    """Lock-free in-process metrics aggregated across server workers
+
+    Every thread records into its own shard, so hot paths never take a lock;
+    a scrape sums the shards. Callback metrics (e.g. queue depth) are read at
+    scrape time. With a metrics directory configured, each process
+    periodically writes its totals to <dir>/metrics_<pid>.json and a scrape
+    adds the other processes' files: counters and histograms of exited
+    processes keep counting, callback values only of live ones. Clear the
+    directory before starting the server.
+    """
+
+    def __init__(self, directory: Optional[str] = None, flush_interval: float = 5.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._metrics: Dict[str, Any] = {}
+        self._help: Dict[str, str] = {}
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        """Fresh state; a forked process must not report its parent's samples or live values"""
+        self._callbacks: Dict[str, Tuple[str, Callable[[], float]]] = {}  # name -> (type, fn)
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._shards_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(name, help_text, Counter(self, name, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(name, help_text, Histogram(self, name, labelnames, buckets))
+
+    def callback(self, name: str, help_text: str, fn: Callable[[], float], metric_type: str = "gauge"):
+        """Metric whose value this process reads from fn at scrape time
+        
+        Register from the server process after any fork (e.g. at startup):
+        callbacks are dropped in forked children such as pool workers.
+        """
+        self._help[name] = help_text
+        self._callbacks[name] = (metric_type, fn)
+
+    def _register(self, name: str, help_text: str, metric: Any) -> Any:
+        self._help[name] = help_text
+        self._metrics[name] = metric
+        return metric
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+                self._start_flusher()
+        return shard
+
+    def snapshot(self) -> Dict[str, Any]:
+        """This process's totals in the JSON form written to the metrics directory"""
+        counters: Dict[Tuple[str, Labels], float] = {}
+        histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        for shard in list(self._shards):
+            for key, value in list(shard.counters.items()):
+                counters[key] = counters.get(key, 0.0) + value
+            for key, values in list(shard.histograms.items()):
+                total = histograms.setdefault(key, [0.0] * len(values))
+                for i, value in enumerate(list(values)):
+                    total[i] += value
+
+        callbacks = []
+        for name, (_, fn) in self._callbacks.items():
+            try:
+                callbacks.append([name, float(fn())])
+            except Exception:
+                continue
+
+        return {
+            "pid": os.getpid(),
+            "time": time.time(),
+            "counters": [[name, list(labels), value] for (name, labels), value in counters.items()],
+            "histograms": [[name, list(labels), values] for (name, labels), values in histograms.items()],
+            "callbacks": callbacks
+        }
+
+    def flush(self):
+        """Write this process's snapshot to the metrics directory (atomic replace)"""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"metrics_{os.getpid()}.json")
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(f"{path}.tmp", path)
+
+    def _start_flusher(self):
+        """Background thread writing the snapshot every flush_interval (caller holds the shards lock)"""
+        if not self.directory or self._flusher is not None:
+            return
+
+        def flush_periodically():
+            while True:
+                time.sleep(self.flush_interval)
+                try:
+                    self.flush()
+                except OSError:
+                    pass
+
+        self._flusher = threading.Thread(target=flush_periodically, name="metrics-flush", daemon=True)
+        self._flusher.start()
+
+    def collect(self) -> List[Dict[str, Any]]:
+        """Snapshots of this process (live) and of the other processes in the directory"""
+        snapshots = [self.snapshot()]
+        if not self.directory:
+            return snapshots
+        for path in glob.glob(os.path.join(self.directory, "metrics_*.json")):
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if snapshot["pid"] == os.getpid():
+                continue
+            if not _alive(snapshot["pid"]):
+                snapshot["callbacks"] = []
+            snapshots.append(snapshot)
+        return snapshots
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        counters: Dict[str, Dict[Labels, float]] = {}
+        histograms: Dict[str, Dict[Labels, List[float]]] = {}
+        callbacks: Dict[str, float] = {}
+        for snapshot in self.collect():
+            for name, labels, value in snapshot["counters"]:
+                series = counters.setdefault(name, {})
+                series[tuple(labels)] = series.get(tuple(labels), 0.0) + value
+            for name, labels, values in snapshot["histograms"]:
+                total = histograms.setdefault(name, {}).setdefault(tuple(labels), [0.0] * len(values))
+                for i, value in enumerate(values):
+                    total[i] += value
+            for name, value in snapshot["callbacks"]:
+                callbacks[name] = callbacks.get(name, 0.0) + value
+
+        lines = []
+        for name, metric in self._metrics.items():
+            if isinstance(metric, Counter):
+                lines += self._header(name, "counter")
+                for labels, value in sorted(counters.get(name, {}).items()):
+                    lines.append(f"{name}{_labels(metric.labelnames, labels)} {_number(value)}")
+                continue
+
+            lines += self._header(name, "histogram")
+            for labels, values in sorted(histograms.get(name, {}).items()):
+                cumulative = 0.0
+                for bound, count in zip(metric.buckets + (float("inf"),), values[:-1]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _number(bound)
+                    lines.append(f"{name}_bucket{_labels(metric.labelnames + ('le',), labels + (le,))} "
+                                 f"{_number(cumulative)}")
+                lines.append(f"{name}_sum{_labels(metric.labelnames, labels)} {_number(values[-1])}")
+                lines.append(f"{name}_count{_labels(metric.labelnames, labels)} {_number(cumulative)}")
+
+        for name, (metric_type, _) in self._callbacks.items():
+            if name in callbacks:
+                lines += self._header(name, metric_type)
+                lines.append(f"{name} {_number(callbacks[name])}")
+
+        return "\n".join(lines) + "\n"
+
+    def _header(self, name: str, metric_type: str) -> List[str]:
+        return [f"# HELP {name} {self._help[name]}", f"# TYPE {name} {metric_type}"]
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+metrics = MetricsRegistry(directory=settings.metrics_dir, flush_interval=settings.metrics_flush_interval)
@@ -0,0 +1,154 @@
+"""
+Per-request profiling
+cProfile or stack-sampling runs of single calculations, stored locally and retrieved by id
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, List, Literal, Optional, Tuple
+from pydantic import BaseModel
+from ..config import settings
+
+ProfilerKind = Literal["cprofile", "sample"]
+
+# Artifact format -> file suffix
+PROFILE_FORMATS = {
+    "pstats": ".pstats",  # cProfile: load with pstats.Stats or snakeviz
+    "text": ".txt",  # cProfile: top functions by cumulative time
+    "collapsed": ".collapsed",  # sampling: folded stacks for flamegraph.pl / speedscope
+}
+
+PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ProfileInfo(BaseModel):
+    """Stored profile as returned by the API"""
+    profile_id: str
+    profiler: ProfilerKind
+    route: str
+    created_at: float
+    duration_ms: float
+    samples: Optional[int] = None  # sampling profiler only
+    formats: List[str]
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval into folded-stack counts
+
+    The sampler needs the GIL, so pure-Python code is sampled at most every
+    switch interval (5 ms by default); time inside GIL-releasing NumPy/SciPy
+    calls is attributed to the calling Python frame.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+
+def profile_path(profile_id: str, fmt: str) -> str:
+    return os.path.join(settings.profile_dir, profile_id + PROFILE_FORMATS.get(fmt, ".json"))
+
+
+def profiled_call(profiler: ProfilerKind, profile_id: str, route: str,
+                  fn: Callable[..., Any], args: Tuple[Any, ...]) -> Any:
+    """Run fn(*args) under the profiler (in a pool worker) and store its artifacts"""
+    os.makedirs(settings.profile_dir, exist_ok=True)
+    created_at = time.time()
+    started = time.perf_counter()
+    samples = None
+
+    if profiler == "cprofile":
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            result = fn(*args)
+        finally:
+            profile.disable()
+            duration = time.perf_counter() - started
+            profile.dump_stats(profile_path(profile_id, "pstats"))
+            report = io.StringIO()
+            pstats.Stats(profile, stream=report).sort_stats("cumulative").print_stats(80)
+            with open(profile_path(profile_id, "text"), "w") as f:
+                f.write(report.getvalue())
+        formats = ["pstats", "text"]
+    else:
+        sampler = StackSampler(threading.get_ident(), settings.profile_sample_interval)
+        sampler.start()
+        try:
+            result = fn(*args)
+        finally:
+            sampler.stop()
+            duration = time.perf_counter() - started
+            with open(profile_path(profile_id, "collapsed"), "w") as f:
+                f.writelines(f"{stack} {count}\n" for stack, count in sampler.stacks.most_common())
+            samples = sum(sampler.stacks.values())
+        formats = ["collapsed"]
+
+    info = ProfileInfo(profile_id=profile_id, profiler=profiler, route=route, created_at=created_at,
+                       duration_ms=round(duration * 1000, 3), samples=samples, formats=formats)
+    with open(profile_path(profile_id, "info"), "w") as f:
+        f.write(info.model_dump_json())
+    _trim_profiles()
+    return result
+
+
+def list_profiles() -> List[ProfileInfo]:
+    """Stored profiles, newest first"""
+    if not os.path.isdir(settings.profile_dir):
+        return []
+    profiles = []
+    for name in os.listdir(settings.profile_dir):
+        profile_id, suffix = os.path.splitext(name)
+        if suffix == ".json" and PROFILE_ID.match(profile_id):
+            info = get_profile(profile_id)
+            if info is not None:
+                profiles.append(info)
+    return sorted(profiles, key=lambda info: -info.created_at)
+
+
+def get_profile(profile_id: str) -> Optional[ProfileInfo]:
+    """Profile metadata, or None for unknown (or malformed) ids"""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(profile_path(profile_id, "info")) as f:
+            return ProfileInfo.model_validate_json(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _trim_profiles():
+    """Delete the oldest profiles above the retention bound"""
+    for info in list_profiles()[settings.profile_retention:]:
+        for fmt in info.formats + ["info"]:
+            try:
+                os.remove(profile_path(info.profile_id, fmt))
+            except OSError:
+                pass
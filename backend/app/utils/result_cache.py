@@ -0,0 +1,202 @@
+"""
+Calculation result cache
+Canonical-hash keyed LRU with an optional SQLite store shared across server workers
+"""
+import hashlib
+import json
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+from pydantic import BaseModel
+from ..config import settings
+from .metrics import metrics
+
+
+APP_ROOT = Path(__file__).resolve().parent.parent
+ACCESS_REFRESH_INTERVAL = 600.0  # s; a disk hit rewrites its LRU timestamp at most this often
+
+CACHE_LOOKUPS = metrics.counter(
+    "result_cache_lookups_total", "Result cache lookups by outcome (hit, disk_hit, miss)", ("outcome",)
+)
+CACHE_EVICTIONS = metrics.counter("result_cache_evictions_total", "Result cache entries evicted from memory")
+
+
+def normalize(value: Any) -> Any:
+    """Canonical form of a request: models expanded with defaults, numbers as 12-digit floats"""
+    if isinstance(value, BaseModel):
+        value = value.model_dump()
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        value = float(value)
+        if not math.isfinite(value):
+            return repr(value)
+        # Drops representation noise (0.1 + 0.2) and folds -0.0 into 0.0
+        return float(f"{value:.12g}") + 0.0
+    return str(value)
+
+
+def code_fingerprint() -> str:
+    """Hash of the calculation code, Settings and property source; changes invalidate entries"""
+    from .water_properties import get_tables
+
+    digest = hashlib.sha256()
+    for path in sorted(APP_ROOT.rglob("*.py")):
+        digest.update(str(path.relative_to(APP_ROOT)).encode())
+        digest.update(path.read_bytes())
+    digest.update(json.dumps(normalize(settings.model_dump()), sort_keys=True).encode())
+    digest.update(get_tables().source.encode())
+    return digest.hexdigest()[:16]
+
+
+class ResultCache:
+    """LRU of rendered calculation responses keyed by canonical request hash
+
+    Entries live in memory (per process) and, when a path is configured, in a
+    SQLite database that every server worker reads and writes. Keys include the
+    code fingerprint, so changing model code or Settings never serves stale
+    results; stale disk rows are purged when the store is opened. Responses are
+    kept as the body sent to the client (JSON text or a binary columnar
+    format), so hits are served without re-serializing.
+    """
+
+    def __init__(self, max_entries: int = 1024, path: Optional[str] = None,
+                 max_disk_entries: int = 100_000):
+        self.max_entries = max_entries
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[str, Union[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._fingerprint: Optional[str] = None
+        self._db: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def fingerprint(self) -> str:
+        if self._fingerprint is None:
+            self._fingerprint = code_fingerprint()
+        return self._fingerprint
+
+    def key(self, kind: str, request: Any) -> str:
+        """Canonical hash of a normalized request of the given kind"""
+        canonical = json.dumps(normalize(request), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(f"{self.fingerprint}:{kind}:{canonical}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Union[str, bytes]]:
+        """Cached response body, or None on a miss"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                CACHE_LOOKUPS.inc("hit")
+                return self._entries[key]
+
+            db = self._connection()
+            if db is not None:
+                row = db.execute("SELECT value, accessed FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value, accessed = row
+                    # Reads stay read-only unless the disk LRU timestamp is stale
+                    now = time.time()
+                    if now - accessed > ACCESS_REFRESH_INTERVAL:
+                        db.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+                        db.commit()
+                    self._remember(key, value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    CACHE_LOOKUPS.inc("disk_hit")
+                    return value
+
+            self.misses += 1
+            CACHE_LOOKUPS.inc("miss")
+            return None
+
+    def put(self, key: str, value: Union[str, bytes]):
+        """Store a rendered response body"""
+        with self._lock:
+            self._remember(key, value)
+
+            db = self._connection()
+            if db is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO results (key, fingerprint, value, accessed) VALUES (?, ?, ?, ?)",
+                    (key, self.fingerprint, value, time.time())
+                )
+                self._writes += 1
+                if self._writes % 256 == 0:
+                    self._trim_disk(db)
+                db.commit()
+
+    def clear(self):
+        """Drop every entry (memory and disk)"""
+        with self._lock:
+            self._entries.clear()
+            db = self._connection()
+            if db is not None:
+                db.execute("DELETE FROM results")
+                db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of this process"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "disk_store": self.path
+        }
+
+    def _remember(self, key: str, value: Union[str, bytes]):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+            CACHE_EVICTIONS.inc()
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """SQLite store, opened on first use (caller holds the lock)"""
+        if self.path is None or self._db is not None:
+            return self._db
+
+        db = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, value TEXT NOT NULL, accessed REAL NOT NULL)"
+        )
+        db.execute("DELETE FROM results WHERE fingerprint != ?", (self.fingerprint,))
+        db.commit()
+        self._db = db
+        return db
+
+    def _trim_disk(self, db: sqlite3.Connection):
+        """Evict least recently used disk rows above the size bound"""
+        db.execute(
+            "DELETE FROM results WHERE key IN ("
+            "SELECT key FROM results ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        )
+
+
+result_cache = ResultCache(
+    max_entries=settings.result_cache_size,
+    path=settings.result_cache_path,
+    max_disk_entries=settings.result_cache_disk_entries
+)
@@ -0,0 +1,110 @@
+"""
+Request phase timing
+Per-request phase durations (perf_counter_ns) reported as Server-Timing headers
+"""
+from contextvars import ContextVar
+from time import perf_counter_ns
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from starlette.datastructures import MutableHeaders
+
+# Timer of the request (or worker task) being handled; None when timing is off
+_timer: ContextVar[Optional["PhaseTimer"]] = ContextVar("phase_timer", default=None)
+
+
+class PhaseTimer:
+    """Accumulated duration and count of each named phase of one request
+
+    Phases may nest or repeat (e.g. every model evaluation of a solve adds to
+    "model"), so they are totals rather than a partition of the request.
+    """
+
+    def __init__(self):
+        self.started_ns = perf_counter_ns()
+        self.phases: Dict[str, List[int]] = {}  # name -> [total ns, count]
+
+    def add(self, name: str, elapsed_ns: int, count: int = 1):
+        totals = self.phases.setdefault(name, [0, 0])
+        totals[0] += elapsed_ns
+        totals[1] += count
+
+    def merge(self, phases: Dict[str, List[int]]):
+        """Add phases recorded by another timer (a worker thread or process)"""
+        for name, (elapsed_ns, count) in phases.items():
+            self.add(name, elapsed_ns, count)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {name: {"ms": round(elapsed_ns / 1e6, 3), "count": count}
+                for name, (elapsed_ns, count) in self.phases.items()}
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, e.g. 'solve;dur=12.5, model;dur=9.1;desc="42 calls"'"""
+        return ", ".join(
+            f"{name};dur={elapsed_ns / 1e6:.3f}" + (f';desc="{count} calls"' if count > 1 else "")
+            for name, (elapsed_ns, count) in self.phases.items()
+        )
+
+
+class phase:
+    """Times a block into the current timer; only a context lookup when timing is off"""
+    __slots__ = ("name", "timer", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.timer = _timer.get()
+        if self.timer is not None:
+            self.started = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.timer is not None:
+            self.timer.add(self.name, perf_counter_ns() - self.started)
+
+
+def current_timer() -> Optional[PhaseTimer]:
+    """Timer of the current request, or None when timing is off"""
+    return _timer.get()
+
+
+def timed_call(fn: Callable[..., Any], args: Tuple[Any, ...]) -> Tuple[Any, Dict[str, List[int]]]:
+    """Run fn(*args) under a fresh timer (in a pool worker); return the result and its phases"""
+    timer = PhaseTimer()
+    token = _timer.set(timer)
+    try:
+        result = fn(*args)
+    finally:
+        _timer.reset(token)
+    timer.add("calc", perf_counter_ns() - timer.started_ns)
+    return result, timer.phases
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware giving every HTTP request a timer and a Server-Timing header
+
+    Installed only when request timing is enabled, so requests pay nothing
+    otherwise. The header is written when the response starts; "total" covers
+    the request up to that point (the first chunk for streamed responses).
+    """
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timer = PhaseTimer()
+        token = _timer.set(timer)
+
+        async def send_with_timing(message: Dict[str, Any]):
+            if message["type"] == "http.response.start":
+                timer.add("total", perf_counter_ns() - timer.started_ns)
+                MutableHeaders(scope=message).append("Server-Timing", timer.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timer.reset(token)
@@ -0,0 +1,56 @@
+"""
+Solver trace utilities
+Structured, level-gated per-iteration trace; solvers hold None when tracing is off
+"""
+import logging
+from time import perf_counter
+from typing import List, Literal, Optional
+from pydantic import BaseModel
+
+logger = logging.getLogger("app.solver")
+
+TraceLevel = Literal["iteration", "unit"]
+
+
+class TraceEntry(BaseModel):
+    """One trace record: a unit evaluation or a convergence iteration"""
+    iteration: int
+    unit: str
+    residual: Optional[float] = None
+    elapsed_ms: float
+
+
+class SolverTrace:
+    """Collects compact trace entries during a solve
+    
+    "iteration" records one entry per recycle/Newton iteration with its
+    residual; "unit" additionally records every equipment evaluation.
+    """
+    
+    def __init__(self, level: TraceLevel = "iteration"):
+        self.level = level
+        self.per_unit = level == "unit"
+        self.iteration = 1
+        self.entries: List[TraceEntry] = []
+        self._log = logger.isEnabledFor(logging.DEBUG)
+    
+    def unit(self, equipment_id: str, started: float):
+        """Record a unit evaluation that began at perf_counter() == started"""
+        if self.per_unit:
+            self._add(equipment_id, None, started)
+    
+    def step(self, label: str, residual: float, started: float):
+        """Record a convergence iteration and its residual"""
+        self._add(label, residual, started)
+    
+    def _add(self, label: str, residual: Optional[float], started: float):
+        entry = TraceEntry(
+            iteration=self.iteration,
+            unit=label,
+            residual=residual,
+            elapsed_ms=round((perf_counter() - started) * 1000, 4)
+        )
+        self.entries.append(entry)
+        if self._log:
+            logger.debug("iter=%d unit=%s residual=%s elapsed_ms=%.4f",
+                         entry.iteration, entry.unit, entry.residual, entry.elapsed_ms)
@@ -0,0 +1,145 @@
+"""
+Tabulated water properties
+Density and viscosity tables built once from CoolProp, with fast scalar and vectorized interpolation
+"""
+import threading
+import numpy as np
+from typing import NamedTuple, Optional
+
+
+T_MIN = 0.0  # °C
+T_MAX = 100.0  # °C
+T_STEP = 0.05  # °C
+TEMPERATURE_GRID = np.linspace(T_MIN, T_MAX, int(round((T_MAX - T_MIN) / T_STEP)) + 1)
+
+# Seawater mass fraction (kg/kg); range of CoolProp's MITSW incompressible model
+SALINITY_GRID = np.linspace(0.0, 0.12, 25)
+
+# Above saturation over the whole grid (liquid at 100 °C); liquid properties vary < 0.05 % up to 10 bar
+REFERENCE_PRESSURE = 2e5  # Pa
+
+
+class PropertyTables(NamedTuple):
+    """Density (kg/m³) and viscosity (Pa·s), rows by salinity, columns by temperature"""
+    density: np.ndarray
+    viscosity: np.ndarray
+    salinity: np.ndarray
+    source: str  # "CoolProp" or "correlation"
+    density_row: list  # pure-water rows as Python floats for the scalar path
+    viscosity_row: list
+
+
+def _make_tables(density: np.ndarray, viscosity: np.ndarray, salinity: np.ndarray,
+                 source: str) -> PropertyTables:
+    return PropertyTables(density, viscosity, salinity, source,
+                          density[0].tolist(), viscosity[0].tolist())
+
+
+def _correlation_tables() -> PropertyTables:
+    """Fallback tables from the simplified pure-water correlations (no salinity effect)"""
+    t = TEMPERATURE_GRID
+    density = 1000.0 * (1 - 0.0002 * (t - 20))
+    viscosity = 0.001 * np.exp(1.3272 * (20 - t) / (t + 105))
+    return _make_tables(density[np.newaxis], viscosity[np.newaxis], SALINITY_GRID[:1], "correlation")
+
+
+def _coolprop_tables() -> PropertyTables:
+    """Tables from CoolProp: IAPWS water for pure water, MITSW seawater for saline rows"""
+    from CoolProp.CoolProp import PropsSI
+
+    kelvin = TEMPERATURE_GRID + 273.15
+    density = np.empty((SALINITY_GRID.size, kelvin.size))
+    viscosity = np.empty_like(density)
+
+    for i, salinity in enumerate(SALINITY_GRID):
+        fluid = "Water" if salinity == 0 else f"INCOMP::MITSW[{salinity}]"
+        density[i] = PropsSI("D", "T", kelvin, "P", REFERENCE_PRESSURE, fluid)
+        viscosity[i] = PropsSI("V", "T", kelvin, "P", REFERENCE_PRESSURE, fluid)
+
+    if not (np.all(np.isfinite(density)) and np.all(np.isfinite(viscosity))):
+        raise ValueError("CoolProp returned non-finite liquid properties")
+
+    return _make_tables(density, viscosity, SALINITY_GRID, "CoolProp")
+
+
+_tables: Optional[PropertyTables] = None
+_lock = threading.Lock()
+
+
+def get_tables() -> PropertyTables:
+    """Module-level tables, built on first use"""
+    global _tables
+    if _tables is None:
+        with _lock:
+            if _tables is None:
+                try:
+                    _tables = _coolprop_tables()
+                except Exception:
+                    # CoolProp missing or failing: keep the original correlations
+                    _tables = _correlation_tables()
+    return _tables
+
+
+def install_tables(tables: PropertyTables):
+    """Use tables built elsewhere (e.g. handed to a worker process) instead of rebuilding them"""
+    global _tables
+    _tables = tables
+
+
+def _grid_position(values, lowest: float, step: float, size: int):
+    """Lower grid index and fraction on a uniform grid, clamped to its ends"""
+    position = (np.clip(values, lowest, lowest + step * (size - 1)) - lowest) / step
+    index = np.minimum(position.astype(int), size - 2)
+    return index, position - index
+
+
+def _lookup(table: np.ndarray, temperature, salinity):
+    """Vectorized linear interpolation in temperature (bilinear with salinity), clamped to the grids"""
+    tables = get_tables()
+    size = TEMPERATURE_GRID.size
+
+    i, t_fraction = _grid_position(np.asarray(temperature, dtype=float), T_MIN, T_STEP, size)
+    if tables.salinity.size == 1 or np.all(np.asarray(salinity) == 0):
+        row = table[0]
+        value = row[i] + (row[i + 1] - row[i]) * t_fraction
+        return float(value) if np.ndim(value) == 0 else value
+
+    salinity_step = tables.salinity[1] - tables.salinity[0]
+    j, s_fraction = _grid_position(np.asarray(salinity, dtype=float), tables.salinity[0],
+                                   salinity_step, tables.salinity.size)
+    low = table[j, i] + (table[j, i + 1] - table[j, i]) * t_fraction
+    high = table[j + 1, i] + (table[j + 1, i + 1] - table[j + 1, i]) * t_fraction
+    value = low + (high - low) * s_fraction
+    return float(value) if np.ndim(value) == 0 else value
+
+
+# Temperatures/salinities taking the scalar path (exact type check is the cheapest test)
+_SCALAR_TYPES = frozenset((int, float, np.float64))
+
+
+def _interpolate_scalar(row: list, temperature: float) -> float:
+    """Scalar interpolation by index arithmetic on the uniform temperature grid"""
+    if temperature <= T_MIN:
+        return row[0]
+    if temperature >= T_MAX:
+        return row[-1]
+    position = (temperature - T_MIN) / T_STEP
+    i = int(position)
+    low = row[i]
+    return low + (row[i + 1] - low) * (position - i)
+
+
+def water_density(temperature, salinity=0.0):
+    """Water density (kg/m³) at temperature (°C) and salinity (kg/kg)"""
+    tables = _tables or get_tables()
+    if temperature.__class__ in _SCALAR_TYPES and salinity.__class__ in _SCALAR_TYPES and salinity == 0:
+        return _interpolate_scalar(tables.density_row, temperature)
+    return _lookup(tables.density, temperature, salinity)
+
+
+def water_viscosity(temperature, salinity=0.0):
+    """Water dynamic viscosity (Pa·s) at temperature (°C) and salinity (kg/kg)"""
+    tables = _tables or get_tables()
+    if temperature.__class__ in _SCALAR_TYPES and salinity.__class__ in _SCALAR_TYPES and salinity == 0:
+        return _interpolate_scalar(tables.viscosity_row, temperature)
+    return _lookup(tables.viscosity, temperature, salinity)
@@ -0,0 +1,203 @@
+"""
+Calculation worker pool
+Runs CPU-bound calculations off the asyncio event loop with a bounded queue and timeout
+"""
+import asyncio
+import multiprocessing
+import queue
+import threading
+from time import monotonic, perf_counter_ns
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterable, Optional
+from ..config import settings
+from .timing import current_timer, timed_call
+
+
+class PoolSaturatedError(Exception):
+    """Raised when the calculation queue is full"""
+
+
+class CalculationTimeoutError(Exception):
+    """Raised when a calculation exceeds its time budget"""
+
+
+STREAM_BUFFER = 4  # items a streamed calculation may run ahead of its consumer
+STREAM_POLL = 0.1  # s between stop checks while the producer waits on a full buffer
+
+
+def _put(channel: Any, stop: Any, deadline: float, message: tuple) -> bool:
+    """Put on a bounded channel unless the consumer stopped or the deadline passed"""
+    while not stop.is_set() and monotonic() < deadline:
+        try:
+            channel.put(message, timeout=STREAM_POLL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _produce(fn: Callable[..., Iterable[Any]], args: tuple, channel: Any, stop: Any, deadline: float):
+    """Worker side of a streamed calculation: items, then ("done", None) or ("error", exception)"""
+    try:
+        for item in fn(*args):
+            if not _put(channel, stop, deadline, ("item", item)):
+                return
+        _put(channel, stop, deadline, ("done", None))
+    except Exception as e:
+        _put(channel, stop, deadline, ("error", e))
+
+
+class CalculationPool:
+    """Thread or process pool with admission control
+    
+    At most queue_size calculations may be running or waiting at once; further
+    submissions are rejected immediately. A timed-out calculation is abandoned
+    (its result is discarded) but keeps its slot until the worker finishes.
+    """
+    
+    def __init__(self, kind: str = "thread", workers: int = 4, queue_size: int = 32,
+                 timeout: float = 60.0):
+        self.kind = kind
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[Executor] = None
+        self._manager = None  # multiprocessing manager for streamed process-pool calculations
+    
+    @property
+    def executor(self) -> Executor:
+        """Executor, created on first use"""
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="calc"
+                )
+        return self._executor
+    
+    @property
+    def queue_depth(self) -> int:
+        """Calculations currently running or waiting"""
+        return self._pending
+    
+    async def run(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        """Run fn(*args) on the pool and await its result
+        
+        When the request is timed, the worker records its own phases (context
+        variables do not follow work into the pool) and they are merged back,
+        with the time spent waiting for a worker as "queue".
+        """
+        timer = current_timer()
+        if not self._slots.acquire(blocking=False):
+            raise PoolSaturatedError(
+                f"Calculation queue full ({self.queue_size} pending), retry later"
+            )
+        
+        with self._lock:
+            self._pending += 1
+        
+        try:
+            submitted = perf_counter_ns()
+            if timer is not None:
+                future = self.executor.submit(timed_call, fn, args)
+            else:
+                future = self.executor.submit(fn, *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise CalculationTimeoutError(
+                f"Calculation exceeded {timeout or self.timeout:.0f} s time limit"
+            )
+        
+        if timer is None:
+            return result
+        result, phases = result
+        timer.merge(phases)
+        timer.add("queue", max(perf_counter_ns() - submitted - phases["calc"][0], 0))
+        return result
+    
+    def stream(self, fn: Callable[..., Iterable[Any]], *args: Any,
+               timeout: Optional[float] = None) -> AsyncIterator[Any]:
+        """Run the generator function fn(*args) on the pool and iterate its items
+        
+        Admission happens here, so a full queue raises PoolSaturatedError before
+        a response starts. The stream holds its slot and worker until it ends;
+        the worker runs at most a few items ahead of the consumer and stops when
+        the consumer goes away or the time budget runs out (CalculationTimeoutError
+        from the iterator).
+        """
+        if not self._slots.acquire(blocking=False):
+            raise PoolSaturatedError(
+                f"Calculation queue full ({self.queue_size} pending), retry later"
+            )
+        with self._lock:
+            self._pending += 1
+        
+        budget = timeout or self.timeout
+        deadline = monotonic() + budget
+        try:
+            if self.kind == "process":
+                if self._manager is None:
+                    self._manager = multiprocessing.get_context("spawn").Manager()
+                channel, stop = self._manager.Queue(STREAM_BUFFER), self._manager.Event()
+            else:
+                channel, stop = queue.Queue(STREAM_BUFFER), threading.Event()
+            future = self.executor.submit(_produce, fn, args, channel, stop, deadline)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        
+        async def items() -> AsyncIterator[Any]:
+            try:
+                while True:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        raise CalculationTimeoutError(f"Calculation exceeded {budget:.0f} s time limit")
+                    try:
+                        # Short waits, so a cancelled consumer frees its waiting thread quickly
+                        kind, value = await asyncio.to_thread(channel.get, timeout=min(remaining, 1.0))
+                    except queue.Empty:
+                        continue
+                    if kind == "item":
+                        yield value
+                    elif kind == "error":
+                        raise value
+                    else:
+                        return
+            finally:
+                stop.set()
+        
+        return items()
+    
+    def shutdown(self):
+        """Stop workers without waiting for abandoned calculations"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+    
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+
+calculation_pool = CalculationPool(
+    kind=settings.calc_executor,
+    workers=settings.calc_workers,
+    queue_size=settings.calc_queue_size,
+    timeout=settings.calc_timeout
+)
@@ -5,8 +5,16 @@ FastAPI application for real process engineering calculations
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.api.routes import router
+from app.calculations.sweep import shutdown_sweep_executor
 from app.config import settings
+from app.utils.jobs import job_manager
+from app.utils.metrics import metrics
+from app.utils.result_cache import result_cache
+from app.utils.timing import ServerTimingMiddleware
+from app.utils.water_properties import get_tables
+from app.utils.workers import calculation_pool
 
 app = FastAPI(
     title="Water Treatment Designer API",
@@ -32,8 +40,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-Id"],
 )
 
+# Per-phase request timing; not installed at all when switched off
+if settings.request_timing:
+    app.add_middleware(ServerTimingMiddleware)
+
 # Include API routes
 app.include_router(router, prefix="/api")
 
@@ -49,6 +62,31 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    # Prometheus text format; totals of every worker sharing settings.metrics_dir
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.on_event("startup")
+async def build_property_tables():
+    # CoolProp import and table build take a few seconds; pay them before the first request
+    get_tables()
+
+@app.on_event("startup")
+async def register_process_metrics():
+    # Per server process, after any fork; pool worker processes would report stale copies
+    metrics.callback("calculation_queue_depth", "Calculations running or waiting on the worker pool",
+                     lambda: calculation_pool.queue_depth)
+    metrics.callback("result_cache_entries", "Result cache entries held in memory",
+                     lambda: result_cache.stats()["entries"])
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    calculation_pool.shutdown()
+    job_manager.shutdown()
+    shutdown_sweep_executor()
+    metrics.flush()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,44 @@
+"""
+Shared flowsheet fixtures
+"""
+import pytest
+from app.calculations.mass_balance import FlowsheetData
+from app.models.base import BaseEquipmentModel, ProcessResults
+from app.models.registry import register_model
+
+
+@register_model("test_splitter")
+class SplitterModel(BaseEquipmentModel):
+    """Sends a fixed fraction of the inlet to the permeate outlet"""
+
+    def calculate_performance(self, inputs):
+        flow = inputs.get("total_inlet_flow", 0.0)
+        fraction = inputs.get("fraction", 0.3)
+        return ProcessResults(success=True, data={
+            "permeate_flow": fraction * flow, "concentrate_flow": (1 - fraction) * flow
+        })
+
+
+def build_recycle_flowsheet(fraction: float = 0.3, feed_flow: float = 10.0) -> FlowsheetData:
+    """Mixer M and splitter X with the concentrate R recycled to the mixer"""
+    return FlowsheetData(
+        equipment={
+            "M": {"equipment_id": "M", "equipment_type": "tank", "config": {},
+                  "inlet_streams": ["F", "R"], "outlet_streams": ["A"]},
+            "X": {"equipment_id": "X", "equipment_type": "test_splitter", "config": {"fraction": fraction},
+                  "inlet_streams": ["A"], "outlet_streams": ["P", "R"]},
+        },
+        streams={
+            "F": {"stream_id": "F", "flow_rate": feed_flow},
+            "A": {"stream_id": "A", "source_port": "outlet"},
+            "P": {"stream_id": "P", "source_port": "permeate_outlet"},
+            "R": {"stream_id": "R", "source_port": "concentrate_outlet"},
+        },
+        connections={}
+    )
+
+
+@pytest.fixture
+def recycle_flowsheet():
+    """Factory for the mixer/splitter recycle flowsheet"""
+    return build_recycle_flowsheet
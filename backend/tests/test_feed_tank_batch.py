@@ -0,0 +1,118 @@
+"""
+Vectorized feed tank assessments against the scalar model
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from app.calculations.bulk_characterization import BulkCharacterization
+from app.models.feed_tank import DIFFICULTY_LEVELS, FOULING_LEVELS, FeedTankModel, WaterQuality
+
+
+FIELDS = list(WaterQuality.model_fields)
+# Quality-specific pretreatment steps in trigger bit order
+TRIGGERED_STEPS = ["coagulation", "ph_adjustment", "hardness_removal", "iron_removal",
+                   "activated_carbon", "filtration", "oil_water_separation"]
+THRESHOLDS = {
+    "turbidity": [1, 5, 10], "tss": [10, 20, 30, 50], "tds": [500, 1000], "fog": [5, 10, 20],
+    "bod": [5], "cod": [10, 50, 100], "ph": [6, 6.5, 8.5, 9], "hardness": [200, 300],
+    "iron": [0.2, 0.3], "manganese": [0.05],
+}
+
+
+def random_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = {name: rng.uniform(0, 2.5 * max(THRESHOLDS.get(name, [1])), n) for name in FIELDS}
+    rows["ph"] = rng.uniform(4, 11, n)
+    return rows
+
+
+def edge_rows():
+    """Each threshold exactly, and one ulp either side, with the other fields at their defaults"""
+    defaults = {name: field.default for name, field in WaterQuality.model_fields.items()}
+    rows = []
+    for name, thresholds in THRESHOLDS.items():
+        for threshold in thresholds:
+            for value in (np.nextafter(threshold, -np.inf), threshold, np.nextafter(threshold, np.inf)):
+                rows.append({**defaults, name: float(value)})
+    return {name: np.array([row[name] for row in rows]) for name in FIELDS}
+
+
+@pytest.mark.parametrize("columns", [random_rows(2000), edge_rows()], ids=["random", "edges"])
+def test_characterize_batch_matches_scalar(columns):
+    model = FeedTankModel("FT1")
+    batch = model.characterize_batch(columns)
+    n = len(columns["tss"])
+    for i in range(n):
+        quality = WaterQuality(**{name: float(values[i]) for name, values in columns.items()})
+        assert DIFFICULTY_LEVELS[batch["treatment_difficulty"][i]] == model.assess_treatment_difficulty(quality)
+        assert FOULING_LEVELS[batch["fouling_potential"][i]] == model.assess_fouling_potential(quality)
+        assert batch["sdi_estimate"][i] == pytest.approx(model.estimate_sdi(quality), rel=1e-12)
+
+        # Without base needs (unknown source) the recommendation is exactly the triggered steps
+        mask = int(batch["pretreatment_mask"][i])
+        expected = [step for bit, step in enumerate(TRIGGERED_STEPS) if mask >> bit & 1]
+        assert model.recommend_pretreatment("unknown", quality) == expected
+
+
+def test_pretreatment_mask_determines_recommendation():
+    model = FeedTankModel("FT1")
+    columns = random_rows(2000, seed=1)
+    masks = model.characterize_batch(columns)["pretreatment_mask"]
+    for source in model.source_characteristics:
+        by_mask = {}
+        for i, mask in enumerate(masks.tolist()):
+            quality = WaterQuality(**{name: float(values[i]) for name, values in columns.items()})
+            steps = model.recommend_pretreatment(source, quality)
+            assert by_mask.setdefault(mask, steps) == steps
+
+
+@pytest.fixture
+def lab_dataset(tmp_path):
+    """CSV with a missing cell, a non-numeric cell and mixed source types"""
+    columns = random_rows(53, seed=2)
+    frame = pd.DataFrame({name: columns[name] for name in ("turbidity", "tss", "cod", "fog", "ph", "iron")})
+    frame = frame.astype(object)
+    frame.loc[7, "tss"] = np.nan
+    frame.loc[20, "cod"] = "n/a"
+    frame["source_type"] = ["groundwater", "industrial", None] * 17 + ["municipal", "municipal"]
+    path = tmp_path / "lab.csv"
+    frame.to_csv(path, index=False)
+    return path, frame
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 7, 10, 1000])
+def test_bulk_characterization_across_chunks(lab_dataset, chunk_rows):
+    path, frame = lab_dataset
+    result = BulkCharacterization(str(path), chunk_rows=chunk_rows).run()
+    model = FeedTankModel("FT1")
+    rows = result["results"]
+
+    assert result["rows"] == 53 and result["valid_rows"] == 51 and result["invalid_rows"] == 2
+    assert result["quality_columns"] == ["turbidity", "tss", "fog", "cod", "ph", "iron"]
+    for i in (7, 20):
+        assert not rows["valid"][i]
+        assert rows["treatment_difficulty"][i] is None and rows["sdi_estimate"][i] is None
+
+    for i in range(53):
+        if i in (7, 20):
+            continue
+        quality = WaterQuality(**{name: float(frame.loc[i, name])
+                                  for name in ("turbidity", "tss", "cod", "fog", "ph", "iron")})
+        source = frame.loc[i, "source_type"]
+        source = "surface_water" if pd.isna(source) else source  # the default source_type
+        assert rows["treatment_difficulty"][i] == model.assess_treatment_difficulty(quality)
+        assert rows["fouling_potential"][i] == model.assess_fouling_potential(quality)
+        assert rows["sdi_estimate"][i] == round(model.estimate_sdi(quality), 4)
+        steps = result["pretreatment_sets"][rows["pretreatment_set"][i]]
+        assert steps == model.recommend_pretreatment(source, quality)
+
+
+def test_bulk_characterization_independent_of_chunk_size(lab_dataset):
+    path, _ = lab_dataset
+    whole = BulkCharacterization(str(path), chunk_rows=1000).run()
+    chunked = BulkCharacterization(str(path), chunk_rows=7).run()
+    assert chunked["summary"]["treatment_difficulty"] == whole["summary"]["treatment_difficulty"]
+    assert chunked["summary"]["fouling_potential"] == whole["summary"]["fouling_potential"]
+    assert chunked["summary"]["sdi_estimate"] == whole["summary"]["sdi_estimate"]
+    for name, stats in whole["summary"]["water_quality"].items():
+        assert chunked["summary"]["water_quality"][name] == pytest.approx(stats)
@@ -0,0 +1,26 @@
+"""
+Fouling simulation CIP accounting
+"""
+import pytest
+from app.calculations.fouling_simulation import FoulingSimulator
+
+
+def simulate_kpis(**inputs):
+    result = FoulingSimulator("UF1").simulate(
+        {"feed_flow": 20.0, "membrane_area": 200.0, "transmembrane_pressure": 1.0, **inputs}
+    )
+    assert result.success, result.errors
+    return result.data["kpis"]
+
+
+@pytest.mark.parametrize("duration", [0.0, 4.0])
+def test_cip_count_includes_zero_duration_cips(duration):
+    assert simulate_kpis(horizon_hours=8760.0, cip_duration_hours=duration)["cip_count"] == 12
+
+
+def test_cip_in_progress_at_horizon_end_is_counted():
+    assert simulate_kpis(horizon_hours=722.0, cip_duration_hours=4.0)["cip_count"] == 1
+
+
+def test_cip_disabled():
+    assert simulate_kpis(horizon_hours=2000.0, cip_interval_hours=0.0)["cip_count"] == 0
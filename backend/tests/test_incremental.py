@@ -0,0 +1,101 @@
+"""
+Incremental flowsheet re-solves against full solves
+"""
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from app.api import routes
+from app.api.schemas import FlowsheetRequest
+from app.calculations.incremental import find_dirty_units, incremental_cache
+from app.calculations.mass_balance import EquipmentData, MassBalanceSolver, SolverOptions, StreamData
+
+
+@pytest.fixture
+def solve_calls(monkeypatch):
+    """The previous result handed to every solve (None for a full solve)"""
+    calls = []
+    solve_flowsheet = MassBalanceSolver.solve_flowsheet
+
+    def recording(self, flowsheet, previous=None, dirty=None):
+        calls.append(previous)
+        return solve_flowsheet(self, flowsheet, previous=previous, dirty=dirty)
+
+    monkeypatch.setattr(MassBalanceSolver, "solve_flowsheet", recording)
+    return calls
+
+
+def solve(flowsheet, cached=None, **options):
+    """Route solve task without the result cache; returns the session entry it would store"""
+    solver_options = SolverOptions(**{"session_id": "s1", "tolerance": 1e-10, **options})
+    request = FlowsheetRequest(**flowsheet.model_dump(), solver_options=solver_options)
+    _, snapshot, result = routes._solve_flowsheet(request, cached, use_cache=False)
+    return snapshot, result, solver_options
+
+
+def assert_same_solution(incremental, full):
+    assert incremental.success and incremental.converged == full.converged
+    assert incremental.streams.keys() == full.streams.keys()
+    for stream_id, stream in full.streams.items():
+        for name, value in stream.model_dump().items():
+            assert getattr(incremental.streams[stream_id], name) == pytest.approx(value, rel=1e-8, abs=1e-9)
+    assert incremental.equipment_results.keys() == full.equipment_results.keys()
+    for eq_id, result in full.equipment_results.items():
+        assert incremental.equipment_results[eq_id] == pytest.approx(result, rel=1e-8, abs=1e-9)
+
+
+def edit_config(flowsheet):
+    flowsheet.equipment["X"].config["fraction"] = 0.5
+    return {"X"}
+
+
+def edit_feed(flowsheet):
+    flowsheet.streams["F"].flow_rate = 15.0
+    return {"M"}
+
+
+def add_unit(flowsheet):
+    flowsheet.equipment["T"] = EquipmentData(equipment_id="T", equipment_type="tank", config={},
+                                             inlet_streams=["P"], outlet_streams=["Q"])
+    flowsheet.streams["Q"] = StreamData(stream_id="Q", source_port="outlet")
+    return None
+
+
+@pytest.mark.parametrize("edit", [edit_config, edit_feed, add_unit])
+def test_incremental_resolve_matches_full_solve(recycle_flowsheet, solve_calls, edit):
+    cached = solve(recycle_flowsheet())
+    edited = recycle_flowsheet()
+    dirty = edit(edited)
+    assert find_dirty_units(cached[0], edited) == dirty
+
+    _, incremental, _ = solve(edited, cached)
+    _, full, _ = solve(edited)
+    assert_same_solution(incremental, full)
+
+    # Edits reuse the baseline; a topology change falls back to a full solve
+    assert (solve_calls[1] is cached[1]) == (dirty is not None)
+    assert solve_calls[2] is None
+
+
+@pytest.mark.parametrize("options", [{"tolerance": 1e-6}, {"convergence_method": "broyden"},
+                                     {"mode": "equation_oriented"}])
+def test_changed_options_force_full_solve(recycle_flowsheet, solve_calls, options):
+    cached = solve(recycle_flowsheet())
+    edited = recycle_flowsheet(fraction=0.5)
+    _, result, _ = solve(edited, cached, **options)
+    assert solve_calls[1] is None
+    assert result.converged
+
+
+def test_unconverged_solve_is_not_a_baseline(recycle_flowsheet):
+    client = TestClient(app)
+    session = {"session_id": "unconverged", "convergence_method": "direct"}
+    body = {**recycle_flowsheet(fraction=0.35).model_dump(), "solver_options": {**session, "max_iterations": 2}}
+    response = client.post("/api/calculate/flowsheet", json=body)
+    assert response.status_code == 200 and not response.json()["converged"]
+    assert incremental_cache.get("unconverged") is None
+
+    body["solver_options"]["max_iterations"] = 500
+    response = client.post("/api/calculate/flowsheet", json=body)
+    assert response.json()["converged"]
+    snapshot, result, options = incremental_cache.get("unconverged")
+    assert result.converged and options.max_iterations == 500
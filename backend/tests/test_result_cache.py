@@ -0,0 +1,86 @@
+"""
+Result cache keys, memory LRU and the shared SQLite store
+"""
+import sqlite3
+import time
+import pytest
+from app.calculations.mass_balance import SolverOptions
+from app.utils.result_cache import ACCESS_REFRESH_INTERVAL, ResultCache, normalize
+
+
+def make_cache(fingerprint="test", **kwargs):
+    cache = ResultCache(**kwargs)
+    cache._fingerprint = fingerprint  # skip hashing the code tree
+    return cache
+
+
+def test_normalize_expands_model_defaults():
+    explicit = SolverOptions(tolerance=1e-6, max_iterations=100, convergence_method="wegstein")
+    assert normalize(SolverOptions()) == normalize(explicit)
+    assert normalize({"options": SolverOptions()}) == normalize({"options": SolverOptions().model_dump()})
+
+
+@pytest.mark.parametrize("first, second", [
+    (-0.0, 0.0),
+    (0.1 + 0.2, 0.3),
+    (1, 1.0),
+    (1.0000000000001, 1.0),  # below 12 significant digits
+])
+def test_normalize_folds_equivalent_numbers(first, second):
+    cache = make_cache()
+    assert normalize(first) == normalize(second)
+    assert cache.key("uf", {"tmp": first}) == cache.key("uf", {"tmp": second})
+
+
+def test_key_distinguishes_values_kinds_and_fingerprints():
+    cache = make_cache()
+    assert cache.key("uf", {"tmp": 1.00000000001}) != cache.key("uf", {"tmp": 1.0})
+    assert cache.key("uf", {"tmp": 1.0}) != cache.key("flowsheet", {"tmp": 1.0})
+    assert cache.key("uf", {"tmp": 1.0}) != make_cache("other").key("uf", {"tmp": 1.0})
+    assert normalize(float("nan")) == "nan"
+
+
+def test_memory_lru_evicts_least_recently_used():
+    cache = make_cache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"  # a is now more recent than b
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1 and cache.stats()["entries"] == 2
+
+
+def test_disk_store_round_trip_and_fingerprint_purge(tmp_path):
+    path = str(tmp_path / "cache.db")
+    writer = make_cache(path=path)
+    writer.put("text", '{"ok": true}')
+    writer.put("binary", b"\x92\x01\xc0")
+
+    # Another worker (empty memory) reads the same store
+    reader = make_cache(path=path)
+    assert reader.get("text") == '{"ok": true}'
+    assert reader.get("binary") == b"\x92\x01\xc0"
+    assert reader.stats()["disk_hits"] == 2
+
+    # New code (a changed fingerprint) purges the stale rows on open
+    upgraded = make_cache("changed", path=path)
+    assert upgraded.get("text") is None
+    rows = sqlite3.connect(path).execute("SELECT COUNT(*) FROM results").fetchone()[0]
+    assert rows == 0
+
+
+def test_disk_hit_refreshes_only_stale_access_times(tmp_path):
+    path = str(tmp_path / "cache.db")
+    make_cache(path=path).put("fresh", "1")
+    make_cache(path=path).put("stale", "2")
+    stale_time = time.time() - 2 * ACCESS_REFRESH_INTERVAL
+    with sqlite3.connect(path) as db:
+        db.execute("UPDATE results SET accessed = ? WHERE key = 'stale'", (stale_time,))
+    before = dict(sqlite3.connect(path).execute("SELECT key, accessed FROM results"))
+
+    reader = make_cache(path=path)
+    assert reader.get("fresh") == "1" and reader.get("stale") == "2"
+    after = dict(sqlite3.connect(path).execute("SELECT key, accessed FROM results"))
+    assert after["fresh"] == before["fresh"]
+    assert after["stale"] > stale_time + ACCESS_REFRESH_INTERVAL
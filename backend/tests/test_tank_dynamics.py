@@ -0,0 +1,71 @@
+"""
+Tank dynamics kernels against their step-by-step definitions
+"""
+import numpy as np
+import pytest
+from app.calculations.tank_dynamics import (
+    LEVEL_WINDOW, RECURRENCE_BLOCK, FeedTankSimulator, bounded_storage, linear_recurrence
+)
+
+
+def naive_storage(v0, net, capacity):
+    volume, v = np.empty(net.size), v0
+    for k, dv in enumerate(net):
+        v = min(max(v + dv, 0.0), capacity)
+        volume[k] = v
+    return volume
+
+
+def naive_recurrence(log_a, b, x0):
+    x, value = np.empty(b.size), x0
+    for k in range(b.size):
+        value = np.exp(log_a[k]) * value + b[k]
+        x[k] = value
+    return x
+
+
+@pytest.mark.parametrize("v0, scale", [(0.0, 1.0), (50.0, 5.0), (100.0, 20.0), (30.0, 0.1)])
+def test_bounded_storage_matches_clipped_steps(v0, scale):
+    rng = np.random.default_rng(1)
+    # Long enough to cross several look-ahead windows and both bounds
+    net = rng.normal(0.0, scale, 3 * LEVEL_WINDOW + 17)
+    np.testing.assert_allclose(bounded_storage(v0, net, 100.0), naive_storage(v0, net, 100.0), atol=1e-8)
+
+
+def test_bounded_storage_drifts_to_bounds():
+    fill = np.full(1000, 0.5)
+    np.testing.assert_allclose(bounded_storage(10.0, fill, 100.0), naive_storage(10.0, fill, 100.0))
+    np.testing.assert_allclose(bounded_storage(90.0, -fill, 100.0), naive_storage(90.0, -fill, 100.0))
+
+
+@pytest.mark.parametrize("n", [1, RECURRENCE_BLOCK - 1, RECURRENCE_BLOCK, RECURRENCE_BLOCK ** 3 + 5])
+def test_linear_recurrence_matches_loop(n):
+    rng = np.random.default_rng(n)
+    log_a = -rng.exponential(0.5, n)
+    b = rng.uniform(0.0, 2.0, n)
+    np.testing.assert_allclose(linear_recurrence(log_a, b, 3.0), naive_recurrence(log_a, b, 3.0), rtol=1e-10)
+
+
+def test_linear_recurrence_strong_decay():
+    n = 4 * RECURRENCE_BLOCK
+    log_a = np.full(n, -100.0)  # beyond the per-step decay cap
+    b = np.linspace(0.0, 1.0, n)
+    np.testing.assert_allclose(linear_recurrence(log_a, b, 5.0), naive_recurrence(log_a, b, 5.0), atol=1e-12)
+
+
+def simulate_kpis(**inputs):
+    result = FeedTankSimulator("T1").simulate({"inflow_rate": 50.0, "volume": 100.0, "level": 50.0, **inputs})
+    assert result.success, result.errors
+    return result.data["kpis"]
+
+
+@pytest.mark.parametrize("inflow, demand", [(50.0, 60.0), (60.0, 50.0), (50.0, 50.0)])
+def test_tss_removal_is_zero_without_settling(inflow, demand):
+    # Inventory drawn down or built up is not settling
+    kpis = simulate_kpis(settling_rate=0.0, inflow_profile=[inflow] * 600, outflow_profile=[demand] * 600)
+    assert kpis["tss_removal"] == pytest.approx(0.0, abs=1e-3)
+
+
+def test_tss_removal_positive_with_settling():
+    kpis = simulate_kpis(settling_rate=0.05, inflow_profile=[50.0] * 600, outflow_profile=[60.0] * 600)
+    assert 0 < kpis["tss_removal"] < 100
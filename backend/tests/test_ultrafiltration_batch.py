@@ -0,0 +1,73 @@
+"""
+Batch UF evaluation against the scalar model
+"""
+import numpy as np
+import pytest
+from app.models.ultrafiltration import UltrafiltrationModel
+
+
+ROWS = {
+    "feed_flow": [10.0, 25.0, 5.0, 40.0],
+    "membrane_area": [200.0, 500.0, 50.0, 1000.0],
+    "transmembrane_pressure": [0.5, 1.0, 1.5, 2.5],
+    "temperature": [15.0, 25.0, 35.0, 20.0],
+    "feed_concentration": [0.05, 0.1, 0.5, 0.2],
+    "operating_hours": [0.0, 100.0, 1000.0, 5000.0],
+    "membrane_type": ["PVDF", "PTFE", "PVDF", "PTFE"],
+}
+KEYS = ["permeate_flow", "concentrate_flow", "recovery", "flux", "energy_consumption",
+        "membrane_life_prediction", "fouling_resistance"]
+
+
+def scalar_row(columns, i):
+    return {name: values[i] for name, values in columns.items()}
+
+
+def test_batch_matches_scalar():
+    model = UltrafiltrationModel("UF1")
+    batch = model.calculate_batch(ROWS)
+    assert batch["rows"] == 4
+    for i in range(4):
+        scalar = model.calculate_performance(scalar_row(ROWS, i))
+        assert scalar.success and batch["error_code"][i] is None
+        for key in KEYS:
+            assert batch[key][i] == pytest.approx(scalar.data[key], rel=1e-9), key
+
+
+@pytest.mark.parametrize("column, value, code", [
+    ("feed_flow", 0.0, "INVALID_FEED_FLOW"),
+    ("membrane_area", -5.0, "INVALID_MEMBRANE_AREA"),
+    ("transmembrane_pressure", 0.0, "INVALID_TMP"),
+])
+def test_invalid_rows_match_scalar_errors(column, value, code):
+    model = UltrafiltrationModel("UF1")
+    columns = {name: list(values) for name, values in ROWS.items()}
+    columns[column][1] = value
+    batch = model.calculate_batch(columns)
+    scalar = model.calculate_performance(scalar_row(columns, 1))
+    assert not scalar.success and scalar.errors[0].code == code
+    assert batch["error_code"] == [None, code, None, None]
+    assert batch["permeate_flow"][1] is None
+
+
+@pytest.mark.parametrize("column", ["feed_flow", "membrane_area", "transmembrane_pressure", "temperature"])
+@pytest.mark.parametrize("value", [None, float("nan"), float("inf")])
+def test_non_finite_cells_invalidate_only_their_row(column, value):
+    model = UltrafiltrationModel("UF1")
+    columns = {name: list(values) for name, values in ROWS.items()}
+    columns[column][2] = value
+    batch = model.calculate_batch(columns)
+    reference = model.calculate_batch(ROWS)
+    assert batch["error_code"] == [None, None, "INVALID_INPUT", None]
+    assert all(batch[key][2] is None for key in KEYS)
+    assert not any(flags[2] for flags in batch["warnings"].values())
+    for key in KEYS:
+        assert [batch[key][i] for i in (0, 1, 3)] == [reference[key][i] for i in (0, 1, 3)]
+
+
+def test_performance_arrays_flag_nan_rows_invalid():
+    arrays = UltrafiltrationModel("UF1").performance_arrays({
+        "feed_flow": [10.0, np.nan], "membrane_area": 200.0, "transmembrane_pressure": 1.0
+    })
+    assert arrays["valid"].tolist() == [True, False]
+    assert np.isnan(arrays["feed_flow"][1])
@@ -0,0 +1,113 @@
+// Minimal MessagePack decoder for columnar API responses (no extension types)
+
+const textDecoder = new TextDecoder()
+
+class Decoder {
+  private view: DataView
+  private bytes: Uint8Array
+  private offset = 0
+
+  constructor(buffer: ArrayBuffer) {
+    this.view = new DataView(buffer)
+    this.bytes = new Uint8Array(buffer)
+  }
+
+  decode(): any {
+    const type = this.view.getUint8(this.offset++)
+
+    if (type <= 0x7f) return type // positive fixint
+    if (type >= 0xe0) return type - 0x100 // negative fixint
+    if ((type & 0xf0) === 0x80) return this.map(type & 0x0f)
+    if ((type & 0xf0) === 0x90) return this.array(type & 0x0f)
+    if ((type & 0xe0) === 0xa0) return this.str(type & 0x1f)
+
+    switch (type) {
+      case 0xc0: return null
+      case 0xc2: return false
+      case 0xc3: return true
+      case 0xc4: return this.bin(this.uint(1))
+      case 0xc5: return this.bin(this.uint(2))
+      case 0xc6: return this.bin(this.uint(4))
+      case 0xca: return this.read(4, () => this.view.getFloat32(this.offset))
+      case 0xcb: return this.read(8, () => this.view.getFloat64(this.offset))
+      case 0xcc: return this.uint(1)
+      case 0xcd: return this.uint(2)
+      case 0xce: return this.uint(4)
+      case 0xcf: return this.read(8, () => Number(this.view.getBigUint64(this.offset)))
+      case 0xd0: return this.read(1, () => this.view.getInt8(this.offset))
+      case 0xd1: return this.read(2, () => this.view.getInt16(this.offset))
+      case 0xd2: return this.read(4, () => this.view.getInt32(this.offset))
+      case 0xd3: return this.read(8, () => Number(this.view.getBigInt64(this.offset)))
+      case 0xd9: return this.str(this.uint(1))
+      case 0xda: return this.str(this.uint(2))
+      case 0xdb: return this.str(this.uint(4))
+      case 0xdc: return this.array(this.uint(2))
+      case 0xdd: return this.array(this.uint(4))
+      case 0xde: return this.map(this.uint(2))
+      case 0xdf: return this.map(this.uint(4))
+      default:
+        throw new Error(`Unsupported MessagePack type 0x${type.toString(16)}`)
+    }
+  }
+
+  private read<T>(size: number, value: () => T): T {
+    const result = value()
+    this.offset += size
+    return result
+  }
+
+  private uint(size: 1 | 2 | 4): number {
+    if (size === 1) return this.read(1, () => this.view.getUint8(this.offset))
+    if (size === 2) return this.read(2, () => this.view.getUint16(this.offset))
+    return this.read(4, () => this.view.getUint32(this.offset))
+  }
+
+  private str(length: number): string {
+    const value = textDecoder.decode(this.bytes.subarray(this.offset, this.offset + length))
+    this.offset += length
+    return value
+  }
+
+  private bin(length: number): Uint8Array {
+    const value = this.bytes.slice(this.offset, this.offset + length)
+    this.offset += length
+    return value
+  }
+
+  private array(length: number): any[] {
+    const values = new Array(length)
+    for (let i = 0; i < length; i++) values[i] = this.decode()
+    return values
+  }
+
+  private map(length: number): Record<string, any> {
+    const values: Record<string, any> = {}
+    for (let i = 0; i < length; i++) {
+      const key = this.decode()
+      values[String(key)] = this.decode()
+    }
+    return values
+  }
+}
+
+export function decodeMsgpack(buffer: ArrayBuffer): any {
+  return new Decoder(buffer).decode()
+}
+
+// Columns ({ key: [...] }) back to records keyed by the matching ids; a cell
+// is left out only where its presence mask is false, so null values survive
+export function rowsFromColumns(
+  ids: any[], columns: Record<string, any[]>, present: Record<string, boolean[]> = {}
+): Record<string, any> {
+  const keys = Object.keys(columns)
+  const rows: Record<string, any> = {}
+  ids.forEach((id, i) => {
+    const row: Record<string, any> = {}
+    for (const key of keys) {
+      if (present[key]?.[i] === false) continue
+      row[key] = columns[key][i]
+    }
+    rows[id] = row
+  })
+  return rows
+}
@@ -1,10 +1,14 @@
 // API client for backend process calculations
 
+import { decodeMsgpack, rowsFromColumns } from './msgpack'
+
 // Use environment variable for API URL in production, fallback to relative path for development
 const API_BASE_URL = import.meta.env.VITE_API_URL 
   ? `${import.meta.env.VITE_API_URL}/api`
   : '/api'
 
+const MSGPACK_MEDIA_TYPE = 'application/msgpack'
+
 interface ApiResponse<T = any> {
   success: boolean
   data?: T
@@ -29,18 +33,22 @@ interface FlowsheetResponse extends ApiResponse {
 class ProcessApi {
   private async request<T = any>(endpoint: string, options: RequestInit = {}): Promise<T> {
     try {
+      const { headers, ...rest } = options
       const response = await fetch(`${API_BASE_URL}${endpoint}`, {
+        ...rest,
         headers: {
           'Content-Type': 'application/json',
-          ...options.headers,
+          ...headers,
         },
-        ...options,
       })
 
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`)
       }
 
+      if (response.headers.get('Content-Type')?.startsWith(MSGPACK_MEDIA_TYPE)) {
+        return decodeMsgpack(await response.arrayBuffer())
+      }
       return await response.json()
     } catch (error) {
       console.error(`API request failed for ${endpoint}:`, error)
@@ -56,10 +64,22 @@ class ProcessApi {
   }
 
   async calculateFlowsheet(flowsheetData: Record<string, any>): Promise<FlowsheetResponse> {
-    return this.request('/calculate/flowsheet', {
+    // Columnar MessagePack avoids repeating every stream property name per stream
+    const result: FlowsheetResponse = await this.request('/calculate/flowsheet', {
       method: 'POST',
       body: JSON.stringify(flowsheetData),
+      headers: { Accept: `${MSGPACK_MEDIA_TYPE}, application/json;q=0.5` },
     })
+
+    if (Array.isArray(result.streams?.stream_id)) {
+      const streams = result.streams as Record<string, any[]>
+      result.streams = rowsFromColumns(streams.stream_id, streams)
+    }
+    if (Array.isArray(result.equipment_results?.equipment_id)) {
+      const { equipment_id, columns, present } = result.equipment_results as Record<string, any>
+      result.equipment_results = rowsFromColumns(equipment_id, columns, present)
+    }
+    return result
   }
 
   async validateEquipment(equipmentData: Record<string, any>): Promise<ApiResponse<{ valid: boolean }>> {